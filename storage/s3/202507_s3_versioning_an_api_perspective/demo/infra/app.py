@@ -1,7 +1,33 @@
 #!/usr/bin/env python3
+import json
+import os
+import sys
+
+from template_cache import OUTDIR_ENV, REUSE_ENV, TemplateCache, cli_context, input_fingerprint
+
+STACK_NAME = "S3VersioningApiPerspectiveStack"
+
+# S3_STACK_REUSE=1: an unchanged app copies its last assembly instead of synthesizing it again,
+# see reuse.py for skipping the deploy of an unchanged stack
+reuse = os.environ.get(REUSE_ENV) == "1"
+if reuse:
+    cache = TemplateCache()
+    fingerprint = input_fingerprint(cli_context())
+    if cache.restore(fingerprint, os.environ.get(OUTDIR_ENV, "cdk.out")):
+        sys.exit(0)
+
 import aws_cdk as cdk
 from s3_stack import S3Stack
 
 app = cdk.App()
-S3Stack(app, "S3VersioningApiPerspectiveStack")
-app.synth()
\ No newline at end of file
+# cdk deploy -c lifecycle_rules=rules.json, a file in the shape of PutBucketLifecycleConfiguration
+lifecycle_rules = app.node.try_get_context("lifecycle_rules")
+if isinstance(lifecycle_rules, str):
+    with open(lifecycle_rules) as f:
+        lifecycle_rules = json.load(f)
+if isinstance(lifecycle_rules, dict):
+    lifecycle_rules = lifecycle_rules["Rules"]
+S3Stack(app, STACK_NAME, lifecycle_rules=lifecycle_rules)
+assembly = app.synth()
+if reuse:
+    cache.store(fingerprint, assembly.directory)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+    Startup and synth time of app.py, the way the CDK CLI runs it: a fresh
+    interpreter per synth. Compares a plain synth with S3_STACK_REUSE=1 on a
+    cold and on a warm template cache. Needs aws-cdk-lib installed, no AWS
+    account: synth never talks to AWS.
+
+    python bench_synth.py --runs 5
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from template_cache import CACHE_DIR_ENV, OUTDIR_ENV, REUSE_ENV, stack_template, template_fingerprint
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+STACK_NAME = "S3VersioningApiPerspectiveStack"
+
+
+def synth(env, outdir):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "app.py"], cwd=HERE, check=True, env={**env, OUTDIR_ENV: outdir})
+    return time.perf_counter() - start
+
+
+def timed_runs(runs, env, tmp, before=None):
+    """Seconds of every run and the template fingerprint; before() runs ahead of each synth, untimed."""
+    seconds = []
+    fingerprint = None
+    for i in range(runs):
+        if before:
+            before()
+        outdir = os.path.join(tmp, f"out-{len(os.listdir(tmp))}")
+        seconds.append(synth(env, outdir))
+        fingerprint = template_fingerprint(stack_template(outdir, STACK_NAME))
+    return seconds, fingerprint
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import aws_cdk"], check=True)
+    print(f"python -c 'import aws_cdk': {time.perf_counter() - start:.2f}s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = os.path.join(tmp, "cache")
+        plain_env = {name: value for name, value in os.environ.items() if name != REUSE_ENV}
+        reuse_env = {**plain_env, REUSE_ENV: "1", CACHE_DIR_ENV: cache}
+        outputs = os.path.join(tmp, "out")
+        os.makedirs(outputs)
+
+        def clear_cache():
+            shutil.rmtree(cache, ignore_errors=True)
+
+        results = [
+            ("plain synth", *timed_runs(args.runs, plain_env, outputs)),
+            ("reuse, cold cache", *timed_runs(args.runs, reuse_env, outputs, clear_cache)),
+            ("reuse, warm cache", *timed_runs(args.runs, reuse_env, outputs)),
+        ]
+    print(f"{'':<20} {'median s':>9} {'min s':>7}  template")
+    for name, seconds, fingerprint in results:
+        print(f"{name:<20} {statistics.median(seconds):>9.2f} {min(seconds):>7.2f}  {fingerprint[:12]}")
+    assert len({fingerprint for _, _, fingerprint in results}) == 1, "the cache changed the template"
+    saved = statistics.median(results[0][1]) - statistics.median(results[2][1])
+    print(f"saved per synth on a warm cache: {saved:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+    Is the deployed stack already what cdk.out would deploy? Compares the
+    fingerprint of the synthesized template with the template CloudFormation
+    holds for the stack, so an unchanged stack is reused instead of deployed
+    and destroyed on every run. Tests keep runs apart with a per-run key
+    prefix (S3_TEST_RUN_ID), not a bucket per run.
+
+    python reuse.py check [--assembly cdk.out] || cdk deploy --app cdk.out --require-approval never
+
+    Exit status 0: deployed and identical, 1: deploy needed.
+"""
+import argparse
+import sys
+
+from template_cache import stack_template, template_fingerprint
+
+STACK_NAME = "S3VersioningApiPerspectiveStack"
+# Statuses in which the stack serves the template it holds
+REUSABLE = {"CREATE_COMPLETE", "UPDATE_COMPLETE", "UPDATE_ROLLBACK_COMPLETE", "IMPORT_COMPLETE"}
+
+
+def deployed_fingerprint(cf_client, stack_name):
+    """(status, template fingerprint) of the deployed stack, (None, None) if there is none."""
+    from botocore.exceptions import ClientError
+
+    try:
+        stack = cf_client.describe_stacks(StackName=stack_name)["Stacks"][0]
+    except ClientError as e:
+        if "does not exist" in e.response["Error"].get("Message", ""):
+            return None, None
+        raise
+    if stack["StackStatus"] not in REUSABLE:
+        return stack["StackStatus"], None
+    body = cf_client.get_template(StackName=stack_name, TemplateStage="Original")["TemplateBody"]
+    return stack["StackStatus"], template_fingerprint(body)
+
+
+def check(cf_client, assembly_dir, stack_name=STACK_NAME):
+    """(reusable, reason)"""
+    wanted = template_fingerprint(stack_template(assembly_dir, stack_name))
+    status, deployed = deployed_fingerprint(cf_client, stack_name)
+    if status is None:
+        return False, f"{stack_name} is not deployed"
+    if deployed is None:
+        return False, f"{stack_name} is {status}"
+    if deployed != wanted:
+        return False, f"{stack_name} runs template {deployed[:12]}, cdk.out has {wanted[:12]}"
+    return True, f"{stack_name} already runs template {wanted[:12]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["check"])
+    parser.add_argument("--assembly", default="cdk.out", help="synthesized cloud assembly")
+    parser.add_argument("--stack", default=STACK_NAME)
+    args = parser.parse_args()
+
+    import boto3
+
+    reusable, reason = check(boto3.client("cloudformation"), args.assembly, args.stack)
+    print(("reuse: " if reusable else "deploy: ") + reason)
+    sys.exit(0 if reusable else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,99 @@
+from datetime import datetime
+from typing import Optional, Sequence
+
 from aws_cdk import Stack
 from aws_cdk import aws_s3 as s3
 import aws_cdk as cdk
 
 from constructs import Construct
 
+_RULE_ELEMENTS = {"ID", "Status", "Prefix", "Filter", "Expiration", "Transitions", "NoncurrentVersionExpiration",
+                  "NoncurrentVersionTransitions", "AbortIncompleteMultipartUpload"}
+_FILTER_ELEMENTS = {"Prefix", "Tag", "ObjectSizeGreaterThan", "ObjectSizeLessThan"}
+
+
+def _check(elements, known, where):
+    unknown = set(elements) - known
+    if unknown:
+        raise ValueError(f"unsupported {where} elements: {sorted(unknown)}")
+
+
+def _days(days):
+    return cdk.Duration.days(days) if days is not None else None
+
+
+def _date(value):
+    return datetime.fromisoformat(value) if value is not None else None
+
+
+def _rule_filter(rule):
+    """(prefix, tags, object size greater than, less than) of a rule's Filter or legacy Prefix."""
+    rule_filter = dict(rule.get("Filter", {}))
+    conjunction = rule_filter.pop("And", None)
+    _check(rule_filter, _FILTER_ELEMENTS, "lifecycle rule Filter")
+    if conjunction is not None:
+        if rule_filter:
+            raise ValueError("a lifecycle rule Filter has either And or a single condition")
+        _check(conjunction, _FILTER_ELEMENTS - {"Tag"} | {"Tags"}, "lifecycle rule Filter.And")
+        rule_filter = conjunction
+    tags = rule_filter.get("Tags", [rule_filter["Tag"]] if "Tag" in rule_filter else [])
+    return (rule_filter.get("Prefix", rule.get("Prefix")), {tag["Key"]: tag["Value"] for tag in tags},
+            rule_filter.get("ObjectSizeGreaterThan"), rule_filter.get("ObjectSizeLessThan"))
+
+
+def lifecycle_rule(rule: dict) -> s3.LifecycleRule:
+    """
+        One rule in the shape of PutBucketLifecycleConfiguration, the same
+        shape tests/lifecycle.py simulates, as a CDK LifecycleRule. Every
+        element is mapped, one CDK has no property for raises ValueError
+        instead of being dropped. The simulator covers fewer of them.
+    """
+    _check(rule, _RULE_ELEMENTS, "lifecycle rule")
+    expiration = rule.get("Expiration", {})
+    _check(expiration, {"Days", "Date", "ExpiredObjectDeleteMarker"}, "lifecycle rule Expiration")
+    noncurrent = rule.get("NoncurrentVersionExpiration", {})
+    _check(noncurrent, {"NoncurrentDays", "NewerNoncurrentVersions"}, "lifecycle rule NoncurrentVersionExpiration")
+    abort = rule.get("AbortIncompleteMultipartUpload", {})
+    _check(abort, {"DaysAfterInitiation"}, "lifecycle rule AbortIncompleteMultipartUpload")
+    for transition in rule.get("Transitions", []):
+        _check(transition, {"Days", "Date", "StorageClass"}, "lifecycle rule Transitions")
+    for transition in rule.get("NoncurrentVersionTransitions", []):
+        _check(transition, {"NoncurrentDays", "NewerNoncurrentVersions", "StorageClass"},
+               "lifecycle rule NoncurrentVersionTransitions")
+    prefix, tags, greater_than, less_than = _rule_filter(rule)
+    return s3.LifecycleRule(
+        id=rule.get("ID"),
+        enabled=rule.get("Status", "Enabled") == "Enabled",
+        prefix=prefix or None,
+        tag_filters=tags or None,
+        object_size_greater_than=greater_than,
+        object_size_less_than=less_than,
+        expiration=_days(expiration.get("Days")),
+        expiration_date=_date(expiration.get("Date")),
+        expired_object_delete_marker=expiration.get("ExpiredObjectDeleteMarker"),
+        transitions=[s3.Transition(storage_class=s3.StorageClass(transition["StorageClass"]),
+                                   transition_after=_days(transition.get("Days")),
+                                   transition_date=_date(transition.get("Date")))
+                     for transition in rule.get("Transitions", [])] or None,
+        noncurrent_version_expiration=_days(noncurrent.get("NoncurrentDays")),
+        noncurrent_versions_to_retain=noncurrent.get("NewerNoncurrentVersions"),
+        noncurrent_version_transitions=[
+            s3.NoncurrentVersionTransition(storage_class=s3.StorageClass(transition["StorageClass"]),
+                                           transition_after=_days(transition["NoncurrentDays"]),
+                                           noncurrent_versions_to_retain=transition.get("NewerNoncurrentVersions"))
+            for transition in rule.get("NoncurrentVersionTransitions", [])] or None,
+        abort_incomplete_multipart_upload_after=_days(abort.get("DaysAfterInitiation")),
+    )
+
 class S3Stack(Stack):
-    def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
+    def __init__(self, scope: Construct, construct_id: str,
+                 lifecycle_rules: Optional[Sequence[dict]] = None, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
         bkt = s3.Bucket(self, "S3VersioningBucket",
                   versioned=True,
                   auto_delete_objects=True,
                   removal_policy=cdk.RemovalPolicy.DESTROY,
+                  lifecycle_rules=[lifecycle_rule(rule) for rule in lifecycle_rules or []] or None,
         )
         cdk.CfnOutput(self, "S3BucketName", value=bkt.bucket_name, export_name="S3VersioningBucket12567")
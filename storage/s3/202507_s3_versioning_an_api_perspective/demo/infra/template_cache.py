@@ -0,0 +1,114 @@
+"""
+    Synthesized cloud assemblies cached by what determines them: the infra
+    sources, the CDK context and the installed aws-cdk-lib version. A cache
+    hit copies the assembly to the output directory without importing
+    aws_cdk or starting jsii, which is most of what a synth costs.
+
+    Nothing here imports aws_cdk; app.py decides whether it needs to.
+"""
+import hashlib
+import json
+import os
+import shutil
+from importlib import metadata
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Sources that shape the template
+INPUT_FILES = ("app.py", "s3_stack.py", "cdk.json", "requirements.txt")
+# Set to 1 to synthesize from the cache, see app.py
+REUSE_ENV = "S3_STACK_REUSE"
+CACHE_DIR_ENV = "S3_TEMPLATE_CACHE"
+DEFAULT_CACHE_DIR = os.path.join(HERE, ".template-cache")
+# Environment the CDK CLI hands to the app
+CONTEXT_ENV = "CDK_CONTEXT_JSON"
+CONTEXT_OVERFLOW_ENV = "CONTEXT_OVERFLOW_LOCATION"
+OUTDIR_ENV = "CDK_OUTDIR"
+
+
+def cli_context():
+    """The context the CDK CLI passes to the app, {} when run without it."""
+    overflow = os.environ.get(CONTEXT_OVERFLOW_ENV)
+    if overflow:
+        with open(overflow) as f:
+            return json.load(f)
+    return json.loads(os.environ.get(CONTEXT_ENV) or "{}")
+
+
+def _version(distribution):
+    try:
+        return metadata.version(distribution)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def input_fingerprint(context, root=HERE):
+    """sha256 over the sources, the context and the CDK library versions."""
+    digest = hashlib.sha256()
+    for name in INPUT_FILES:
+        path = os.path.join(root, name)
+        digest.update(name.encode() + b"\0")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        digest.update(b"\0")
+    lifecycle_rules = context.get("lifecycle_rules")
+    if isinstance(lifecycle_rules, str) and os.path.exists(lifecycle_rules):
+        # The context only names the file, its content shapes the template
+        with open(lifecycle_rules, "rb") as f:
+            digest.update(f.read())
+    digest.update(json.dumps(context, sort_keys=True).encode())
+    digest.update(json.dumps([_version("aws-cdk-lib"), _version("constructs")]).encode())
+    return digest.hexdigest()
+
+
+def template_fingerprint(template):
+    """sha256 of a template, independent of key order and whitespace; template is a dict or JSON text."""
+    if isinstance(template, str):
+        template = json.loads(template)
+    return hashlib.sha256(json.dumps(template, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def stack_template(assembly_dir, stack_name):
+    """The template of stack_name in a synthesized cloud assembly, as a dict."""
+    with open(os.path.join(assembly_dir, "manifest.json")) as f:
+        manifest = json.load(f)
+    artifact = manifest["artifacts"].get(stack_name)
+    if artifact is None:
+        raise ValueError(f"no stack {stack_name} in {assembly_dir}")
+    with open(os.path.join(assembly_dir, artifact["properties"]["templateFile"])) as f:
+        return json.load(f)
+
+
+class TemplateCache:
+    def __init__(self, root=None, keep=5):
+        self.root = root or os.environ.get(CACHE_DIR_ENV) or DEFAULT_CACHE_DIR
+        # Assemblies kept, the least recently used go first
+        self.keep = keep
+
+    def _path(self, fingerprint):
+        return os.path.join(self.root, fingerprint)
+
+    def restore(self, fingerprint, outdir):
+        """Copy the cached assembly of fingerprint to outdir; False on a miss."""
+        path = self._path(fingerprint)
+        if not os.path.exists(os.path.join(path, "manifest.json")):
+            return False
+        shutil.copytree(path, outdir, dirs_exist_ok=True)
+        os.utime(path)
+        return True
+
+    def store(self, fingerprint, assembly_dir):
+        path = self._path(fingerprint)
+        tmp = f"{path}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        shutil.copytree(assembly_dir, tmp)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+        self.prune()
+
+    def prune(self):
+        entries = sorted((entry for entry in os.scandir(self.root)
+                          if entry.is_dir() and not entry.name.endswith(".tmp")),
+                         key=lambda entry: entry.stat().st_mtime, reverse=True)
+        for entry in entries[self.keep:]:
+            shutil.rmtree(entry.path, ignore_errors=True)
@@ -0,0 +1,69 @@
+import boto3
+import pytest
+from botocore.stub import Stubber
+
+from reuse import STACK_NAME, check
+from template_cache import template_fingerprint
+from test_template_cache import make_assembly
+
+TEMPLATE = {"Resources": {"Bucket": {"Type": "AWS::S3::Bucket"}}}
+
+
+@pytest.fixture
+def cf_client():
+    client = boto3.client("cloudformation", region_name="us-east-1",
+                          aws_access_key_id="testing", aws_secret_access_key="testing")
+    with Stubber(client) as stubber:
+        yield client, stubber
+        stubber.assert_no_pending_responses()
+
+@pytest.fixture
+def assembly(tmp_path):
+    return make_assembly(tmp_path / "cdk.out", TEMPLATE)
+
+def deployed(stubber, status, template=None):
+    stubber.add_response("describe_stacks", {"Stacks": [{
+        "StackName": STACK_NAME, "StackStatus": status, "CreationTime": "2025-07-01T00:00:00Z"}]},
+        {"StackName": STACK_NAME})
+    if template is not None:
+        stubber.add_response("get_template", {"TemplateBody": template},
+                             {"StackName": STACK_NAME, "TemplateStage": "Original"})
+
+
+def test_an_identical_deployed_template_is_reused(cf_client, assembly):
+    client, stubber = cf_client
+    # Same template, other key order and whitespace
+    deployed(stubber, "UPDATE_COMPLETE", '{"Resources": {"Bucket": {"Type": "AWS::S3::Bucket"}}}')
+
+    reusable, reason = check(client, assembly)
+    assert reusable
+    assert template_fingerprint(TEMPLATE)[:12] in reason
+
+def test_a_changed_template_is_deployed(cf_client, assembly):
+    client, stubber = cf_client
+    deployed(stubber, "CREATE_COMPLETE", '{"Resources": {}}')
+
+    assert check(client, assembly)[0] is False
+
+@pytest.mark.parametrize("status", ["UPDATE_IN_PROGRESS", "ROLLBACK_COMPLETE", "DELETE_FAILED"])
+def test_a_stack_in_another_state_is_deployed_without_reading_its_template(cf_client, assembly, status):
+    client, stubber = cf_client
+    deployed(stubber, status)
+
+    reusable, reason = check(client, assembly)
+    assert not reusable
+    assert status in reason
+
+def test_a_missing_stack_is_deployed(cf_client, assembly):
+    client, stubber = cf_client
+    stubber.add_client_error("describe_stacks", "ValidationError",
+                             f"Stack with id {STACK_NAME} does not exist", expected_params={"StackName": STACK_NAME})
+
+    assert check(client, assembly) == (False, f"{STACK_NAME} is not deployed")
+
+def test_other_errors_are_raised(cf_client, assembly):
+    client, stubber = cf_client
+    stubber.add_client_error("describe_stacks", "Throttling", "Rate exceeded")
+
+    with pytest.raises(client.exceptions.ClientError):
+        check(client, assembly)
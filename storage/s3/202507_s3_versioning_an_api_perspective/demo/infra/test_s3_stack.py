@@ -0,0 +1,61 @@
+import aws_cdk as cdk
+import pytest
+from aws_cdk.assertions import Template
+
+from s3_stack import S3Stack, lifecycle_rule
+
+
+def lifecycle_rules(rules):
+    app = cdk.App()
+    stack = S3Stack(app, "Stack", lifecycle_rules=rules)
+    bucket, = Template.from_stack(stack).find_resources("AWS::S3::Bucket").values()
+    return bucket["Properties"]["LifecycleConfiguration"]["Rules"]
+
+
+def test_tag_filtered_rule_keeps_filter_and_expirations():
+    rules = lifecycle_rules([{
+        "ID": "r",
+        "Status": "Enabled",
+        "Filter": {"Tag": {"Key": "tier", "Value": "scratch"}},
+        "Expiration": {"Days": 30},
+        "NoncurrentVersionExpiration": {"NoncurrentDays": 7},
+    }])
+
+    assert rules == [{
+        "Id": "r",
+        "Status": "Enabled",
+        "TagFilters": [{"Key": "tier", "Value": "scratch"}],
+        "ExpirationInDays": 30,
+        "NoncurrentVersionExpiration": {"NoncurrentDays": 7},
+    }]
+
+def test_and_filter_transitions_and_expiration_only_rule():
+    rules = lifecycle_rules([
+        {
+            "ID": "and",
+            "Filter": {"And": {"Prefix": "logs/", "Tags": [{"Key": "a", "Value": "1"}],
+                               "ObjectSizeGreaterThan": 128}},
+            "Transitions": [{"Days": 30, "StorageClass": "GLACIER"}],
+            "NoncurrentVersionTransitions": [{"NoncurrentDays": 10, "StorageClass": "STANDARD_IA",
+                                              "NewerNoncurrentVersions": 2}],
+        },
+        {"ID": "expire", "Expiration": {"Days": 1}},
+    ])
+
+    assert rules[0]["Prefix"] == "logs/"
+    assert rules[0]["TagFilters"] == [{"Key": "a", "Value": "1"}]
+    assert rules[0]["ObjectSizeGreaterThan"] == 128
+    assert rules[0]["Transitions"] == [{"StorageClass": "GLACIER", "TransitionInDays": 30}]
+    assert rules[0]["NoncurrentVersionTransitions"] == [
+        {"StorageClass": "STANDARD_IA", "TransitionInDays": 10, "NewerNoncurrentVersions": 2}]
+    assert rules[1] == {"Id": "expire", "Status": "Enabled", "ExpirationInDays": 1}
+
+@pytest.mark.parametrize("rule", [
+    {"ID": "r", "Filter": {"Prefix": "a/", "Unknown": 1}, "Expiration": {"Days": 1}},
+    {"ID": "r", "Expiration": {"Days": 1, "Later": True}},
+    {"ID": "r", "Filter": {"Prefix": "a/", "And": {"Prefix": "b/"}}, "Expiration": {"Days": 1}},
+    {"ID": "r", "Expiration": {"Days": 1}, "Unknown": {}},
+])
+def test_unsupported_elements_raise(rule):
+    with pytest.raises(ValueError):
+        lifecycle_rule(rule)
@@ -0,0 +1,69 @@
+import json
+import os
+
+import pytest
+
+from template_cache import TemplateCache, input_fingerprint, stack_template, template_fingerprint
+
+STACK_NAME = "S3VersioningApiPerspectiveStack"
+
+
+def make_assembly(path, template):
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, "manifest.json"), "w") as f:
+        json.dump({"artifacts": {STACK_NAME: {"properties": {"templateFile": f"{STACK_NAME}.template.json"}}}}, f)
+    with open(os.path.join(path, f"{STACK_NAME}.template.json"), "w") as f:
+        json.dump(template, f)
+    return str(path)
+
+@pytest.fixture
+def sources(tmp_path):
+    root = tmp_path / "infra"
+    root.mkdir()
+    for name in ("app.py", "s3_stack.py", "cdk.json"):
+        (root / name).write_text(f"# {name}\n")
+    return root
+
+
+def test_restore_misses_until_an_assembly_is_stored(tmp_path):
+    cache = TemplateCache(tmp_path / "cache")
+    assembly = make_assembly(tmp_path / "cdk.out", {"Resources": {"Bucket": {"Type": "AWS::S3::Bucket"}}})
+
+    assert not cache.restore("abc", tmp_path / "out")
+    assert not (tmp_path / "out").exists()
+
+    cache.store("abc", assembly)
+    assert cache.restore("abc", tmp_path / "out")
+    assert stack_template(tmp_path / "out", STACK_NAME) == stack_template(assembly, STACK_NAME)
+
+def test_store_keeps_the_most_recently_used(tmp_path):
+    cache = TemplateCache(tmp_path / "cache", keep=2)
+    assembly = make_assembly(tmp_path / "cdk.out", {})
+    for i, fingerprint in enumerate(("a", "b", "c")):
+        cache.store(fingerprint, assembly)
+        os.utime(tmp_path / "cache" / fingerprint, (i, i))
+
+    cache.prune()
+    assert sorted(os.listdir(tmp_path / "cache")) == ["b", "c"]
+
+def test_input_fingerprint_follows_sources_context_and_rules_file(sources, tmp_path):
+    fingerprint = input_fingerprint({}, root=sources)
+    assert input_fingerprint({}, root=sources) == fingerprint
+
+    (sources / "s3_stack.py").write_text("# changed\n")
+    changed = input_fingerprint({}, root=sources)
+    assert changed != fingerprint
+
+    rules = tmp_path / "rules.json"
+    rules.write_text('{"Rules": []}')
+    with_rules = input_fingerprint({"lifecycle_rules": str(rules)}, root=sources)
+    assert with_rules != changed
+    rules.write_text('{"Rules": [{"ID": "expire"}]}')
+    assert input_fingerprint({"lifecycle_rules": str(rules)}, root=sources) != with_rules
+
+def test_template_fingerprint_ignores_key_order_and_whitespace():
+    template = {"Resources": {"Bucket": {"Type": "AWS::S3::Bucket", "Properties": {}}}}
+    assert template_fingerprint(template) == template_fingerprint(json.dumps(template, indent=2))
+    assert template_fingerprint(template) == template_fingerprint(
+        '{"Resources":{"Bucket":{"Properties":{},"Type":"AWS::S3::Bucket"}}}')
+    assert template_fingerprint(template) != template_fingerprint({"Resources": {}})
@@ -0,0 +1,132 @@
+"""
+    asyncio surface over a boto3 S3 client: every operation becomes a
+    coroutine that runs the blocking call on a thread pool, with at most
+    max_concurrency calls in flight.
+
+    Writes that create or remove versions of one key are serialized per key
+    in the order they were awaited, so gathering several PUTs of the same
+    key still produces the versions in submission order, while writes of
+    different keys, reads and listings run concurrently.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from purge import MAX_BATCH_SIZE, PurgeResult, check_attempts, delete_batch, iter_batches, list_entries
+
+# Operations that change the version chain of the key named by their Key argument
+KEY_WRITES = frozenset({
+    "put_object", "delete_object", "copy_object", "complete_multipart_upload",
+})
+
+
+class _KeyLocks:
+    """One asyncio.Lock per key with waiters, dropped when the last holder leaves."""
+
+    def __init__(self):
+        self._locks = {}
+
+    async def __call__(self, key, call):
+        lock, users = self._locks.get(key, (None, 0))
+        lock = lock or asyncio.Lock()
+        self._locks[key] = lock, users + 1
+        try:
+            async with lock:
+                return await call()
+        finally:
+            lock, users = self._locks[key]
+            if users == 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = lock, users - 1
+
+    def __len__(self):
+        return len(self._locks)
+
+
+class AsyncS3Client:
+    def __init__(self, s3_client, max_concurrency=16):
+        self.sync = s3_client
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="aio-s3")
+        # Created on first use, inside the running event loop
+        self._semaphore = None
+        self._key_locks = _KeyLocks()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    async def run(self, fn, *args, **kwargs):
+        """Run any blocking callable on the pool, counted against max_concurrency."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, lambda: fn(*args, **kwargs))
+
+    def __getattr__(self, name):
+        operation = getattr(self.sync, name)
+        if not callable(operation):
+            return operation
+
+        async def call(**kwargs):
+            if name in KEY_WRITES:
+                # The lock is taken before a pool slot, a queued write holds no slot
+                return await self._key_locks((kwargs["Bucket"], kwargs["Key"]),
+                                             lambda: self.run(operation, **kwargs))
+            return await self.run(operation, **kwargs)
+
+        call.__name__ = name
+        return call
+
+    async def paginate(self, operation_name, **kwargs):
+        """Async iterator over the pages of a paginated operation, one page in flight."""
+        pages = iter(self.sync.get_paginator(operation_name).paginate(**kwargs))
+        done = object()
+        while (page := await self.run(next, pages, done)) is not done:
+            yield page
+
+
+async def purge_prefix_async(s3_client, bucket_name, prefix, max_workers=8, batch_size=MAX_BATCH_SIZE,
+                             page_size=MAX_BATCH_SIZE, max_attempts=5, backoff=0.1):
+    """
+        purge.purge_prefix on an AsyncS3Client: batches are deleted while the
+        listing goes on, with at most max_workers of them listed but not yet
+        deleted.
+    """
+    check_attempts(max_attempts)
+    start = time.perf_counter()
+    result = PurgeResult()
+    batches = iter_batches(list_entries(s3_client.sync, bucket_name, prefix, page_size), batch_size)
+    slots = asyncio.Semaphore(max_workers)
+
+    async def delete(batch):
+        try:
+            return await s3_client.run(delete_batch, s3_client.sync, bucket_name, batch, max_attempts, backoff)
+        finally:
+            slots.release()
+
+    in_flight = []
+    try:
+        while True:
+            await slots.acquire()
+            for task in [task for task in in_flight if task.done()]:
+                in_flight.remove(task)
+                result.merge(task.result())
+            batch = await s3_client.run(next, batches, None)
+            if batch is None:
+                break
+            in_flight.append(asyncio.create_task(delete(batch)))
+        for batch_result in await asyncio.gather(*in_flight):
+            result.merge(batch_result)
+    finally:
+        # A failed batch ends the listing, the ones in flight still finish
+        await asyncio.gather(*in_flight, return_exceptions=True)
+    result.elapsed = time.perf_counter() - start
+    return result
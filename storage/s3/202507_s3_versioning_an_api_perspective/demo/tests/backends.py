@@ -0,0 +1,228 @@
+import os
+import threading
+from xml.etree import ElementTree
+
+from botocore.awsrequest import AWSResponse
+
+from resources import ExportResolver, TimedResource, make_s3_client
+
+EXPORT_NAME = "S3VersioningBucket12567"
+BACKEND_ENV = "S3_BACKEND"
+DEFAULT_BACKEND = "aws"
+
+# moto keeps every bucket in one process-wide store
+_moto_lock = threading.Lock()
+
+
+def serialize_moto_requests(s3_client):
+    """
+        Let moto answer s3_client's requests one at a time. Its store is not
+        thread-safe: a listing racing a delete_objects of another thread
+        fails inside moto. Requests are still built and parsed concurrently.
+    """
+    from moto.core.models import botocore_stubber
+
+    def send(request, **kwargs):
+        with _moto_lock:
+            return botocore_stubber(request=request, **kwargs)
+
+    # In place of moto's own handler, every before-send handler is called
+    s3_client.meta.events.unregister("before-send", botocore_stubber)
+    s3_client.meta.events.register("before-send", send)
+
+
+class AwsBackend:
+    """The bucket deployed by S3Stack, found through its CloudFormation export."""
+    name = "aws"
+
+    def __init__(self):
+        self._exports = ExportResolver()
+        self._client = TimedResource(make_s3_client)
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def bucket_name(self):
+        return self._exports.get(EXPORT_NAME)
+
+    def client(self):
+        return self._client.get()
+
+    def setup_seconds(self):
+        """The one-time cost of the export lookup and the client, what each test paid before they were shared."""
+        return self._exports.lookup_seconds + self._client.seconds
+
+    def snapshot(self):
+        """None: the bucket state cannot be copied, tests isolate through fresh keys instead."""
+        return None
+
+
+class MotoBackend:
+    """An in-process versioned bucket emulated by moto, no AWS account required."""
+    name = "moto"
+    bucket = "s3-versioning-local"
+    _env = {
+        "AWS_ACCESS_KEY_ID": "testing",
+        "AWS_SECRET_ACCESS_KEY": "testing",
+        "AWS_SESSION_TOKEN": "testing",
+        "AWS_DEFAULT_REGION": "us-east-1",
+    }
+
+    def __init__(self):
+        self._mock = None
+        self._saved_env = {}
+        self._client = TimedResource(self._make_client)
+
+    def start(self):
+        from moto import mock_aws
+
+        # Never let a local run pick up real credentials
+        self._saved_env = {name: os.environ.get(name) for name in self._env}
+        os.environ.update(self._env)
+        self._mock = mock_aws()
+        self._mock.start()
+        client = self.client()
+        client.create_bucket(Bucket=self.bucket)
+        client.put_bucket_versioning(Bucket=self.bucket, VersioningConfiguration={"Status": "Enabled"})
+
+    def stop(self):
+        self._mock.stop()
+        for name, value in self._saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    def bucket_name(self):
+        return self.bucket
+
+    def client(self):
+        return self._client.get()
+
+    def setup_seconds(self):
+        return self._client.seconds
+
+    def snapshot(self):
+        """None: the bucket state cannot be copied, tests isolate through fresh keys instead."""
+        return None
+
+    def _make_client(self):
+        client = make_s3_client()
+        serialize_moto_requests(client)
+        client.meta.events.register("before-parameter-build.s3.GetObject", self._remember_get_params)
+        # Not before-call.s3.GetObject: the more specific event runs ahead of an
+        # S3CallRecorder's before-call.s3 and its answer would skip the recorder
+        client.meta.events.register("before-call.s3", self._delete_marker_get)
+        # Ahead of any handler reading the body, such as version_stream.track_listing_order
+        client.meta.events.register_first("before-parse.s3.ListObjectVersions", self._interleave_versions)
+        return client
+
+    @staticmethod
+    def _interleave_versions(response_dict, **kwargs):
+        # moto renders every <Version> of a page, then every <DeleteMarker>, S3 interleaves
+        # them newest first per key. LastModified has whole seconds and cannot restore that
+        # order, moto's per-key history in write order can.
+        from moto.core import DEFAULT_ACCOUNT_ID
+        from moto.s3.models import s3_backends
+
+        if response_dict["status_code"] >= 300 or not response_dict["body"]:
+            return
+        root = ElementTree.fromstring(response_dict["body"])
+        ns = root.tag.rpartition("}")[0] + "}" if root.tag.startswith("{") else ""
+        entries = [child for child in root if child.tag in (ns + "Version", ns + "DeleteMarker")]
+        if not entries:
+            return
+        bucket = s3_backends[DEFAULT_ACCOUNT_ID]["aws"].get_bucket(root.findtext(ns + "Name"))
+        age, newest = {}, set()
+        for key in {entry.findtext(ns + "Key") for entry in entries}:
+            history = bucket.keys.getlist(key, [])
+            age.update((version.version_id, len(history) - i) for i, version in enumerate(history))
+            if history:
+                newest.add(history[-1].version_id)
+        entries.sort(key=lambda entry: (entry.findtext(ns + "Key"), age.get(entry.findtext(ns + "VersionId"), 0)))
+        start = list(root).index(entries[0])
+        for entry in entries:
+            root.remove(entry)
+            entry.find(ns + "IsLatest").text = str(entry.findtext(ns + "VersionId") in newest).lower()
+        root[start:start] = entries
+        response_dict["body"] = ElementTree.tostring(root)
+
+    @staticmethod
+    def _remember_get_params(params, context, **kwargs):
+        context["moto_get_params"] = dict(params)
+
+    @staticmethod
+    def _delete_marker_get(context, **kwargs):
+        # moto answers a version-specific GET of a delete marker with NoSuchVersion,
+        # S3 with 405 MethodNotAllowed. Look the version up in moto's store, a HEAD
+        # probe would show up as one more request in every recorder and metric.
+        from moto.core import DEFAULT_ACCOUNT_ID
+        from moto.s3.models import FakeDeleteMarker, s3_backends
+
+        params = context.get("moto_get_params", {})
+        if "VersionId" not in params:
+            return None
+        with _moto_lock:
+            bucket = s3_backends[DEFAULT_ACCOUNT_ID]["aws"].buckets.get(params["Bucket"])
+            history = bucket.keys.getlist(params["Key"], []) if bucket else []
+            is_marker = any(isinstance(version, FakeDeleteMarker) and version.version_id == params["VersionId"]
+                            for version in history)
+        if not is_marker:
+            return None
+        return AWSResponse(None, 405, {}, None), {
+            "Error": {"Code": "MethodNotAllowed",
+                      "Message": "The specified method is not allowed against this resource."},
+            "ResponseMetadata": {"HTTPStatusCode": 405},
+        }
+
+
+class NativeBackend:
+    """An in-process versioned bucket on the indexed VersionStore, the fastest local option."""
+    name = "native"
+    bucket = "s3-versioning-local"
+
+    def __init__(self):
+        self._s3 = None
+        self._client = None
+
+    def start(self):
+        from local_s3 import LocalS3
+
+        self._s3 = LocalS3()
+        self._client = self._s3.client()
+        client = self.client()
+        client.create_bucket(Bucket=self.bucket)
+        client.put_bucket_versioning(Bucket=self.bucket, VersioningConfiguration={"Status": "Enabled"})
+
+    def stop(self):
+        self._s3 = self._client = None
+
+    def bucket_name(self):
+        return self.bucket
+
+    def client(self):
+        return self._client
+
+    def setup_seconds(self):
+        return 0.0
+
+    def snapshot(self):
+        """Copy-on-write state of the emulated account, see restore()."""
+        return self._s3.snapshot()
+
+    def restore(self, snapshot):
+        self._s3.restore(snapshot)
+
+
+BACKENDS = {backend.name: backend for backend in (AwsBackend, MotoBackend, NativeBackend)}
+
+
+def make_backend(name=None):
+    name = name or os.environ.get(BACKEND_ENV, DEFAULT_BACKEND)
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"unknown S3 backend {name!r}, expected one of {sorted(BACKENDS)}") from None
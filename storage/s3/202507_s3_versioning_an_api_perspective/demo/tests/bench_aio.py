@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+    The serial test pattern against AsyncS3Client on the native backend with
+    injected latency: write keys x versions, HEAD every key, purge in
+    batches. Versions of one key stay ordered in both runs.
+
+    python bench_aio.py --keys 50 --versions 4 --rtt-ms 20 --concurrency 16
+"""
+import argparse
+import asyncio
+import time
+
+from aio_s3 import AsyncS3Client, purge_prefix_async
+from local_s3 import LocalS3
+from network import PROFILES, NetworkProfile, NetworkShim
+from purge import purge_prefix
+
+BUCKET = "bench-aio"
+PREFIX = "aio/"
+# Small batches, so a handful of deletes can go out side by side
+BATCH_SIZE = 20
+
+
+def serial(s3_client, keys, versions):
+    timings = {}
+    start = time.perf_counter()
+    for key in keys:
+        for v in range(versions):
+            s3_client.put_object(Bucket=BUCKET, Key=key, Body=f"v{v}".encode())
+    timings["put"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in keys:
+        s3_client.head_object(Bucket=BUCKET, Key=key)
+    timings["head"] = time.perf_counter() - start
+
+    timings["purge"] = purge_prefix(s3_client, BUCKET, PREFIX, max_workers=1, batch_size=BATCH_SIZE).elapsed
+    return timings
+
+
+async def concurrent(s3_async, keys, versions):
+    timings = {}
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        s3_async.put_object(Bucket=BUCKET, Key=key, Body=f"v{v}".encode())
+        for key in keys for v in range(versions)
+    ))
+    timings["put"] = time.perf_counter() - start
+    await s3_async.run(check_order, s3_async.sync, keys[:3], versions)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(s3_async.head_object(Bucket=BUCKET, Key=key) for key in keys))
+    timings["head"] = time.perf_counter() - start
+
+    timings["purge"] = (await purge_prefix_async(s3_async, BUCKET, PREFIX, batch_size=BATCH_SIZE)).elapsed
+    return timings
+
+
+def check_order(s3_client, keys, versions):
+    for key in keys:
+        listed = s3_client.list_object_versions(Bucket=BUCKET, Prefix=key)["Versions"]
+        bodies = [s3_client.get_object(Bucket=BUCKET, Key=key, VersionId=v["VersionId"])["Body"].read()
+                  for v in listed]
+        assert bodies == [f"v{v}".encode() for v in reversed(range(versions))], key
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=50)
+    parser.add_argument("--versions", type=int, default=4)
+    parser.add_argument("--rtt-ms", type=float, default=20.0)
+    parser.add_argument("--network", choices=sorted(PROFILES), help="a simulated network profile instead of --rtt-ms")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    s3_client = LocalS3().client()
+    s3_client.create_bucket(Bucket=BUCKET)
+    s3_client.put_bucket_versioning(Bucket=BUCKET, VersioningConfiguration={"Status": "Enabled"})
+    profile = PROFILES[args.network] if args.network else NetworkProfile.fixed(args.rtt_ms)
+    NetworkShim(profile, args.seed).attach(s3_client)
+    keys = [f"{PREFIX}key{k:04d}" for k in range(args.keys)]
+
+    baseline = serial(s3_client, keys, args.versions)
+
+    async def concurrently():
+        async with AsyncS3Client(s3_client, args.concurrency) as s3_async:
+            return await concurrent(s3_async, keys, args.versions)
+    timings = asyncio.run(concurrently())
+
+    network = f"network {args.network}" if args.network else f"{args.rtt_ms}ms RTT"
+    print(f"{args.keys} keys x {args.versions} versions, {network}, concurrency {args.concurrency}")
+    print(f"{'step':<6} {'serial s':>9} {'async s':>8} {'speedup':>8}")
+    for step in baseline:
+        print(f"{step:<6} {baseline[step]:>9.2f} {timings[step]:>8.2f} {baseline[step] / timings[step]:>7.1f}x")
+    total, async_total = sum(baseline.values()), sum(timings.values())
+    print(f"{'total':<6} {total:>9.2f} {async_total:>8.2f} {total / async_total:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+    Run the suite once per S3 backend (and pytest-xdist worker count) and
+    compare the timings.
+
+    python bench_backends.py --backends moto aws --workers 1 4 8
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from backends import BACKENDS
+
+
+def run_suite(backend, workers, pytest_args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "timings.json")
+        cmd = [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider",
+               f"--s3-backend={backend}", f"--s3-timings={path}", *pytest_args]
+        if workers > 1:
+            cmd += ["-n", str(workers)]
+        start = time.perf_counter()
+        completed = subprocess.run(cmd, cwd=os.path.dirname(os.path.abspath(__file__)))
+        wall = time.perf_counter() - start
+        if not os.path.exists(path):
+            raise SystemExit(f"pytest run for backend {backend} produced no timings (exit {completed.returncode})")
+        with open(path) as f:
+            timings = json.load(f)
+    timings["exit"] = completed.returncode
+    timings["wall"] = wall
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", choices=sorted(BACKENDS), default=["moto"])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1],
+                        help="pytest-xdist worker counts, every worker gets its own key namespace")
+    parser.add_argument("--slowest", type=int, default=5, help="show the n slowest tests of each backend")
+    parser.add_argument("pytest_args", nargs="*", help="passed to pytest, e.g. a test file")
+    args = parser.parse_args()
+
+    runs = {
+        (backend, workers): run_suite(backend, workers, args.pytest_args)
+        for backend in args.backends
+        for workers in args.workers
+    }
+
+    print()
+    print(f"{'backend':<10} {'workers':>7} {'exit':>4} {'tests':>6} {'wall s':>8} {'total s':>9} {'mean ms':>9}")
+    for (backend, workers), timings in runs.items():
+        count = len(timings["tests"])
+        print(f"{backend:<10} {workers:>7} {timings['exit']:>4} {count:>6} {timings['wall']:>8.2f} "
+              f"{timings['total']:>9.3f} {1000 * timings['total'] / max(count, 1):>9.1f}")
+
+    for (backend, workers), timings in runs.items():
+        print(f"\nslowest on {backend} with {workers} worker(s):")
+        slowest = sorted(timings["tests"].items(), key=lambda item: item[1], reverse=True)
+        for nodeid, seconds in slowest[:args.slowest]:
+            print(f"  {1000 * seconds:>9.1f} ms  {nodeid}")
+
+
+if __name__ == "__main__":
+    main()
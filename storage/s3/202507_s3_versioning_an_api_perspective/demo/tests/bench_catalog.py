@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+    Offline queries over a version history exported to a columnar catalog,
+    against answering the same question by listing the prefix again, on the
+    native backend. The history spans the last days over a few top-level
+    prefixes, a share of the writes are delete markers.
+
+    python bench_catalog.py --keys 100000 --versions 10
+    python bench_catalog.py --keys 20000 --network s3
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from catalog import VersionCatalog
+from local_s3 import LocalS3
+from network import PROFILES, NetworkShim
+from version_stream import iter_versions
+
+BUCKET = "bench-catalog"
+AREAS = ("delete_object/", "get_object/", "put_object/", "list_objects/")
+DAY = 86400
+
+
+def populate(s3, clock, args):
+    """Writes in time order, every key gets versions spread over the last days."""
+    rng = random.Random(args.seed)
+    store = s3.buckets[BUCKET].store
+    start = clock[0] - args.days * DAY
+    writes = sorted((start + rng.random() * args.days * DAY, k) for k in range(args.keys)
+                    for _ in range(args.versions))
+    for at, k in writes:
+        clock[0] = at
+        key = f"{AREAS[k % len(AREAS)]}key{k:07d}"
+        if rng.random() < args.delete_ratio:
+            store.add_delete_marker(key)
+        else:
+            store.put(key, b"x" * (k % 1024))
+    clock[0] = start + args.days * DAY
+
+
+def listed_markers(s3_client, prefix, since):
+    """The question answered the online way: keys below prefix with > 2 delete markers since."""
+    markers = Counter(entry.key for entry in iter_versions(s3_client, BUCKET, prefix)
+                      if entry.is_delete_marker and entry.last_modified >= since)
+    return {key for key, n in markers.items() if n > 2}
+
+
+def catalog_markers(catalog, prefix, since):
+    markers = catalog.count_by_key(catalog.select(prefix=prefix, since=since, delete_markers=True))
+    return {key for key, n in markers.items() if n > 2}
+
+
+def timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return value, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--versions", type=int, default=10, help="writes per key")
+    parser.add_argument("--days", type=int, default=30, help="the history spans the last days")
+    parser.add_argument("--delete-ratio", type=float, default=0.2, help="share of writes that are delete markers")
+    parser.add_argument("--change", type=float, default=0.01, help="share of keys written again before the append")
+    parser.add_argument("--network", choices=sorted(PROFILES), default="none")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    clock = [time.time()]
+    s3 = LocalS3(clock=lambda: clock[0])
+    s3_client = s3.client()
+    s3_client.create_bucket(Bucket=BUCKET)
+    s3_client.put_bucket_versioning(Bucket=BUCKET, VersioningConfiguration={"Status": "Enabled"})
+    populate(s3, clock, args)
+    NetworkShim.named(args.network, args.seed).attach(s3_client)
+    since = datetime.fromtimestamp(clock[0], timezone.utc) - timedelta(days=7)
+    versions = len(s3.buckets[BUCKET].store)
+    print(f"{args.keys} keys, {versions} versions over {args.days} days, network {args.network}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "catalog")
+        def now():
+            return clock[0]
+
+        catalog, elapsed = timed(lambda: VersionCatalog.export(s3_client, BUCKET, "", path, clock=now))
+        catalog.close()
+        size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+        print(f"export: {elapsed:.2f}s, {size / 2 ** 20:.1f} MiB on disk, {size / versions:.0f} bytes per row")
+
+        catalog, elapsed = timed(lambda: VersionCatalog(path))
+        print(f"open: {elapsed * 1000:.1f}ms")
+        listed, list_s = timed(lambda: listed_markers(s3_client, "delete_object/", since))
+        found, catalog_s = timed(lambda: catalog_markers(catalog, "delete_object/", since))
+        assert found == listed
+        print(f"keys below delete_object/ with > 2 delete markers in the last week: {len(found)}, "
+              f"listing {list_s * 1000:.0f}ms, catalog {catalog_s * 1000:.0f}ms")
+        for name, query in (("totals", catalog.totals),
+                            ("delete markers", lambda: len(catalog.select(delete_markers=True))),
+                            ("last week", lambda: len(catalog.select(since=since))),
+                            ("latest per key", lambda: len(catalog.latest()))):
+            value, elapsed = timed(query)
+            print(f"  {name:<16} {elapsed * 1000:>8.1f}ms  {value}")
+
+        rng = random.Random(args.seed + 1)
+        store = s3.buckets[BUCKET].store
+        for k in rng.sample(range(args.keys), int(args.keys * args.change)):
+            clock[0] += 1
+            store.put(f"{AREAS[k % len(AREAS)]}key{k:07d}", b"changed")
+        added, elapsed = timed(lambda: catalog.append(s3_client, clock=now))
+        print(f"append: {added} rows in {elapsed:.2f}s, {len(catalog)} rows in all")
+        catalog.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+    Delete-marker compaction on the native backend: most keys have a short
+    history, a share carries a run of markers, and a few carry thousands.
+    ListObjectVersions over the prefix is timed page by page before and
+    after compaction; with --network every page also pays a simulated
+    round trip.
+
+    python bench_compaction.py --keys 20000 --stacked 0.2 --hot 5 --hot-markers 5000
+    python bench_compaction.py --keys 5000 --network s3 --keep oldest
+"""
+import argparse
+import random
+import statistics
+import time
+
+from compaction import KEEP, compact
+from local_s3 import LocalS3
+from network import PROFILES, NetworkShim
+
+BUCKET = "bench-compaction"
+PREFIX = "compaction/"
+
+
+def populate(s3, args, rng):
+    store = s3.buckets[BUCKET].store
+    hot = set(rng.sample(range(args.keys), args.hot))
+    for k in range(args.keys):
+        key = f"{PREFIX}key{k:07d}"
+        store.put(key, b"v1")
+        if k in hot:
+            markers = args.hot_markers
+        elif rng.random() < args.stacked:
+            markers = rng.randint(2, args.max_markers)
+        else:
+            markers = rng.random() < 0.1
+        for _ in range(markers):
+            store.add_delete_marker(key)
+        if markers and rng.random() < args.expired:
+            # The version expired, only markers are left
+            store.remove_version(key, store.history(key)[-1].version_id)
+
+
+def list_pages(s3_client):
+    """(pages, entries, seconds per page)"""
+    seconds, entries = [], 0
+    kwargs = {"Bucket": BUCKET, "Prefix": PREFIX}
+    while True:
+        start = time.perf_counter()
+        page = s3_client.list_object_versions(**kwargs)
+        seconds.append(time.perf_counter() - start)
+        entries += len(page.get("Versions", [])) + len(page.get("DeleteMarkers", []))
+        if not page["IsTruncated"]:
+            return len(seconds), entries, seconds
+        kwargs.update(KeyMarker=page["NextKeyMarker"], VersionIdMarker=page["NextVersionIdMarker"])
+
+
+def print_listing(name, listing):
+    pages, entries, seconds = listing
+    print(f"{name:<7} {pages:>6} pages {entries:>9} entries, {sum(seconds):>7.2f}s, "
+          f"page median {statistics.median(seconds) * 1000:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=20_000)
+    parser.add_argument("--stacked", type=float, default=0.2, help="share of keys with a run of markers")
+    parser.add_argument("--max-markers", type=int, default=20, help="longest run on a stacked key")
+    parser.add_argument("--hot", type=int, default=5, help="keys with --hot-markers markers")
+    parser.add_argument("--hot-markers", type=int, default=5000)
+    parser.add_argument("--expired", type=float, default=0.05, help="share of marked keys without a version left")
+    parser.add_argument("--keep", choices=KEEP, default=KEEP[0])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--network", choices=sorted(PROFILES), default="none")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    s3 = LocalS3()
+    s3_client = s3.client()
+    s3_client.create_bucket(Bucket=BUCKET)
+    s3_client.put_bucket_versioning(Bucket=BUCKET, VersioningConfiguration={"Status": "Enabled"})
+    populate(s3, args, rng)
+    NetworkShim.named(args.network, args.seed).attach(s3_client)
+    print(f"{args.keys} keys, {len(s3.buckets[BUCKET].store)} entries, keep {args.keep}, network {args.network}")
+
+    before = list_pages(s3_client)
+    report, _ = compact(s3_client, BUCKET, PREFIX, args.keep)
+    print(f"dry run: {report.delete_markers} markers, {report.runs} runs on {report.keys_with_runs} keys, "
+          f"{report.redundant} redundant, {report.expired} expired on {report.expired_keys} keys")
+    for key_report in report.top[:3]:
+        print(f"  {key_report.key}: run of {key_report.longest_run}")
+
+    report, result = compact(s3_client, BUCKET, PREFIX, args.keep, dry_run=False, max_workers=args.workers)
+    print(f"compact: {result.deleted} deleted in {result.batches} batches, {result.failed} failed, "
+          f"{result.elapsed:.2f}s")
+    after = list_pages(s3_client)
+    print_listing("before", before)
+    print_listing("after", after)
+    print(f"listing {sum(before[2]) / sum(after[2]):.1f}x faster, {before[0] - after[0]} pages fewer")
+
+
+if __name__ == "__main__":
+    main()
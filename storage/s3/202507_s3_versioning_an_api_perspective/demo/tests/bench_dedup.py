@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+    Dedup report and batched deletion over synthetic version histories on the
+    native backend: every write repeats the previous body, reverts to an
+    older one or writes a new one, and some bodies are multipart-style ETags.
+    With --trace-memory the peak memory of each pass is traced, to show it
+    does not grow with the number of versions.
+
+    python bench_dedup.py --keys 100000 --versions 20
+    python bench_dedup.py --keys 10000 --scope any --trace-memory
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from dedup import SCOPES, analyze, deduplicate
+from local_s3 import LocalS3
+from version_store import etag_of
+
+BUCKET = "bench-dedup"
+PREFIX = "dedup/"
+MiB = 2 ** 20
+
+
+def populate(s3, args):
+    rng = random.Random(args.seed)
+    # Shared bodies, so millions of versions fit in memory
+    bodies = [rng.randbytes(args.object_size + i) for i in range(args.contents)]
+    etags = [etag_of(body) for body in bodies]
+    # The same bytes as uploaded in parts: another ETag for the same content
+    multipart = [f'"{rng.randbytes(16).hex()}-{rng.randint(2, 9)}"' for _ in bodies]
+    store = s3.buckets[BUCKET].store
+    for k in range(args.keys):
+        key = f"{PREFIX}key{k:07d}"
+        content = rng.randrange(len(bodies))
+        for _ in range(args.versions):
+            if rng.random() >= args.repeat:
+                content = rng.randrange(len(bodies))
+            etag = multipart[content] if rng.random() < args.multipart else etags[content]
+            store.put(key, bodies[content], etag=etag)
+
+
+def measured(fn, trace):
+    """(value, seconds, peak bytes allocated meanwhile or None); tracing slows the run down."""
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    value = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] if trace else None
+    tracemalloc.stop()
+    return value, elapsed, peak
+
+
+def peak_mib(peak):
+    return f"peak {peak / MiB:.1f} MiB traced" if peak is not None else "memory not traced"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--versions", type=int, default=20, help="writes per key")
+    parser.add_argument("--repeat", type=float, default=0.5, help="chance that a write repeats the previous body")
+    parser.add_argument("--contents", type=int, default=8, help="distinct bodies")
+    parser.add_argument("--multipart", type=float, default=0.05, help="share of writes with a multipart ETag")
+    parser.add_argument("--object-size", type=int, default=64 * 1024)
+    parser.add_argument("--scope", choices=SCOPES, default=SCOPES[0])
+    parser.add_argument("--trace-memory", action="store_true", help="trace the peak memory of each pass")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    s3 = LocalS3()
+    s3_client = s3.client()
+    s3_client.create_bucket(Bucket=BUCKET)
+    s3_client.put_bucket_versioning(Bucket=BUCKET, VersioningConfiguration={"Status": "Enabled"})
+    populate(s3, args)
+    versions = len(s3.buckets[BUCKET].store)
+
+    report, elapsed, peak = measured(lambda: analyze(s3_client, BUCKET, PREFIX, args.scope), args.trace_memory)
+    print(f"{args.keys} keys, {versions} versions, scope {args.scope}")
+    print(f"analyze: {elapsed:.2f}s, {versions / elapsed:,.0f} versions/s, {peak_mib(peak)}")
+    print(f"  stored     {report.bytes / MiB:>12,.1f} MiB in {report.versions:,} versions")
+    print(f"  redundant  {report.redundant_bytes / MiB:>12,.1f} MiB in {report.redundant_versions:,} versions")
+    print(f"  removable  {report.removable_bytes / MiB:>12,.1f} MiB in {report.removable_versions:,} versions")
+    print(f"  ambiguous  {report.ambiguous:>12,} versions of another multipart layout")
+    for key_report in report.top[:5]:
+        print(f"  {key_report.key}: {key_report.redundant_bytes / MiB:.1f} MiB redundant, "
+              f"{key_report.contents} contents in {key_report.versions} versions")
+
+    (report, result), elapsed, peak = measured(lambda: deduplicate(s3_client, BUCKET, PREFIX, args.scope),
+                                               args.trace_memory)
+    print(f"deduplicate: {result.deleted:,} deleted in {result.batches} batches, {result.failed} failed, "
+          f"{elapsed:.2f}s, {peak_mib(peak)}")
+    print(f"versions left: {len(s3.buckets[BUCKET].store):,}")
+
+
+if __name__ == "__main__":
+    main()
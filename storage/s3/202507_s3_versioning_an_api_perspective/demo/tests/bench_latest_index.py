@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+    Answer "which of these 100k keys exist" with one HeadObject per key versus
+    one streaming ListObjectVersions pass into a LatestStateIndex, on the
+    native backend. Besides the local wall time, the request counts are
+    projected onto a network round trip time.
+
+    python bench_latest_index.py --keys 100000 --rtt-ms 20
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from instrumentation import S3CallRecorder
+from latest_index import LatestStateIndex
+from local_s3 import LocalS3
+
+BUCKET = "bench-latest-index"
+PREFIX = "index/"
+
+
+def populate(s3, keys, versions_per_key, delete_every):
+    store = s3.buckets[BUCKET].store
+    for k in range(keys):
+        key = f"{PREFIX}key{k:07d}"
+        for v in range(versions_per_key):
+            store.put(key, b"content")
+        if delete_every and k % delete_every == 0:
+            store.add_delete_marker(key)
+
+
+def head_exists(s3_client, key):
+    try:
+        s3_client.head_object(Bucket=BUCKET, Key=key)
+        return True
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "404":
+            return False
+        raise
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--versions", type=int, default=2, help="object versions per key")
+    parser.add_argument("--delete-every", type=int, default=5, help="soft-delete every n-th key")
+    parser.add_argument("--head-workers", type=int, default=32, help="concurrency of the per-key HEADs")
+    parser.add_argument("--rtt-ms", type=float, default=20.0, help="round trip time for the projection")
+    args = parser.parse_args()
+
+    s3 = LocalS3()
+    s3_client = s3.client()
+    s3_client.create_bucket(Bucket=BUCKET)
+    s3_client.put_bucket_versioning(Bucket=BUCKET, VersioningConfiguration={"Status": "Enabled"})
+    populate(s3, args.keys, args.versions, args.delete_every)
+    keys = s3.buckets[BUCKET].store.keys()
+
+    recorder = S3CallRecorder()
+    recorder.attach(s3_client)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.head_workers) as pool:
+        head = dict(zip(keys, pool.map(lambda key: head_exists(s3_client, key), keys)))
+    head_seconds = time.perf_counter() - start
+    head_requests = recorder.report()["operations"]["HeadObject"]["requests"]
+
+    start = time.perf_counter()
+    index = LatestStateIndex.build(s3_client, BUCKET, PREFIX)
+    answer = index.exists(keys)
+    index_seconds = time.perf_counter() - start
+    list_requests = recorder.report()["operations"]["ListObjectVersions"]["requests"]
+
+    assert answer == head, "index and HEAD disagree"
+    rtt = args.rtt_ms / 1000
+    print(f"{len(keys)} keys, {len(s3.buckets[BUCKET].store)} versions and markers, "
+          f"{len(index.soft_deleted())} soft-deleted")
+    print(f"{'strategy':<26} {'requests':>9} {'local s':>8} {'at ' + str(args.rtt_ms) + 'ms RTT':>14}")
+    print(f"{'HeadObject per key':<26} {head_requests:>9} {head_seconds:>8.2f} "
+          f"{head_requests * rtt / args.head_workers:>13.1f}s")
+    print(f"{'LatestStateIndex':<26} {list_requests:>9} {index_seconds:>8.2f} {list_requests * rtt:>13.1f}s")
+
+
+if __name__ == "__main__":
+    main()
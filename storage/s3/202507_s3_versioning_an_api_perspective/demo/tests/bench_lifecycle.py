@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+    Size candidate lifecycle rules before deploying them: a native bucket is
+    filled with a version history spread over --days days, every candidate
+    is replayed by the lifecycle simulator, and the first one is applied with
+    batched deletes to compare the predicted and the measured listing.
+
+    python bench_lifecycle.py --keys 20000 --versions 10 --days 30
+    python bench_lifecycle.py --rules rules.json    # PutBucketLifecycleConfiguration shape
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timezone
+
+from lifecycle import simulate
+from local_s3 import LocalS3
+from purge import delete_versions
+from version_stream import iter_key_histories
+
+BUCKET = "bench-lifecycle"
+PREFIX = "lifecycle/"
+DAY = 86400
+
+
+def candidates():
+    for days in (1, 7, 30):
+        for newer in (0, 3):
+            noncurrent = {"NoncurrentDays": days, **({"NewerNoncurrentVersions": newer} if newer else {})}
+            yield f"{days}d keep {newer}", [{
+                "Status": "Enabled",
+                "Filter": {"Prefix": PREFIX},
+                "NoncurrentVersionExpiration": noncurrent,
+                "Expiration": {"ExpiredObjectDeleteMarker": True},
+            }]
+
+
+def populate(s3, clock, keys, versions, days, delete_ratio, object_size, seed):
+    """Writes in time order: every key gets versions spread uniformly over the last days."""
+    rng = random.Random(seed)
+    store = s3.buckets[BUCKET].store
+    start = clock[0] - days * DAY
+    writes = sorted((start + rng.random() * days * DAY, k) for k in range(keys) for _ in range(versions))
+    body = rng.randbytes(object_size)
+    for at, k in writes:
+        clock[0] = at
+        key = f"{PREFIX}key{k:06d}"
+        if rng.random() < delete_ratio:
+            store.add_delete_marker(key)
+        else:
+            store.put(key, body)
+    clock[0] = start + days * DAY
+
+
+def list_all(s3_client):
+    start = time.perf_counter()
+    pages = sum(1 for _ in s3_client.get_paginator("list_object_versions").paginate(Bucket=BUCKET, Prefix=PREFIX))
+    return pages, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=20_000)
+    parser.add_argument("--versions", type=int, default=10, help="writes per key")
+    parser.add_argument("--days", type=int, default=30, help="the history spans the last days")
+    parser.add_argument("--delete-ratio", type=float, default=0.1, help="share of writes that are delete markers")
+    parser.add_argument("--object-size", type=int, default=1024)
+    parser.add_argument("--rules", nargs="*", default=[], help="JSON rule files instead of the built-in candidates")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    clock = [time.time()]
+    s3 = LocalS3(clock=lambda: clock[0])
+    s3_client = s3.client()
+    s3_client.create_bucket(Bucket=BUCKET)
+    s3_client.put_bucket_versioning(Bucket=BUCKET, VersioningConfiguration={"Status": "Enabled"})
+    populate(s3, clock, args.keys, args.versions, args.days, args.delete_ratio, args.object_size, args.seed)
+    at = datetime.fromtimestamp(clock[0], timezone.utc)
+
+    start = time.perf_counter()
+    histories = list(iter_key_histories(s3_client, BUCKET, PREFIX))
+    print(f"{args.keys} keys x {args.versions} writes over {args.days} days, "
+          f"history listed in {time.perf_counter() - start:.2f}s")
+
+    rule_sets = [(path, json.load(open(path))) for path in args.rules] or list(candidates())
+    print(f"{'rules':<16} {'versions':>17} {'markers':>15} {'MiB':>15} {'list pages':>11} {'sim s':>6}")
+    forecasts = []
+    for name, rules in rule_sets:
+        start = time.perf_counter()
+        forecast = simulate(histories, rules, at)
+        elapsed = time.perf_counter() - start
+        forecasts.append((name, forecast))
+        before, after = forecast.before, forecast.after
+        print(f"{name:<16} {before.versions:>8} -> {after.versions:>6} "
+              f"{before.delete_markers:>6} -> {after.delete_markers:>6} "
+              f"{before.bytes / 2 ** 20:>6.1f} -> {after.bytes / 2 ** 20:>6.1f} "
+              f"{forecast.pages_before:>4} -> {forecast.pages_after:>4} {elapsed:>6.2f}")
+
+    name, forecast = forecasts[0]
+    pages, before = list_all(s3_client)
+    result = delete_versions(s3_client, BUCKET, forecast.expired)
+    pages_after, after = list_all(s3_client)
+    print(f"\napplied {name}: {result.deleted} deleted in {result.elapsed:.2f}s, "
+          f"list {pages} pages {before * 1000:.0f}ms -> {pages_after} pages {after * 1000:.0f}ms "
+          f"(predicted {forecast.pages_after})")
+
+
+if __name__ == "__main__":
+    main()
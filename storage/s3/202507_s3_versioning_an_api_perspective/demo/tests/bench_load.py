@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+    Versioned-bucket load benchmark: build keys with deep version histories and
+    stacked delete markers, then drive a concurrent GET/HEAD/PUT/ListObjectVersions
+    mix and report throughput and tail latency per operation. PUTs add versions
+    to the dataset as the runs go.
+
+    python bench_load.py --backend native --keys 20 --versions 200 --concurrency 1 8 32
+    python bench_load.py --backend native --network s3-throttled    # simulated S3 latency and SlowDowns
+    python bench_load.py --backend aws    # the bucket of the deployed S3Stack
+"""
+import argparse
+
+from backends import BACKENDS, make_backend
+from loadgen import DEFAULT_MIX, Shape, build, parse_mix, run
+from namespace import Namespace
+from network import PROFILES, NetworkShim
+from purge import purge_prefix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="native")
+    parser.add_argument("--keys", type=int, default=20)
+    parser.add_argument("--versions", type=int, default=200, help="object versions per key")
+    parser.add_argument("--delete-marker-ratio", type=float, default=0.1,
+                        help="chance of a delete marker after each version")
+    parser.add_argument("--object-size", type=int, default=1024)
+    parser.add_argument("--operations", type=int, default=2000, help="operations per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="weights, e.g. get_latest=3,get_version=3,head_latest=2,head_version=1,"
+                             "put_version=1,list_versions=1")
+    parser.add_argument("--network", choices=sorted(PROFILES), default="none",
+                        help="simulated network of the measured runs, the dataset is built without it")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    backend = make_backend(args.backend)
+    backend.start()
+    try:
+        s3_client, bucket_name = backend.client(), backend.bucket_name()
+        prefix = Namespace().key("load/")
+        network = NetworkShim.named(args.network, args.seed)
+        try:
+            shape = Shape(args.keys, args.versions, args.delete_marker_ratio, args.object_size, args.seed)
+            dataset = build(s3_client, bucket_name, prefix, shape)
+            markers = sum(len(m) for m in dataset.markers.values())
+            print(f"{args.backend}: {args.keys} keys x {args.versions} versions, {markers} delete markers, "
+                  f"{args.object_size} byte objects, network {args.network}")
+            network.attach(s3_client)
+
+            for concurrency in args.concurrency:
+                result = run(s3_client, bucket_name, dataset, args.operations, concurrency, args.mix, args.seed)
+                print(f"\nconcurrency {concurrency}: {result.operations} ops in {result.elapsed:.2f}s, "
+                      f"{result.throughput:.0f} ops/s")
+                print(f"  {'operation':<14} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+                      f"{'max ms':>8} {'hidden':>6} {'errors':>6}")
+                for name, s in result.summary().items():
+                    if not s["count"]:
+                        continue
+                    print(f"  {name:<14} {s['count']:>6} {s['p50']:>8.2f} {s['p95']:>8.2f} {s['p99']:>8.2f} "
+                          f"{s['max']:>8.2f} {s['hidden']:>6} {s['errors']:>6}")
+        finally:
+            network.detach(s3_client)
+            purge_prefix(s3_client, bucket_name, prefix)
+    finally:
+        backend.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+    Benchmark purge_prefix (batched delete_objects) against the per-version
+    delete_object loop on a local moto-backed versioned bucket.
+
+    python bench_purge.py --keys 1000 --versions 10
+"""
+import argparse
+import os
+
+import boto3
+from moto import mock_aws
+
+from backends import serialize_moto_requests
+from purge import purge_prefix, purge_prefix_sequential
+
+BUCKET = "bench-purge"
+PREFIX = "purge/"
+
+
+def populate(s3_client, keys, versions, delete_every):
+    for k in range(keys):
+        key = f"{PREFIX}key{k:06d}"
+        for v in range(versions):
+            s3_client.put_object(Bucket=BUCKET, Key=key, Body=f"v{v}".encode())
+        if delete_every and k % delete_every == 0:
+            s3_client.delete_object(Bucket=BUCKET, Key=key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=1000)
+    parser.add_argument("--versions", type=int, default=10, help="versions per key")
+    parser.add_argument("--delete-every", type=int, default=3, help="add a delete marker on every n-th key")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+
+    with mock_aws():
+        s3_client = boto3.client("s3")
+        serialize_moto_requests(s3_client)
+        s3_client.create_bucket(Bucket=BUCKET)
+        s3_client.put_bucket_versioning(Bucket=BUCKET, VersioningConfiguration={"Status": "Enabled"})
+
+        results = {}
+        for name, purge in (
+            ("delete_object loop", purge_prefix_sequential),
+            ("delete_objects batches", lambda c, b, p: purge_prefix(c, b, p, max_workers=args.workers)),
+        ):
+            populate(s3_client, args.keys, args.versions, args.delete_every)
+            results[name] = purge(s3_client, BUCKET, PREFIX)
+            remaining = s3_client.list_object_versions(Bucket=BUCKET, Prefix=PREFIX)
+            assert not remaining.get("Versions") and not remaining.get("DeleteMarkers")
+
+    print(f"{'strategy':<24} {'deleted':>8} {'batches':>8} {'retries':>8} {'failed':>7} {'seconds':>9} {'del/s':>9}")
+    for name, result in results.items():
+        print(f"{name:<24} {result.deleted:>8} {result.batches:>8} {result.retries:>8} {result.failed:>7} "
+              f"{result.elapsed:>9.3f} {result.deleted / result.elapsed:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
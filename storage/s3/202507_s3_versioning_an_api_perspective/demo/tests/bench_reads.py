@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+    A replayed workload of version-specific HEAD and GET on the native
+    backend behind a simulated network: a few hot versions, a long tail and
+    some delete markers, read by concurrent workers. Direct client calls
+    against the same reads through VersionReadCache.
+
+    python bench_reads.py --keys 2000 --reads 20000 --network s3
+    python bench_reads.py --keys 500 --reads 5000 --batch 100
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from local_s3 import LocalS3
+from network import PROFILES, NetworkShim
+from version_reads import VersionReadCache
+
+BUCKET = "bench-reads"
+PREFIX = "reads/"
+
+
+def populate(s3, args, rng):
+    """Every (key, VersionId), object versions and delete markers alike."""
+    store = s3.buckets[BUCKET].store
+    versions = []
+    for k in range(args.keys):
+        key = f"{PREFIX}key{k:06d}"
+        for _ in range(args.versions):
+            if rng.random() < args.delete_ratio:
+                version = store.add_delete_marker(key)
+            else:
+                version = store.put(key, rng.randbytes(rng.randint(1, args.object_size)))
+            versions.append((key, version.version_id))
+    return versions
+
+
+def workload(versions, args, rng):
+    """(operation, key, version id) with Zipf-like skew: the n-th version is read about 1/n as often."""
+    weights = [1 / (rank + 1) ** args.skew for rank in range(len(versions))]
+    ranked = rng.sample(versions, len(versions))
+    return [("head" if rng.random() < args.head_ratio else "get", *version)
+            for version in rng.choices(ranked, weights, k=args.reads)]
+
+
+def replay(reader, reads, workers):
+    def read(item):
+        operation, key, version_id = item
+        try:
+            response = getattr(reader, f"{operation}_object")(Bucket=BUCKET, Key=key, VersionId=version_id)
+            if operation == "get":
+                response["Body"].read()
+        except ClientError:
+            pass
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(read, reads))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=2000)
+    parser.add_argument("--versions", type=int, default=5)
+    parser.add_argument("--delete-ratio", type=float, default=0.1)
+    parser.add_argument("--object-size", type=int, default=16 * 1024)
+    parser.add_argument("--reads", type=int, default=20_000)
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of the read distribution")
+    parser.add_argument("--head-ratio", type=float, default=0.7)
+    parser.add_argument("--workers", type=int, default=32, help="concurrent readers")
+    parser.add_argument("--batch", type=int, default=0, help="read through head_many in batches of this size")
+    parser.add_argument("--max-entries", type=int, default=10_000)
+    parser.add_argument("--network", choices=sorted(PROFILES), default="s3")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    s3 = LocalS3()
+    s3_client = s3.client()
+    s3_client.create_bucket(Bucket=BUCKET)
+    s3_client.put_bucket_versioning(Bucket=BUCKET, VersioningConfiguration={"Status": "Enabled"})
+    versions = populate(s3, args, rng)
+    reads = workload(versions, args, rng)
+    shim = NetworkShim.named(args.network, args.seed)
+    shim.attach(s3_client)
+    print(f"{len(reads)} reads of {len(versions)} versions, {args.workers} workers, network {args.network}")
+
+    direct = replay(s3_client, reads, args.workers)
+    print(f"direct: {direct:.2f}s, {len(reads)} requests")
+
+    with VersionReadCache(s3_client, max_entries=args.max_entries, max_workers=args.workers) as cache:
+        if args.batch:
+            start = time.perf_counter()
+            for first in range(0, len(reads), args.batch):
+                cache.head_many(BUCKET, [(key, version_id) for _, key, version_id in reads[first:first + args.batch]])
+            cached = time.perf_counter() - start
+        else:
+            cached = replay(cache, reads, args.workers)
+        stats = cache.stats()
+    print(f"cached: {cached:.2f}s, {stats.misses} requests, hit rate {stats.hit_rate:.1%} "
+          f"({stats.hits} hits, {stats.negative_hits} cached 405s, {stats.coalesced} coalesced)")
+    print(f"origin latency {stats.origin_seconds:.1f}s, saved about {stats.saved_seconds:.1f}s of request time, "
+          f"wall clock {direct / cached:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+    Roll 100k keys on the native backend back to before a bad deploy that
+    overwrote, deleted and created keys, once per restore mode, then rerun
+    the restore to show that keys in their old state are skipped.
+
+    python bench_restore.py --keys 100000 --changed 0.2 --deleted 0.1 --created 0.05
+    python bench_restore.py --network s3 --keys 2000    # with simulated S3 latency
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from local_s3 import LocalS3
+from network import PROFILES, NetworkShim
+from restore import MODES, restore_prefix
+
+BUCKET = "bench-restore"
+PREFIX = "restore/"
+
+
+def populate(s3, clock, args):
+    """Good state up to T, then the deploy one second later; returns T."""
+    rng = random.Random(args.seed)
+    store = s3.buckets[BUCKET].store
+    keys = [f"{PREFIX}key{k:07d}" for k in range(args.keys)]
+    for version in range(args.versions):
+        for key in keys:
+            store.put(key, f"{key} v{version}".encode())
+    at = datetime.fromtimestamp(clock[0], timezone.utc)
+
+    clock[0] += 1
+    for key in keys:
+        draw = rng.random()
+        if draw < args.changed:
+            store.put(key, f"{key} bad".encode())
+        elif draw < args.changed + args.deleted:
+            store.add_delete_marker(key)
+    for k in range(int(args.keys * args.created)):
+        store.put(f"{PREFIX}new{k:07d}", b"bad")
+    return at
+
+
+def check(s3, args):
+    store = s3.buckets[BUCKET].store
+    for key in store.keys():
+        latest = store.latest(key)
+        if key.startswith(f"{PREFIX}new"):
+            assert latest is None or latest.is_delete_marker, key
+        else:
+            assert latest.body == f"{key} v{args.versions - 1}".encode(), key
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--versions", type=int, default=2, help="good versions per key before T")
+    parser.add_argument("--changed", type=float, default=0.2, help="share of keys the deploy overwrites")
+    parser.add_argument("--deleted", type=float, default=0.1, help="share of keys the deploy deletes")
+    parser.add_argument("--created", type=float, default=0.05, help="new keys, as a share of --keys")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--network", choices=sorted(PROFILES), default="none")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'mode':<7} {'run':<6} {'keys':>7} {'skipped':>8} {'copied':>7} {'markers':>8} "
+          f"{'deleted':>8} {'chunks':>6} {'s':>7} {'keys/s':>8}")
+    for mode in MODES:
+        clock = [time.time()]
+        s3 = LocalS3(clock=lambda: clock[0])
+        s3_client = s3.client()
+        s3_client.create_bucket(Bucket=BUCKET)
+        s3_client.put_bucket_versioning(Bucket=BUCKET, VersioningConfiguration={"Status": "Enabled"})
+        at = populate(s3, clock, args)
+        clock[0] += 1
+        NetworkShim.named(args.network, args.seed).attach(s3_client)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for run in ("first", "rerun"):
+                # The rerun gets a fresh checkpoint, so it lists every key again
+                checkpoint = os.path.join(tmp, f"{run}.json")
+                r = restore_prefix(s3_client, BUCKET, PREFIX, at, mode, checkpoint,
+                                   chunk_size=args.chunk_size, max_workers=args.workers)
+                assert not r.failed, r.errors[:5]
+                print(f"{mode:<7} {run:<6} {r.keys:>7} {r.skipped:>8} {r.copied:>7} {r.delete_markers:>8} "
+                      f"{r.versions_deleted:>8} {r.chunks:>6} {r.elapsed:>7.2f} {r.keys / r.elapsed:>8.0f}")
+        check(s3, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+    Incremental mirror of a versioned prefix to a second bucket on the native
+    backend: one full sync, then rounds that change a share of the keys.
+    Requests are counted per operation; copies and markers follow the change
+    volume, the ListObjectVersions pass still follows the bucket size.
+
+    python bench_sync.py --keys 100000 --versions 3 --change 0.01 --rounds 3
+    python bench_sync.py --keys 5000 --network s3
+"""
+import argparse
+import os
+import random
+import tempfile
+
+from instrumentation import S3CallRecorder
+from local_s3 import LocalS3
+from network import PROFILES, NetworkShim
+from sync import sync_prefix
+
+SOURCE, MIRROR = "bench-sync-source", "bench-sync-mirror"
+PREFIX = "data/"
+
+
+def checkpoint_size(path):
+    """The checkpoint and its journal."""
+    journal = f"{path}.journal"
+    return os.path.getsize(path) + (os.path.getsize(journal) if os.path.exists(journal) else 0)
+
+
+def change(s3, keys, share, rng):
+    """Overwrite, delete or create keys, a share of the existing ones in all."""
+    store = s3.buckets[SOURCE].store
+    for key in rng.sample(keys, int(len(keys) * share)):
+        draw = rng.random()
+        if draw < 0.7:
+            store.put(key, f"{key} {rng.random()}".encode())
+        elif draw < 0.9:
+            store.add_delete_marker(key)
+        else:
+            new = f"{key}-new"
+            store.put(new, b"new")
+            keys.append(new)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--versions", type=int, default=3, help="versions per key before the first sync")
+    parser.add_argument("--change", type=float, default=0.01, help="share of keys changed per round")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--network", choices=sorted(PROFILES), default="none")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    s3 = LocalS3()
+    s3_client = s3.client()
+    for bucket in (SOURCE, MIRROR):
+        s3_client.create_bucket(Bucket=bucket)
+        s3_client.put_bucket_versioning(Bucket=bucket, VersioningConfiguration={"Status": "Enabled"})
+    keys = [f"{PREFIX}key{k:07d}" for k in range(args.keys)]
+    store = s3.buckets[SOURCE].store
+    for version in range(args.versions):
+        for key in keys:
+            store.put(key, f"{key} v{version}".encode())
+    NetworkShim.named(args.network, args.seed).attach(s3_client)
+    recorder = S3CallRecorder()
+    recorder.attach(s3_client)
+
+    print(f"{args.keys} keys x {args.versions} versions, {args.change:.1%} changed per round, "
+          f"network {args.network}")
+    print(f"{'round':<8} {'keys':>8} {'changed':>8} {'copied':>8} {'markers':>8} {'list req':>9} "
+          f"{'write req':>9} {'s':>7} {'checkpoint':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        checkpoint = os.path.join(tmp, "sync.json")
+        for round_ in range(args.rounds + 1):
+            if round_:
+                change(s3, keys, args.change, rng)
+            before = recorder.report()["operations"]
+            result, _ = sync_prefix(s3_client, SOURCE, PREFIX, MIRROR, PREFIX, checkpoint,
+                                    max_workers=args.workers)
+            after = recorder.report()["operations"]
+
+            def requests(operation):
+                return (after.get(operation, {}).get("requests", 0)
+                        - before.get(operation, {}).get("requests", 0))
+            writes = requests("CopyObject") + requests("DeleteObject")
+            print(f"{'full' if not round_ else round_:<8} {result.keys:>8} {result.changed_keys:>8} "
+                  f"{result.versions_copied:>8} {result.delete_markers:>8} {requests('ListObjectVersions'):>9} "
+                  f"{writes:>9} {result.elapsed:>7.2f} {checkpoint_size(checkpoint) / 2 ** 20:>7.1f} MiB")
+            assert not result.failed, result.errors[:5]
+    assert len(s3.buckets[MIRROR].store) == len(store)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+    Single put_object/get_object against parallel multipart upload and ranged
+    version download on the native backend, across object sizes and part
+    sizes. Each request pays a round trip and moves its bytes at a per-
+    connection bandwidth, which is what parallel parts overcome on S3.
+
+    python bench_transfer.py --sizes 16 64 256 --part-sizes 8 16 --workers 8
+"""
+import argparse
+import random
+import time
+
+from local_s3 import LocalS3
+from network import NetworkProfile, NetworkShim
+from transfer import download_version, upload_multipart
+
+BUCKET = "bench-transfer"
+MiB = 2 ** 20
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[16, 64, 256], help="object sizes in MiB")
+    parser.add_argument("--part-sizes", type=int, nargs="+", default=[8, 16], help="part sizes in MiB")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rtt-ms", type=float, default=20.0)
+    parser.add_argument("--connection-mibps", type=float, default=80.0, help="bandwidth of one connection")
+    args = parser.parse_args()
+
+    s3_client = LocalS3().client()
+    s3_client.create_bucket(Bucket=BUCKET)
+    s3_client.put_bucket_versioning(Bucket=BUCKET, VersioningConfiguration={"Status": "Enabled"})
+    NetworkShim(NetworkProfile.fixed(args.rtt_ms, bandwidth=args.connection_mibps * MiB)).attach(s3_client)
+
+    print(f"{args.rtt_ms}ms RTT, {args.connection_mibps} MiB/s per connection, {args.workers} workers")
+    print(f"{'MiB':>5} {'strategy':<28} {'parts':>5} {'up s':>7} {'up MiB/s':>9} {'down s':>7} {'down MiB/s':>10}")
+    for size in args.sizes:
+        body = random.Random(size).randbytes(size * MiB)
+        key = f"transfer/{size}MiB.bin"
+
+        version_id = None
+        def put():
+            nonlocal version_id
+            version_id = s3_client.put_object(Bucket=BUCKET, Key=key, Body=body)["VersionId"]
+        up = timed(put)
+        down = timed(lambda: s3_client.get_object(Bucket=BUCKET, Key=key, VersionId=version_id)["Body"].read())
+        print(f"{size:>5} {'put_object / get_object':<28} {1:>5} {up:>7.2f} {size / up:>9.1f} "
+              f"{down:>7.2f} {size / down:>10.1f}")
+
+        for part_size in args.part_sizes:
+            uploaded = upload_multipart(s3_client, BUCKET, key, body, part_size * MiB, args.workers)
+            data, downloaded = download_version(s3_client, BUCKET, key, uploaded.version_id,
+                                                part_size=part_size * MiB, max_workers=args.workers)
+            assert data == body
+            print(f"{size:>5} {f'multipart / ranged {part_size} MiB':<28} {uploaded.parts:>5} "
+                  f"{uploaded.elapsed:>7.2f} {uploaded.throughput:>9.1f} "
+                  f"{downloaded.elapsed:>7.2f} {downloaded.throughput:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
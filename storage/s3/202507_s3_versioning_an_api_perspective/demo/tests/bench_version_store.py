@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+    List a native-backend bucket of 1M versions page by page and report the
+    latency per ListObjectVersions page. With marker resumption by binary
+    search the last page costs the same as the first one.
+
+    python bench_version_store.py --sizes 10000 100000 1000000
+"""
+import argparse
+import statistics
+import time
+
+from local_s3 import LocalS3
+
+BUCKET = "bench-version-store"
+
+
+def populate(s3, versions, versions_per_key, delete_every):
+    store = s3.buckets[BUCKET].store
+    body = b"content"
+    keys = versions // versions_per_key
+    for k in range(keys):
+        key = f"versions/key{k:08d}"
+        for _ in range(versions_per_key):
+            store.put(key, body)
+        if delete_every and k % delete_every == 0:
+            store.add_delete_marker(key)
+
+
+def list_pages(client, page_size):
+    latencies = []
+    kwargs = {"Bucket": BUCKET, "Prefix": "versions/", "MaxKeys": page_size}
+    while True:
+        start = time.perf_counter()
+        page = client.list_object_versions(**kwargs)
+        latencies.append(time.perf_counter() - start)
+        if not page["IsTruncated"]:
+            return latencies
+        kwargs["KeyMarker"] = page["NextKeyMarker"]
+        kwargs["VersionIdMarker"] = page["NextVersionIdMarker"]
+
+
+def ms(seconds):
+    return f"{1000 * seconds:8.3f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="total object versions per run")
+    parser.add_argument("--versions-per-key", type=int, default=10)
+    parser.add_argument("--delete-every", type=int, default=4, help="add a delete marker on every n-th key")
+    parser.add_argument("--page-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'versions':>9} {'pages':>6} {'build s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8} {'first10':>8} {'last10':>8} {'list s':>7}")
+    for size in args.sizes:
+        s3 = LocalS3()
+        client = s3.client()
+        client.create_bucket(Bucket=BUCKET)
+        client.put_bucket_versioning(Bucket=BUCKET, VersioningConfiguration={"Status": "Enabled"})
+        start = time.perf_counter()
+        populate(s3, size, args.versions_per_key, args.delete_every)
+        build = time.perf_counter() - start
+
+        latencies = list_pages(client, args.page_size)
+        quantiles = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+        print(f"{len(s3.buckets[BUCKET].store):>9} {len(latencies):>6} {build:>8.2f} {ms(quantiles[49])} "
+              f"{ms(quantiles[94])} {ms(quantiles[98])} {ms(max(latencies))} "
+              f"{ms(statistics.mean(latencies[:10]))} {ms(statistics.mean(latencies[-10:]))} {sum(latencies):>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+    A prefix's version history exported once into a columnar catalog on local
+    disk, to answer questions about it offline instead of paging
+    ListObjectVersions again for every one.
+
+    A catalog is a directory of fixed-width column files, one row per object
+    version or delete marker in listing order, plus catalog.json:
+
+        keys.bin, key_offsets.u64   key dictionary, UTF-8 keys back to back
+        key.u32                     key id of the row
+        version_id.bin              VersionId, NUL-padded to VERSION_ID_WIDTH bytes
+        last_modified.i64           microseconds since the epoch
+        size.i64                    0 for delete markers
+        etag.u64                    64-bit hash of the ETag, 0 for delete markers
+        flags.u8                    DELETE_MARKER
+
+    Columns are memory-mapped read-only and exposed as memoryviews; close()
+    the catalog, or use it as a context manager, to unmap them. Queries scan
+    the columns without building an object per row. Flag and key matches run
+    in C through bytes.find, time and prefix filters and latest() are loops
+    in Python: linear in the rows, and far from what numpy would do.
+
+    append() adds the entries written since the catalog's watermark: the time
+    the previous listing started. ListObjectVersions cannot filter by time,
+    so the listing still covers the whole prefix, only the new rows are
+    written. The catalog is a
+    log: versions deleted from the bucket after export stay in it. Rows are
+    written before catalog.json, a run that dies in between leaves trailing
+    bytes that the next open ignores and the next append overwrites.
+"""
+import hashlib
+import json
+import mmap
+import os
+import time
+from array import array
+from collections import Counter
+from datetime import datetime, timezone
+
+from version_stream import iter_versions
+
+VERSION_ID_WIDTH = 40
+DELETE_MARKER = 1
+
+# file name -> array typecode, None for raw bytes
+_COLUMNS = {
+    "key.u32": "I",
+    "version_id.bin": None,
+    "last_modified.i64": "q",
+    "size.i64": "q",
+    "etag.u64": "Q",
+    "flags.u8": "B",
+}
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Entries this much older than the watermark are never new: LastModified has whole
+# seconds on S3, and the clock that takes the watermark may run ahead of S3's
+WATERMARK_SLACK = 5_000_000
+
+
+def etag_hash(etag):
+    if etag is None:
+        return 0
+    return int.from_bytes(hashlib.blake2b(etag.strip('"').encode(), digest_size=8).digest(), "big")
+
+
+def to_micros(when):
+    delta = when - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def from_micros(micros):
+    return datetime.fromtimestamp(micros // 1_000_000, timezone.utc).replace(microsecond=micros % 1_000_000)
+
+
+def _mapped(path, typecode, length):
+    """(mmap or None, view of the first length items) of a column file."""
+    itemsize = array(typecode or "B").itemsize
+    if not length:
+        return None, memoryview(b"").cast(typecode or "B")
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    with memoryview(data) as whole:
+        view = whole[:length * itemsize]
+    return data, view.cast(typecode) if typecode else view
+
+
+class _Rows:
+    """Column buffers of the rows an export or append is about to write."""
+
+    def __init__(self):
+        self.columns = {name: array(typecode or "B") for name, typecode in _COLUMNS.items()}
+
+    def __len__(self):
+        return len(self.columns["flags.u8"])
+
+    def add(self, key_id, entry):
+        version_id = entry.version_id.encode()
+        if len(version_id) > VERSION_ID_WIDTH:
+            raise ValueError(f"VersionId {entry.version_id!r} is longer than {VERSION_ID_WIDTH} bytes")
+        self.columns["key.u32"].append(key_id)
+        self.columns["version_id.bin"].frombytes(version_id.ljust(VERSION_ID_WIDTH, b"\0"))
+        self.columns["last_modified.i64"].append(to_micros(entry.last_modified))
+        self.columns["size.i64"].append(entry.size)
+        self.columns["etag.u64"].append(etag_hash(entry.etag))
+        self.columns["flags.u8"].append(DELETE_MARKER if entry.is_delete_marker else 0)
+
+
+class VersionCatalog:
+    def __init__(self, path):
+        self.path = str(path)
+        self._maps = []
+        self.remap()
+
+    def remap(self):
+        """Read catalog.json and map the columns again, after an append by this or another process."""
+        self.close()
+        with open(os.path.join(self.path, "catalog.json")) as f:
+            meta = json.load(f)
+        self.bucket = meta["bucket"]
+        self.prefix = meta["prefix"]
+        self.rows = meta["rows"]
+        # When the listing of the last export or append started, in microseconds
+        self.watermark = meta["watermark"]
+        # First row of every export or append
+        self.segments = meta["segments"]
+        self.keys = self._read_keys(meta["keys"])
+        self._key_ids = {key: i for i, key in enumerate(self.keys)}
+        for name, typecode in _COLUMNS.items():
+            length = self.rows * VERSION_ID_WIDTH if name == "version_id.bin" else self.rows
+            data, view = _mapped(os.path.join(self.path, name), typecode, length)
+            setattr(self, name.split(".")[0], view)
+            self._maps.append((data, view))
+
+    def close(self):
+        """Unmap the columns; the catalog is unusable until remap()."""
+        for data, view in self._maps:
+            view.release()
+            if data is not None:
+                data.close()
+        self._maps = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _read_keys(self, count):
+        if not count:
+            return []
+        offsets = array("Q")
+        with open(os.path.join(self.path, "key_offsets.u64"), "rb") as f:
+            offsets.frombytes(f.read((count + 1) * offsets.itemsize))
+        with open(os.path.join(self.path, "keys.bin"), "rb") as f:
+            data = f.read(offsets[count])
+        return [data[offsets[i]:offsets[i + 1]].decode() for i in range(count)]
+
+    def __len__(self):
+        return self.rows
+
+    @classmethod
+    def export(cls, s3_client, bucket_name, prefix, path, **stream_kwargs):
+        """Write the version history below prefix to a new catalog at path."""
+        os.makedirs(path, exist_ok=True)
+        for name in (*_COLUMNS, "keys.bin"):
+            open(os.path.join(path, name), "wb").close()
+        with open(os.path.join(path, "key_offsets.u64"), "wb") as f:
+            f.write(array("Q", [0]).tobytes())
+        cls._write_meta(path, bucket_name, prefix, 0, 0, 0, [])
+        catalog = cls(path)
+        catalog.append(s3_client, **stream_kwargs)
+        return catalog
+
+    @staticmethod
+    def _write_meta(path, bucket_name, prefix, rows, keys, watermark, segments):
+        tmp = os.path.join(path, "catalog.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"bucket": bucket_name, "prefix": prefix, "rows": rows, "keys": keys,
+                       "watermark": watermark, "segments": segments}, f)
+        os.replace(tmp, os.path.join(path, "catalog.json"))
+
+    def append(self, s3_client, clock=time.time, **stream_kwargs):
+        """
+            Add the entries written since the watermark and remap the columns.
+            clock is the time in seconds the watermark is taken from. Returns
+            the number of rows added.
+        """
+        # An entry written while the listing runs may or may not be listed, so the next
+        # watermark is when this listing started, not the newest LastModified it finds.
+        # Entries near the old watermark may be listed twice, their VersionIds tell.
+        started = int(clock() * 1_000_000)
+        oldest_new = self.watermark - WATERMARK_SLACK
+        seen = {bytes(self.version_id_at(row)) for row in range(self.rows)
+                if self.last_modified[row] >= oldest_new}
+        rows = _Rows()
+        new_keys = []
+        for entry in iter_versions(s3_client, self.bucket, self.prefix, **stream_kwargs):
+            if to_micros(entry.last_modified) < oldest_new or entry.version_id.encode() in seen:
+                continue
+            key_id = self._key_ids.get(entry.key)
+            if key_id is None:
+                key_id = self._key_ids[entry.key] = len(self.keys) + len(new_keys)
+                new_keys.append(entry.key)
+            rows.add(key_id, entry)
+        self._write(rows, new_keys, max(self.watermark, started))
+        return len(rows)
+
+    def _write(self, rows, new_keys, watermark):
+        # Nothing stays mapped over a file being written
+        self.close()
+        for name, column in rows.columns.items():
+            width = VERSION_ID_WIDTH if name == "version_id.bin" else column.itemsize
+            with open(os.path.join(self.path, name), "r+b") as f:
+                f.seek(self.rows * width)
+                f.write(column.tobytes())
+                f.truncate()
+        offsets = array("Q")
+        with open(os.path.join(self.path, "key_offsets.u64"), "rb") as f:
+            offsets.frombytes(f.read((len(self.keys) + 1) * offsets.itemsize))
+        encoded = [key.encode() for key in new_keys]
+        for key in encoded:
+            offsets.append(offsets[-1] + len(key))
+        with open(os.path.join(self.path, "keys.bin"), "r+b") as f:
+            f.seek(offsets[len(self.keys)])
+            f.write(b"".join(encoded))
+            f.truncate()
+        with open(os.path.join(self.path, "key_offsets.u64"), "wb") as f:
+            f.write(offsets.tobytes())
+        segments = self.segments + [self.rows] if rows else self.segments
+        self._write_meta(self.path, self.bucket, self.prefix, self.rows + len(rows),
+                         len(self.keys) + len(new_keys), watermark, segments)
+        self.remap()
+
+    # Row access
+
+    def version_id_at(self, row):
+        return self.version_id[row * VERSION_ID_WIDTH:(row + 1) * VERSION_ID_WIDTH].tobytes().rstrip(b"\0")
+
+    def row(self, row):
+        """One row as a dict, for display."""
+        return {
+            "key": self.keys[self.key[row]],
+            "version_id": self.version_id_at(row).decode(),
+            "last_modified": from_micros(self.last_modified[row]),
+            "size": self.size[row],
+            "is_delete_marker": bool(self.flags[row] & DELETE_MARKER),
+        }
+
+    # Queries. Row selections are lists of row numbers in listing order.
+
+    def key_ids(self, prefix=""):
+        """Ids of the keys starting with prefix."""
+        return {i for i, key in enumerate(self.keys) if key.startswith(prefix)}
+
+    def select(self, prefix=None, since=None, until=None, delete_markers=None):
+        """
+            Rows below prefix, modified in [since, until) and, if delete_markers
+            is given, only delete markers (True) or only object versions (False).
+        """
+        if delete_markers is None:
+            rows = range(self.rows)
+        else:
+            flags = self.flags.tobytes()
+            rows = list(_find_all(flags, bytes([DELETE_MARKER if delete_markers else 0])))
+        if prefix:
+            wanted = self.key_ids(prefix)
+            keys = self.key
+            rows = [i for i in rows if keys[i] in wanted]
+        if since is not None or until is not None:
+            low = to_micros(since) if since is not None else -2 ** 63
+            high = to_micros(until) if until is not None else 2 ** 63 - 1
+            last_modified = self.last_modified
+            rows = [i for i in rows if low <= last_modified[i] < high]
+        return list(rows)
+
+    def count_by_key(self, rows):
+        """Counter of key -> rows among rows."""
+        keys = self.key
+        return Counter({self.keys[key_id]: n for key_id, n in Counter(keys[i] for i in rows).items()})
+
+    def totals(self, rows=None):
+        """(object versions, delete markers, bytes) among rows, by default all."""
+        if rows is None:
+            markers = self.flags.tobytes().count(DELETE_MARKER)
+            return self.rows - markers, markers, sum(self.size)
+        markers = sum(self.flags[i] & DELETE_MARKER for i in rows)
+        size = self.size
+        return len(rows) - markers, markers, sum(size[i] for i in rows)
+
+    def latest(self):
+        """
+            {key: row of its newest entry}. On a LastModified tie a row of a later
+            append wins, within one the row listed first: listings are newest
+            first per key.
+        """
+        latest = {}
+        keys, last_modified = self.key, self.last_modified
+        bounds = self.segments + [self.rows]
+        for start, end in zip(bounds, bounds[1:]):
+            for row in range(start, end):
+                best = latest.get(keys[row])
+                if (best is None or last_modified[row] > last_modified[best]
+                        or (last_modified[row] == last_modified[best] and best < start)):
+                    latest[keys[row]] = row
+        return {self.keys[key_id]: row for key_id, row in latest.items()}
+
+    def find(self, key):
+        """Rows of key, in catalog order."""
+        key_id = self._key_ids.get(key)
+        if key_id is None:
+            return []
+        return list(_find_all(self.key.tobytes(), array("I", [key_id]).tobytes()))
+
+
+def _find_all(data, needle):
+    """Indexes of every item equal to needle, a value of len(needle) bytes, with bytes.find running in C."""
+    width = len(needle)
+    i = data.find(needle)
+    while i != -1:
+        if i % width:
+            # Straddles two items
+            i = data.find(needle, i + 1)
+            continue
+        yield i // width
+        i = data.find(needle, i + width)
@@ -0,0 +1,145 @@
+"""
+    Delete markers that change no read: every version-agnostic DELETE of a
+    deleted key stacks one more marker, and every listing pages past all of
+    them. Histories are streamed key by key and two kinds of markers are
+    removed in batched delete_objects:
+
+    - redundant: all but one marker of a run of consecutive markers. The
+      key reads as deleted either way.
+    - expired: the markers of a key without any object version left, what
+      the ExpiredObjectDeleteMarker lifecycle action removes. The key then
+      disappears from listings, reads stay 404.
+
+    keep=NEWEST keeps a run's newest marker, so the current marker keeps
+    its VersionId, but reads at a point in time inside the run see the
+    version below it. keep=OLDEST keeps the marker that deleted the key and
+    every point-in-time state with it.
+
+    Runs are only as right as the order of the history: a marker and a
+    version written in the same second share a LastModified, so only the
+    listing's own order tells whether a version sits between two markers.
+    Histories are streamed with exact_order and a page that cannot tell
+    stops the compaction before anything is deleted for it.
+"""
+import heapq
+import itertools
+from dataclasses import dataclass, field
+
+from purge import delete_versions
+from version_stream import iter_key_histories
+
+NEWEST = "newest"
+OLDEST = "oldest"
+KEEP = (NEWEST, OLDEST)
+
+
+@dataclass
+class KeyMarkers:
+    key: str
+    entries: int = 0
+    delete_markers: int = 0
+    # Runs of two or more consecutive markers
+    runs: int = 0
+    longest_run: int = 0
+    redundant: list = field(default_factory=list)
+    expired: list = field(default_factory=list)
+
+    @property
+    def removable(self):
+        return self.redundant + self.expired
+
+
+def marker_runs(entries):
+    """Runs of consecutive delete markers in a history newest first, each newest first."""
+    return [list(run) for is_marker, run in itertools.groupby(entries, key=lambda entry: entry.is_delete_marker)
+            if is_marker]
+
+
+def analyze_key(entries, keep=NEWEST):
+    """KeyMarkers of one key's history, newest first."""
+    if keep not in KEEP:
+        raise ValueError(f"keep must be one of {KEEP}")
+    report = KeyMarkers(entries[0].key, entries=len(entries))
+    runs = marker_runs(entries)
+    report.delete_markers = sum(map(len, runs))
+    if report.delete_markers == len(entries):
+        report.expired = list(entries)
+    for run in runs:
+        report.longest_run = max(report.longest_run, len(run))
+        if len(run) < 2:
+            continue
+        report.runs += 1
+        if not report.expired:
+            report.redundant.extend(run[1:] if keep == NEWEST else run[:-1])
+    return report
+
+
+@dataclass
+class CompactionReport:
+    keep: str
+    keys: int = 0
+    entries: int = 0
+    delete_markers: int = 0
+    keys_with_runs: int = 0
+    runs: int = 0
+    redundant: int = 0
+    expired: int = 0
+    expired_keys: int = 0
+    # The keys with the longest runs, longest first
+    top: list = field(default_factory=list)
+
+    @property
+    def removable(self):
+        return self.redundant + self.expired
+
+    def add(self, key_report):
+        self.keys += 1
+        self.entries += key_report.entries
+        self.delete_markers += key_report.delete_markers
+        self.keys_with_runs += bool(key_report.runs)
+        self.runs += key_report.runs
+        self.redundant += len(key_report.redundant)
+        self.expired += len(key_report.expired)
+        self.expired_keys += bool(key_report.expired)
+
+
+def _collect(key_reports, report, top):
+    """Yield the removable markers of key_reports while adding them up in report."""
+    heap = []
+    order = itertools.count()
+    for key_report in key_reports:
+        report.add(key_report)
+        if top and key_report.longest_run > 1:
+            # Reports in the heap drop their marker lists, the top stays small
+            item = (key_report.longest_run, next(order), key_report)
+            if len(heap) < top:
+                heapq.heappush(heap, item)
+            elif item[0] > heap[0][0]:
+                heapq.heapreplace(heap, item)
+        yield from key_report.removable
+        key_report.redundant = []
+        key_report.expired = []
+    report.top = [item[2] for item in sorted(heap, key=lambda item: (-item[0], item[1]))]
+
+
+def iter_key_reports(s3_client, bucket_name, prefix="", keep=NEWEST, **stream_kwargs):
+    stream_kwargs.setdefault("exact_order", True)
+    for _, entries in iter_key_histories(s3_client, bucket_name, prefix, **stream_kwargs):
+        yield analyze_key(entries, keep)
+
+
+def compact(s3_client, bucket_name, prefix="", keep=NEWEST, dry_run=True, top=20, max_workers=8,
+            batch_size=1000, **stream_kwargs):
+    """
+        Report, and unless dry_run delete, the redundant and expired markers
+        below prefix as the listing finds them. Returns (CompactionReport,
+        PurgeResult or None for a dry run).
+    """
+    report = CompactionReport(keep)
+    removable = _collect(iter_key_reports(s3_client, bucket_name, prefix, keep, **stream_kwargs), report, top)
+    if dry_run:
+        for _ in removable:
+            pass
+        return report, None
+    result = delete_versions(s3_client, bucket_name, removable, max_workers=max_workers, batch_size=batch_size)
+    return report, result
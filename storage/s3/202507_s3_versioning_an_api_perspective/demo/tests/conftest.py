@@ -0,0 +1,207 @@
+import asyncio
+import inspect
+import json
+import os
+from collections import defaultdict
+
+import pytest
+
+from aio_s3 import AsyncS3Client
+from backends import BACKEND_ENV, BACKENDS, DEFAULT_BACKEND, make_backend
+from instrumentation import S3CallRecorder
+from namespace import RUN_ID_ENV, Namespace, make_run_id
+from network import NETWORK_ENV, PROFILES, NetworkShim
+from purge import purge_prefix
+from scenarios import ScenarioCache
+
+_durations = defaultdict(float)
+_s3_tests = set()
+_setup_seconds_key = pytest.StashKey[float]()
+_run_id_key = pytest.StashKey[str]()
+_recorder = S3CallRecorder()
+_network = None
+_scenarios = None
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("s3", "S3 versioning demo")
+    group.addoption(
+        "--s3-backend",
+        choices=sorted(BACKENDS),
+        default=os.environ.get(BACKEND_ENV, DEFAULT_BACKEND),
+        help=f"where the tests run: the deployed stack (aws) or in-process (default: ${BACKEND_ENV} or {DEFAULT_BACKEND})",
+    )
+    group.addoption(
+        "--s3-network",
+        choices=sorted(PROFILES),
+        default=os.environ.get(NETWORK_ENV, "none"),
+        help=f"simulated latency, bandwidth and throttling between the tests and the S3 client "
+             f"(default: ${NETWORK_ENV} or none)",
+    )
+    group.addoption(
+        "--s3-network-seed",
+        type=int,
+        default=0,
+        help="seed of the simulated network, runs with the same seed draw the same delays",
+    )
+    group.addoption(
+        "--s3-timings",
+        metavar="PATH",
+        help="write per-test durations of this run to PATH as JSON",
+    )
+    group.addoption(
+        "--s3-metrics",
+        metavar="PATH",
+        help="write latency/request/retry/byte metrics of all S3 calls to PATH as JSON "
+             "(default: s3_metrics.json next to the --ctrf report, if any)",
+    )
+
+
+def pytest_configure(config):
+    workerinput = getattr(config, "workerinput", None)
+    # One run id per invocation: the controller draws it, pytest-xdist workers get it from there
+    config.stash[_run_id_key] = (workerinput["s3_run_id"] if workerinput is not None
+                                 else os.environ.get(RUN_ID_ENV) or make_run_id())
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node):
+    node.workerinput["s3_run_id"] = node.config.stash[_run_id_key]
+
+
+@pytest.fixture(scope="session")
+def s3_backend(request):
+    backend = make_backend(request.config.getoption("--s3-backend"))
+    backend.start()
+    _recorder.attach(backend.client())
+    network = request.config.getoption("--s3-network")
+    if network != "none":
+        global _network
+        _network = NetworkShim.named(network, request.config.getoption("--s3-network-seed"))
+        _network.attach(backend.client())
+    yield backend
+    request.config.stash[_setup_seconds_key] = backend.setup_seconds()
+    backend.stop()
+
+@pytest.fixture(scope="session")
+def ns(request, s3_backend):
+    namespace = Namespace(request.config.stash[_run_id_key])
+    yield namespace
+    # Catch what module cleanups leave behind, e.g. keys purged before but not after a test
+    purge_prefix(s3_backend.client(), s3_backend.bucket_name(), namespace.root)
+
+@pytest.fixture(scope="session")
+def bucket_name(s3_backend):
+    return s3_backend.bucket_name()
+
+@pytest.fixture(scope="session")
+def s3_client(s3_backend):
+    client = s3_backend.client()
+    yield client
+
+@pytest.fixture(scope="session")
+def scenarios(s3_client, bucket_name, ns):
+    """Shared, read-only version histories, written once per session (see scenarios.py)."""
+    global _scenarios
+    _scenarios = ScenarioCache(s3_client, bucket_name, ns.key("scenarios/"))
+    return _scenarios
+
+@pytest.fixture
+def scenario_copy(s3_backend, scenarios):
+    """scenario_copy(scenario) -> a History the test may write to, see ScenarioCache.copies."""
+    with scenarios.copies(s3_backend) as copy:
+        yield copy
+
+@pytest.fixture
+def s3_async(s3_client):
+    """The session client as coroutines; a fresh wrapper per test, as every async test gets its own loop."""
+    client = AsyncS3Client(s3_client)
+    yield client
+    client.close()
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    # async def tests run to completion on their own event loop, no plugin needed
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    kwargs = {name: pyfuncitem.funcargs[name] for name in pyfuncitem._fixtureinfo.argnames}
+    asyncio.run(pyfuncitem.obj(**kwargs))
+    return True
+
+
+def _phase(item, phase):
+    _recorder.test = item.nodeid
+    _recorder.phase = phase
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_setup(item):
+    if {"s3_client", "bucket_name"} & set(item.fixturenames):
+        _s3_tests.add(item.nodeid)
+    _phase(item, "setup")
+    yield
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    _phase(item, "call")
+    yield
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_teardown(item):
+    _phase(item, "teardown")
+    yield
+    _recorder.test = _recorder.phase = None
+
+
+def pytest_runtest_logreport(report):
+    _durations[report.nodeid] += report.duration
+
+
+def _metrics_path(config):
+    path = config.getoption("--s3-metrics")
+    ctrf = getattr(config.option, "ctrf", None)
+    if not path and ctrf:
+        path = os.path.join(os.path.dirname(ctrf), "s3_metrics.json")
+    return path
+
+
+def pytest_sessionfinish(session):
+    workeroutput = getattr(session.config, "workeroutput", None)
+    if workeroutput is not None:
+        # pytest-xdist worker: the controller merges and writes the metrics
+        workeroutput["s3_metrics"] = _recorder.export()
+        return
+    path = _metrics_path(session.config)
+    if path:
+        _recorder.write(path, backend=session.config.getoption("--s3-backend"))
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error):
+    _recorder.merge(node.workeroutput.get("s3_metrics", []))
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    backend = config.getoption("--s3-backend")
+    total = sum(_durations.values())
+    terminalreporter.write_sep("-", f"S3 backend {backend}: {len(_durations)} tests, {total:.3f}s in setup/call/teardown")
+    if _network is not None:
+        terminalreporter.write_line(
+            f"simulated network {config.getoption('--s3-network')} (seed {_network.seed}): "
+            f"{_network.throttled} requests throttled")
+    if _scenarios is not None:
+        terminalreporter.write_line(
+            f"scenarios: {len(_scenarios)} histories written once, {_scenarios.reused_steps} writes reused")
+    setup_seconds = config.stash.get(_setup_seconds_key, 0.0)
+    if _s3_tests and setup_seconds:
+        # Not measured: assumes every further test would have paid the first one's setup again
+        estimated = setup_seconds * (len(_s3_tests) - 1)
+        terminalreporter.write_line(
+            f"shared S3 client and export lookup: {1000 * setup_seconds:.1f}ms once instead of per test, "
+            f"an estimated {estimated:.3f}s saved over {len(_s3_tests)} tests (setup time x further tests)")
+
+    path = config.getoption("--s3-timings")
+    if path:
+        with open(path, "w") as f:
+            json.dump({"backend": backend, "total": total, "tests": dict(_durations)}, f, indent=2)
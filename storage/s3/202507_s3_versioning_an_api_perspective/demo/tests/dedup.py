@@ -0,0 +1,187 @@
+"""
+    Redundant bytes in a prefix's version history: versions of one key whose
+    content another version of the key already stores, identified by ETag and
+    size, reported per key and optionally deleted in batches.
+
+    ETag is the MD5 of the body for single-part uploads and the MD5 of the
+    part MD5s with a "-<parts>" suffix for multipart uploads. Equal ETags
+    mean equal bytes either way, but the same bytes uploaded with another
+    part layout get another ETag. Such versions have the same size as a
+    version of another layout and are only reported as ambiguous, never
+    deleted.
+
+    Histories are streamed key by key, memory is bounded by the longest
+    history plus the top keys of the report.
+"""
+import heapq
+import itertools
+from dataclasses import dataclass, field
+
+from purge import delete_versions
+from version_stream import iter_key_histories
+
+# Deletable: versions identical to the version right before them, the history
+# reads the same at every point in time without them
+CONSECUTIVE = "consecutive"
+# Deletable: every noncurrent version whose content a newer version keeps,
+# point-in-time states in between are lost
+ANY = "any"
+SCOPES = (CONSECUTIVE, ANY)
+
+NEW, CHANGED, UNCHANGED, REVERTED, DELETED = "new", "changed", "unchanged", "reverted", "deleted"
+
+
+def content_id(entry):
+    return entry.etag, entry.size
+
+
+def parts(etag):
+    """Parts of a multipart ETag, 0 for a single-part one."""
+    _, dash, count = (etag or "").strip('"').rpartition("-")
+    return int(count) if dash and count.isdigit() else 0
+
+
+def diff_history(entries):
+    """
+        (entry, change) for a history newest first, oldest first: NEW, CHANGED,
+        UNCHANGED if identical to the version right before, REVERTED if
+        identical to an earlier one, DELETED for delete markers.
+    """
+    seen = set()
+    previous = None
+    changes = []
+    for entry in reversed(entries):
+        if entry.is_delete_marker:
+            change = DELETED
+        else:
+            content = content_id(entry)
+            if previous is not None and not previous.is_delete_marker and content_id(previous) == content:
+                change = UNCHANGED
+            elif content in seen:
+                change = REVERTED
+            else:
+                change = NEW if not seen else CHANGED
+            seen.add(content)
+        changes.append((entry, change))
+        previous = entry
+    return changes
+
+
+@dataclass
+class KeyReport:
+    key: str
+    versions: int = 0
+    delete_markers: int = 0
+    contents: int = 0
+    bytes: int = 0
+    redundant_versions: int = 0
+    redundant_bytes: int = 0
+    ambiguous: int = 0
+    # Noncurrent versions the scope allows to delete
+    removable: list = field(default_factory=list)
+
+    @property
+    def removable_bytes(self):
+        return sum(entry.size for entry in self.removable)
+
+
+def analyze_key(entries, scope=CONSECUTIVE):
+    """KeyReport of one key's history, newest first."""
+    if scope not in SCOPES:
+        raise ValueError(f"scope must be one of {SCOPES}")
+    report = KeyReport(entries[0].key)
+    current = entries[0]
+    groups = {}
+    for entry in entries:
+        if entry.is_delete_marker:
+            report.delete_markers += 1
+            continue
+        report.versions += 1
+        report.bytes += entry.size
+        groups.setdefault(content_id(entry), []).append(entry)
+    report.contents = len(groups)
+    for (_, size), members in groups.items():
+        report.redundant_versions += len(members) - 1
+        report.redundant_bytes += size * (len(members) - 1)
+
+    # Same size, another part layout: maybe the same bytes, an ETag cannot tell
+    layouts = {}
+    for etag, size in groups:
+        layouts.setdefault(size, set()).add(parts(etag))
+    report.ambiguous = sum(len(members) for (_, size), members in groups.items() if len(layouts[size]) > 1)
+
+    if scope == CONSECUTIVE:
+        report.removable = [entry for entry, change in diff_history(entries)
+                            if change == UNCHANGED and entry is not current]
+    else:
+        # Keep the newest member of every group, it is the current version if that is in the group
+        report.removable = [entry for members in groups.values() for entry in members[1:]]
+    return report
+
+
+def iter_key_reports(s3_client, bucket_name, prefix="", scope=CONSECUTIVE, **stream_kwargs):
+    for _, entries in iter_key_histories(s3_client, bucket_name, prefix, **stream_kwargs):
+        yield analyze_key(entries, scope)
+
+
+@dataclass
+class DedupReport:
+    scope: str
+    keys: int = 0
+    versions: int = 0
+    bytes: int = 0
+    redundant_versions: int = 0
+    redundant_bytes: int = 0
+    removable_versions: int = 0
+    removable_bytes: int = 0
+    ambiguous: int = 0
+    # The keys with the most redundant bytes, most first
+    top: list = field(default_factory=list)
+
+    def add(self, key_report):
+        self.keys += 1
+        self.versions += key_report.versions
+        self.bytes += key_report.bytes
+        self.redundant_versions += key_report.redundant_versions
+        self.redundant_bytes += key_report.redundant_bytes
+        self.removable_versions += len(key_report.removable)
+        self.removable_bytes += key_report.removable_bytes
+        self.ambiguous += key_report.ambiguous
+
+
+def _collect(key_reports, report, top):
+    """Yield the removable entries of key_reports while adding them up in report."""
+    heap = []
+    order = itertools.count()
+    for key_report in key_reports:
+        report.add(key_report)
+        if top and key_report.redundant_bytes:
+            # Reports in the heap drop their removable lists, the top stays small
+            item = (key_report.redundant_bytes, next(order), key_report)
+            if len(heap) < top:
+                heapq.heappush(heap, item)
+            elif item[0] > heap[0][0]:
+                heapq.heapreplace(heap, item)
+        yield from key_report.removable
+        key_report.removable = []
+    report.top = [item[2] for item in sorted(heap, key=lambda item: (-item[0], item[1]))]
+
+
+def analyze(s3_client, bucket_name, prefix="", scope=CONSECUTIVE, top=20, **stream_kwargs):
+    report = DedupReport(scope)
+    for _ in _collect(iter_key_reports(s3_client, bucket_name, prefix, scope, **stream_kwargs), report, top):
+        pass
+    return report
+
+
+def deduplicate(s3_client, bucket_name, prefix="", scope=CONSECUTIVE, top=20, max_workers=8,
+                batch_size=1000, **stream_kwargs):
+    """
+        analyze() and delete the removable versions with batched delete_objects
+        as they are found. Only keys the listing has passed are touched.
+        Returns (DedupReport, PurgeResult).
+    """
+    report = DedupReport(scope)
+    removable = _collect(iter_key_reports(s3_client, bucket_name, prefix, scope, **stream_kwargs), report, top)
+    result = delete_versions(s3_client, bucket_name, removable, max_workers=max_workers, batch_size=batch_size)
+    return report, result
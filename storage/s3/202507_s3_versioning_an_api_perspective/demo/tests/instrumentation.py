@@ -0,0 +1,178 @@
+"""
+    Per-operation latency, request, retry and byte counters for every S3 call
+    of a client, collected through botocore's before-call/after-call events.
+"""
+import json
+import statistics
+import threading
+import time
+from collections import defaultdict
+
+_START = "s3_metrics_start"
+_TAG = "s3_metrics_tag"
+_BYTES_OUT = "s3_metrics_bytes_out"
+
+
+def summarize(latencies):
+    """Latency distribution in milliseconds."""
+    if not latencies:
+        return {"count": 0}
+    ms = sorted(1000 * seconds for seconds in latencies)
+    if len(ms) > 1:
+        cuts = statistics.quantiles(ms, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = ms[0]
+    return {
+        "count": len(ms),
+        "mean": statistics.fmean(ms),
+        "p50": p50,
+        "p95": p95,
+        "p99": p99,
+        "max": ms[-1],
+    }
+
+
+def body_size(body):
+    """Bytes a request body still has to send, 0 for a body of unknown size."""
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        return len(body)
+    if isinstance(body, str):
+        return len(body.encode())
+    if hasattr(body, "seek") and hasattr(body, "tell"):
+        # botocore hands bytes bodies over as BytesIO
+        position = body.tell()
+        size = body.seek(0, 2) - position
+        body.seek(position)
+        return size
+    return 0
+
+
+class _Counters:
+    __slots__ = ("latencies", "errors", "retries", "bytes_out", "bytes_in")
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.retries = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+
+    def add(self, latency, error, retries, bytes_out, bytes_in):
+        self.latencies.append(latency)
+        self.errors += error
+        self.retries += retries
+        self.bytes_out += bytes_out
+        self.bytes_in += bytes_in
+
+    def export(self):
+        return [self.latencies, self.errors, self.retries, self.bytes_out, self.bytes_in]
+
+    def merge(self, exported):
+        latencies, errors, retries, bytes_out, bytes_in = exported
+        self.latencies.extend(latencies)
+        self.errors += errors
+        self.retries += retries
+        self.bytes_out += bytes_out
+        self.bytes_in += bytes_in
+
+    def report(self):
+        return {
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "retries": self.retries,
+            "bytes_out": self.bytes_out,
+            "bytes_in": self.bytes_in,
+            "latency_ms": summarize(self.latencies),
+        }
+
+
+class S3CallRecorder:
+    """
+        Attach to one or more clients, then set test and phase while they run.
+        Calls are tagged with the test and phase current when they start, which
+        also covers calls made from worker threads, e.g. by purge_prefix.
+    """
+
+    def __init__(self):
+        self.test = None
+        self.phase = None
+        self._lock = threading.Lock()
+        self._by_operation = defaultdict(_Counters)
+        self._by_phase = defaultdict(_Counters)
+        self._by_test = defaultdict(_Counters)
+
+    def attach(self, client):
+        events = client.meta.events
+        # First, so a later handler answering the call itself is still measured
+        events.register_first("before-call.s3", self._before_call, unique_id=f"s3-metrics-before-{id(self)}")
+        events.register("after-call.s3", self._after_call, unique_id=f"s3-metrics-after-{id(self)}")
+        return client
+
+    def detach(self, client):
+        events = client.meta.events
+        events.unregister("before-call.s3", unique_id=f"s3-metrics-before-{id(self)}")
+        events.unregister("after-call.s3", unique_id=f"s3-metrics-after-{id(self)}")
+
+    def _before_call(self, params, context, **kwargs):
+        context[_START] = time.perf_counter()
+        context[_TAG] = (self.test, self.phase)
+        context[_BYTES_OUT] = body_size(params.get("body"))
+
+    def _after_call(self, model, parsed, context, **kwargs):
+        if _START not in context:
+            return
+        latency = time.perf_counter() - context[_START]
+        test, phase = context[_TAG]
+        metadata = parsed.get("ResponseMetadata", {})
+        error = metadata.get("HTTPStatusCode", 200) >= 300
+        retries = metadata.get("RetryAttempts", 0)
+        bytes_in = parsed.get("ContentLength", 0) if model.name == "GetObject" else 0
+        sample = (latency, error, retries, context[_BYTES_OUT], bytes_in)
+        with self._lock:
+            self._by_operation[model.name].add(*sample)
+            self._by_phase[(phase, model.name)].add(*sample)
+            self._by_test[(test, phase, model.name)].add(*sample)
+
+    def _tables(self):
+        return {"operation": self._by_operation, "phase": self._by_phase, "test": self._by_test}
+
+    def export(self):
+        """Raw counters as plain lists, e.g. to ship them from a pytest-xdist worker."""
+        with self._lock:
+            return [
+                [table, key if isinstance(key, str) else list(key), counters.export()]
+                for table, counters_by_key in self._tables().items()
+                for key, counters in counters_by_key.items()
+            ]
+
+    def merge(self, exported):
+        with self._lock:
+            tables = self._tables()
+            for table, key, counters in exported:
+                key = key if isinstance(key, str) else tuple(key)
+                tables[table][key].merge(counters)
+
+    def report(self):
+        with self._lock:
+            by_phase = defaultdict(dict)
+            for (phase, operation), counters in sorted(self._by_phase.items(), key=str):
+                by_phase[str(phase)][operation] = counters.report()
+            by_test = defaultdict(lambda: defaultdict(dict))
+            for (test, phase, operation), counters in sorted(self._by_test.items(), key=str):
+                report = counters.report()
+                by_test[str(test)][str(phase)][operation] = {
+                    "requests": report["requests"],
+                    "errors": report["errors"],
+                    "retries": report["retries"],
+                    "total_ms": 1000 * sum(counters.latencies),
+                }
+            return {
+                "operations": {op: c.report() for op, c in sorted(self._by_operation.items())},
+                "phases": by_phase,
+                "tests": by_test,
+            }
+
+    def write(self, path, **extra):
+        with open(path, "w") as f:
+            json.dump({**extra, **self.report()}, f, indent=2, default=str)
@@ -0,0 +1,113 @@
+"""
+    Latest state of every key below a prefix, built from one streaming
+    ListObjectVersions pass, to answer existence questions without a
+    HeadObject round trip per key.
+
+    A key is visible only while its newest entry is an object version; a key
+    whose newest entry is a delete marker is soft-deleted.
+"""
+import json
+from dataclasses import asdict, dataclass
+
+from version_stream import iter_key_histories
+
+
+@dataclass(frozen=True, slots=True)
+class LatestState:
+    version_id: str
+    is_deleted: bool
+    size: int
+    etag: str
+    noncurrent_count: int
+
+    @classmethod
+    def from_history(cls, entries):
+        latest = entries[0]
+        return cls(latest.version_id, latest.is_delete_marker, latest.size, latest.etag, len(entries) - 1)
+
+
+class LatestStateIndex:
+    def __init__(self, prefix=""):
+        self.prefix = prefix
+        # Last key of an incomplete build, refresh() continues after it
+        self.key_marker = None
+        self._states = {}
+
+    @classmethod
+    def build(cls, s3_client, bucket_name, prefix="", max_keys=None, **stream_kwargs):
+        index = cls(prefix)
+        index.refresh(s3_client, bucket_name, max_keys=max_keys, **stream_kwargs)
+        return index
+
+    @property
+    def complete(self):
+        return self.key_marker is None
+
+    def refresh(self, s3_client, bucket_name, from_key_marker=None, max_keys=None, **stream_kwargs):
+        """
+            Re-index the keys after from_key_marker, by default after the saved
+            key_marker; from_key_marker="" rescans the whole prefix. With
+            max_keys the pass stops after that many keys and saves its position.
+            Returns the number of keys indexed.
+        """
+        start = self.key_marker if from_key_marker is None else from_key_marker
+        seen = set()
+        last_key = None
+        truncated = False
+        for key, entries in iter_key_histories(s3_client, bucket_name, self.prefix,
+                                               key_marker=start or None, **stream_kwargs):
+            if max_keys is not None and len(seen) == max_keys:
+                truncated = True
+                break
+            self._states[key] = LatestState.from_history(entries)
+            seen.add(key)
+            last_key = key
+
+        # Keys of the scanned range that were not listed again are gone
+        for key in list(self._states):
+            if key in seen or (start and key <= start) or (truncated and key > last_key):
+                continue
+            del self._states[key]
+        self.key_marker = last_key if truncated else None
+        return len(seen)
+
+    def __len__(self):
+        return len(self._states)
+
+    def __contains__(self, key):
+        return self.visible(key)
+
+    def get(self, key):
+        return self._states.get(key)
+
+    def visible(self, key):
+        state = self._states.get(key)
+        return state is not None and not state.is_deleted
+
+    def exists(self, keys):
+        """{key: visible} for many keys at once, what a HeadObject per key would answer."""
+        return {key: self.visible(key) for key in keys}
+
+    def visible_keys(self):
+        return sorted(key for key, state in self._states.items() if not state.is_deleted)
+
+    def soft_deleted(self):
+        """Keys hidden by a delete marker."""
+        return sorted(key for key, state in self._states.items() if state.is_deleted)
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({
+                "prefix": self.prefix,
+                "key_marker": self.key_marker,
+                "states": {key: asdict(state) for key, state in self._states.items()},
+            }, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        index = cls(data["prefix"])
+        index.key_marker = data["key_marker"]
+        index._states = {key: LatestState(**state) for key, state in data["states"].items()}
+        return index
@@ -0,0 +1,179 @@
+"""
+    Offline replay of a version history through S3 lifecycle rules, to
+    predict what NoncurrentVersionExpiration, NewerNoncurrentVersions,
+    ExpiredObjectDeleteMarker and AbortIncompleteMultipartUpload leave
+    behind before the rules are deployed.
+
+    Rules use the shape of PutBucketLifecycleConfiguration, the same shape
+    infra/s3_stack.py takes. Histories are (key, entries newest first) pairs
+    as iter_key_histories yields them.
+"""
+import math
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta, timezone
+
+from version_stream import iter_key_histories
+
+_ACTIONS = {"NoncurrentVersionExpiration", "Expiration", "AbortIncompleteMultipartUpload"}
+_IGNORED = {"ID", "Status", "Filter", "Prefix", "Transitions", "NoncurrentVersionTransitions"}
+
+
+def _next_midnight(moment):
+    # S3 rounds every lifecycle due date up to the next midnight UTC
+    midnight = datetime.combine(moment.date(), time(), timezone.utc)
+    return midnight if midnight == moment else midnight + timedelta(days=1)
+
+
+@dataclass(frozen=True)
+class Rule:
+    prefix: str = ""
+    noncurrent_days: int = None
+    newer_noncurrent_versions: int = 0
+    expired_object_delete_marker: bool = False
+    abort_after_days: int = None
+
+    @classmethod
+    def parse(cls, rule):
+        """A Rule from one rule dict, None if the rule is disabled."""
+        unknown = set(rule) - _ACTIONS - _IGNORED
+        if unknown:
+            raise ValueError(f"unsupported lifecycle rule elements: {sorted(unknown)}")
+        expiration = rule.get("Expiration", {})
+        if set(expiration) - {"ExpiredObjectDeleteMarker"}:
+            raise ValueError("only Expiration.ExpiredObjectDeleteMarker can be simulated")
+        rule_filter = rule.get("Filter", {})
+        if set(rule_filter) - {"Prefix"}:
+            raise ValueError("only Prefix filters can be simulated")
+        if rule.get("Status", "Enabled") != "Enabled":
+            return None
+        noncurrent = rule.get("NoncurrentVersionExpiration", {})
+        return cls(
+            prefix=rule_filter.get("Prefix", rule.get("Prefix", "")),
+            noncurrent_days=noncurrent.get("NoncurrentDays"),
+            newer_noncurrent_versions=noncurrent.get("NewerNoncurrentVersions", 0),
+            expired_object_delete_marker=expiration.get("ExpiredObjectDeleteMarker", False),
+            abort_after_days=rule.get("AbortIncompleteMultipartUpload", {}).get("DaysAfterInitiation"),
+        )
+
+    def expires_noncurrent(self, rank, noncurrent_since, at):
+        """Whether the rank-th newest noncurrent version (0 based) is gone at `at`."""
+        return (self.noncurrent_days is not None
+                and rank >= self.newer_noncurrent_versions
+                and _next_midnight(noncurrent_since + timedelta(days=self.noncurrent_days)) <= at)
+
+    def aborts(self, initiated, at):
+        return (self.abort_after_days is not None
+                and _next_midnight(initiated + timedelta(days=self.abort_after_days)) <= at)
+
+
+def parse_rules(rules):
+    """Enabled rules from a list of rule dicts or a {"Rules": [...]} configuration."""
+    if isinstance(rules, dict):
+        rules = rules["Rules"]
+    return [parsed for parsed in map(Rule.parse, rules) if parsed is not None]
+
+
+@dataclass
+class HistoryTotals:
+    versions: int = 0
+    delete_markers: int = 0
+    bytes: int = 0
+
+    @property
+    def entries(self):
+        return self.versions + self.delete_markers
+
+    def pages(self, page_size=1000):
+        """ListObjectVersions requests to list every entry."""
+        return max(1, math.ceil(self.entries / page_size))
+
+    def add(self, entry):
+        if entry.is_delete_marker:
+            self.delete_markers += 1
+        else:
+            self.versions += 1
+            self.bytes += entry.size
+
+
+@dataclass
+class LifecycleForecast:
+    at: datetime
+    page_size: int = 1000
+    before: HistoryTotals = field(default_factory=HistoryTotals)
+    after: HistoryTotals = field(default_factory=HistoryTotals)
+    # VersionEntry objects the rules remove, usable with purge.delete_versions
+    expired: list = field(default_factory=list)
+    aborted_uploads: list = field(default_factory=list)
+
+    @property
+    def pages_before(self):
+        return self.before.pages(self.page_size)
+
+    @property
+    def pages_after(self):
+        return self.after.pages(self.page_size)
+
+    def report(self):
+        return {
+            "at": self.at.isoformat(),
+            "versions": (self.before.versions, self.after.versions),
+            "delete_markers": (self.before.delete_markers, self.after.delete_markers),
+            "bytes": (self.before.bytes, self.after.bytes),
+            "list_pages": (self.pages_before, self.pages_after),
+            "expired": len(self.expired),
+            "aborted_uploads": len(self.aborted_uploads),
+        }
+
+
+def expire_history(entries, rules, at):
+    """Split one key's history, newest first, into (kept, expired) at `at`."""
+    kept, expired = [], []
+    for rank, entry in enumerate(entries[1:]):
+        # A version turns noncurrent when its successor is written
+        since = entries[rank].last_modified
+        if any(rule.expires_noncurrent(rank, since, at) for rule in rules):
+            expired.append(entry)
+        else:
+            kept.append(entry)
+    current = entries[0]
+    # A delete marker with nothing left below it is expired; S3 may need one more
+    # lifecycle run for it once the noncurrent versions are gone, this counts it now
+    if (current.is_delete_marker and not kept
+            and any(rule.expired_object_delete_marker for rule in rules)):
+        expired.insert(0, current)
+    else:
+        kept.insert(0, current)
+    return kept, expired
+
+
+def simulate(histories, rules, at=None, page_size=1000, uploads=()):
+    """
+        Replay histories through rules as they stand at `at` (default now).
+        uploads are ListMultipartUploads entries, checked against
+        AbortIncompleteMultipartUpload.
+    """
+    rules = parse_rules(rules)
+    forecast = LifecycleForecast(at or datetime.now(timezone.utc), page_size)
+    for key, entries in histories:
+        applicable = [rule for rule in rules if key.startswith(rule.prefix)]
+        kept, expired = expire_history(entries, applicable, forecast.at) if applicable else (entries, [])
+        for entry in entries:
+            forecast.before.add(entry)
+        for entry in kept:
+            forecast.after.add(entry)
+        forecast.expired.extend(expired)
+    for upload in uploads:
+        if any(rule.aborts(upload["Initiated"], forecast.at)
+               for rule in rules if upload["Key"].startswith(rule.prefix)):
+            forecast.aborted_uploads.append(upload)
+    return forecast
+
+
+def simulate_bucket(s3_client, bucket_name, rules, prefix="", at=None, page_size=1000):
+    """simulate() over the live versions and incomplete uploads below prefix."""
+    uploads = [upload
+               for page in s3_client.get_paginator("list_multipart_uploads").paginate(Bucket=bucket_name,
+                                                                                       Prefix=prefix)
+               for upload in page.get("Uploads", [])]
+    histories = iter_key_histories(s3_client, bucket_name, prefix, page_size=page_size)
+    return simulate(histories, rules, at, page_size, uploads)
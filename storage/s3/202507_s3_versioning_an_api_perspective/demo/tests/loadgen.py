@@ -0,0 +1,176 @@
+"""
+    Build versioned-bucket shapes (keys x versions, stacked delete markers) and
+    drive concurrent mixed GET/HEAD/PUT/ListObjectVersions workloads against them.
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from botocore.exceptions import ClientError
+
+from instrumentation import summarize
+
+# Expected answers of a version-agnostic read of a key hidden by a delete marker
+_HIDDEN = {"NoSuchKey", "404"}
+
+
+@dataclass(frozen=True)
+class Shape:
+    keys: int = 20
+    versions_per_key: int = 100
+    delete_marker_ratio: float = 0.1
+    object_size: int = 1024
+    seed: int = 0
+
+
+@dataclass
+class Dataset:
+    """What build() wrote: per key the object version ids and delete marker ids, oldest first."""
+    prefix: str
+    versions: dict = field(default_factory=dict)
+    markers: dict = field(default_factory=dict)
+    # The body of every version, what put_version writes too
+    body: bytes = b""
+
+    @property
+    def keys(self):
+        return list(self.versions)
+
+
+def _build_key(s3_client, bucket_name, key, shape, rng, body):
+    versions, markers = [], []
+    for _ in range(shape.versions_per_key):
+        versions.append(s3_client.put_object(Bucket=bucket_name, Key=key, Body=body)["VersionId"])
+        if rng.random() < shape.delete_marker_ratio:
+            markers.append(s3_client.delete_object(Bucket=bucket_name, Key=key)["VersionId"])
+    return key, versions, markers
+
+
+def build(s3_client, bucket_name, prefix, shape, max_workers=8):
+    """Write shape below prefix. Keys are built concurrently, versions of one key in order."""
+    body = random.Random(shape.seed).randbytes(shape.object_size)
+    dataset = Dataset(prefix=prefix, body=body)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(_build_key, s3_client, bucket_name, f"{prefix}key{k:05d}", shape,
+                        random.Random(f"{shape.seed}/{k}"), body)
+            for k in range(shape.keys)
+        ]
+        for future in futures:
+            key, versions, markers = future.result()
+            dataset.versions[key] = versions
+            dataset.markers[key] = markers
+    return dataset
+
+
+def _get_latest(s3_client, bucket_name, dataset, rng):
+    s3_client.get_object(Bucket=bucket_name, Key=rng.choice(dataset.keys))["Body"].read()
+
+def _get_version(s3_client, bucket_name, dataset, rng):
+    key = rng.choice(dataset.keys)
+    s3_client.get_object(Bucket=bucket_name, Key=key, VersionId=rng.choice(dataset.versions[key]))["Body"].read()
+
+def _head_latest(s3_client, bucket_name, dataset, rng):
+    s3_client.head_object(Bucket=bucket_name, Key=rng.choice(dataset.keys))
+
+def _head_version(s3_client, bucket_name, dataset, rng):
+    key = rng.choice(dataset.keys)
+    s3_client.head_object(Bucket=bucket_name, Key=key, VersionId=rng.choice(dataset.versions[key]))
+
+def _put_version(s3_client, bucket_name, dataset, rng):
+    # A new latest version, later reads may pick it
+    key = rng.choice(dataset.keys)
+    dataset.versions[key].append(s3_client.put_object(Bucket=bucket_name, Key=key, Body=dataset.body)["VersionId"])
+
+def _list_versions(s3_client, bucket_name, dataset, rng):
+    # The full history of one key, which pages once it holds more than 1000 entries
+    paginator = s3_client.get_paginator("list_object_versions")
+    for _ in paginator.paginate(Bucket=bucket_name, Prefix=rng.choice(dataset.keys)):
+        pass
+
+
+OPERATIONS = {
+    "get_latest": _get_latest,
+    "get_version": _get_version,
+    "head_latest": _head_latest,
+    "head_version": _head_version,
+    "put_version": _put_version,
+    "list_versions": _list_versions,
+}
+
+DEFAULT_MIX = {"get_latest": 3, "get_version": 3, "head_latest": 2, "head_version": 1, "put_version": 1,
+               "list_versions": 1}
+
+
+def parse_mix(text):
+    """'get_latest=3,list_versions=1' -> {'get_latest': 3, 'list_versions': 1}"""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in OPERATIONS:
+            raise ValueError(f"unknown operation {name!r}, expected one of {sorted(OPERATIONS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+@dataclass
+class LoadResult:
+    concurrency: int
+    elapsed: float
+    latencies: dict
+    hidden: dict
+    errors: dict
+
+    @property
+    def operations(self):
+        return sum(len(latencies) for latencies in self.latencies.values())
+
+    @property
+    def throughput(self):
+        return self.operations / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return {
+            name: {**summarize(latencies), "hidden": self.hidden.get(name, 0), "errors": self.errors.get(name, 0)}
+            for name, latencies in sorted(self.latencies.items())
+        }
+
+
+def run(s3_client, bucket_name, dataset, operations=1000, concurrency=8, mix=None, seed=0):
+    """Run a fixed number of operations drawn from mix on concurrency threads."""
+    mix = mix or DEFAULT_MIX
+    names, weights = list(mix), list(mix.values())
+    latencies = {name: [] for name in names}
+    hidden = dict.fromkeys(names, 0)
+    errors = dict.fromkeys(names, 0)
+    lock = threading.Lock()
+
+    def worker(index, count):
+        rng = random.Random(f"{seed}/{index}")
+        local = {name: [] for name in names}
+        local_hidden = dict.fromkeys(names, 0)
+        local_errors = dict.fromkeys(names, 0)
+        for name in rng.choices(names, weights, k=count):
+            start = time.perf_counter()
+            try:
+                OPERATIONS[name](s3_client, bucket_name, dataset, rng)
+            except ClientError as e:
+                if e.response["Error"]["Code"] in _HIDDEN:
+                    local_hidden[name] += 1
+                else:
+                    local_errors[name] += 1
+            local[name].append(time.perf_counter() - start)
+        with lock:
+            for name in names:
+                latencies[name].extend(local[name])
+                hidden[name] += local_hidden[name]
+                errors[name] += local_errors[name]
+
+    share, rest = divmod(operations, concurrency)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker, i, share + (i < rest)) for i in range(concurrency)]:
+            future.result()
+    return LoadResult(concurrency, time.perf_counter() - start, latencies, hidden, errors)
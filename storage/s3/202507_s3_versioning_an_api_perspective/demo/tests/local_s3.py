@@ -0,0 +1,574 @@
+"""
+    A boto3-shaped S3 client over VersionStore, for the operations the suite uses.
+
+    Responses and errors follow S3: version-agnostic reads of a key hidden by a
+    delete marker fail with NoSuchKey/404, version-specific reads of a delete
+    marker with MethodNotAllowed/405 and unknown versions with NoSuchVersion.
+"""
+import copy
+import functools
+import hashlib
+import io
+import re
+import secrets
+import threading
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, unquote
+
+from botocore.exceptions import ClientError
+from botocore.hooks import HierarchicalEmitter
+
+from version_store import NULL_VERSION_ID, VersionStore, etag_of
+from version_stream import LISTING_ORDER
+
+# S3 rejects multipart parts below 5 MiB, except for the last one
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+_STATUS = {
+    "NoSuchBucket": 404,
+    "NoSuchKey": 404,
+    "NoSuchVersion": 404,
+    "404": 404,
+    "MethodNotAllowed": 405,
+    "405": 405,
+    "BucketAlreadyOwnedByYou": 409,
+    "NoSuchUpload": 404,
+    "InvalidArgument": 400,
+    "InvalidRequest": 400,
+    "InvalidPart": 400,
+    "InvalidPartOrder": 400,
+    "EntityTooSmall": 400,
+    "400": 400,
+    "PreconditionFailed": 412,
+    "412": 412,
+    "InvalidRange": 416,
+}
+
+
+def _error(operation, code, message=""):
+    return ClientError(
+        {"Error": {"Code": code, "Message": message},
+         "ResponseMetadata": {"HTTPStatusCode": _STATUS[code]}},
+        operation,
+    )
+
+
+def _metadata(status=200):
+    return {"ResponseMetadata": {"HTTPStatusCode": status}}
+
+
+def _timestamp(seconds):
+    return datetime.fromtimestamp(seconds, timezone.utc)
+
+
+class _OperationModel:
+    """The part of botocore's OperationModel that event handlers read."""
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+
+class _Meta:
+    def __init__(self):
+        self.events = HierarchicalEmitter()
+        self.region_name = "us-east-1"
+
+
+def _api(operation):
+    """
+        Emit botocore's before-call/after-call events around a client method, so
+        handlers registered on client.meta.events see native calls like real ones.
+        As in botocore, a before-call handler may answer the call itself.
+    """
+    model = _OperationModel(operation)
+
+    def decorate(method):
+        @functools.wraps(method)
+        def call(self, **kwargs):
+            context = {}
+            events = self.meta.events
+            _, answer = events.emit_until_response(
+                f"before-call.s3.{operation}", model=model, params={"body": kwargs.get("Body")}, context=context)
+            if answer is not None:
+                http_response, response = answer
+            else:
+                http_response = None
+                try:
+                    response = method(self, **kwargs)
+                except ClientError as e:
+                    response = e.response
+            events.emit(f"after-call.s3.{operation}", http_response=http_response, parsed=response,
+                        model=model, context=context)
+            if response["ResponseMetadata"]["HTTPStatusCode"] >= 300:
+                raise ClientError(response, operation)
+            return response
+        return call
+    return decorate
+
+
+class _Body(io.BytesIO):
+    """Enough of botocore's StreamingBody for the suite."""
+
+    def iter_chunks(self, chunk_size=1024):
+        while chunk := self.read(chunk_size):
+            yield chunk
+
+
+def _bytes(body):
+    if hasattr(body, "read"):
+        body = body.read()
+    elif isinstance(body, str):
+        body = body.encode()
+    return bytes(body)
+
+
+def _byte_range(header, size):
+    """(first, last) of a Range header such as bytes=0-99, bytes=100- or bytes=-50, None if unsatisfiable."""
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", header)
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        first, last = max(size - int(last), 0), size - 1
+    else:
+        first, last = int(first), min(int(last), size - 1) if last else size - 1
+    if first >= size or first > last:
+        return None
+    return first, last
+
+
+class _Upload:
+    __slots__ = ("key", "metadata", "content_type", "initiated", "parts")
+
+    def __init__(self, key, metadata, content_type, initiated):
+        self.key = key
+        self.metadata = metadata
+        self.content_type = content_type
+        self.initiated = initiated
+        self.parts = {}
+
+
+class _Bucket:
+    __slots__ = ("store", "versioning", "uploads", "lock")
+
+    def __init__(self, clock):
+        self.store = VersionStore(clock=clock) if clock else VersionStore()
+        self.versioning = None
+        self.uploads = {}
+        self.lock = threading.Lock()
+
+    @property
+    def versioned(self):
+        return self.versioning == "Enabled"
+
+    def snapshot(self):
+        bucket = _Bucket.__new__(_Bucket)
+        bucket.store = self.store.snapshot()
+        bucket.versioning = self.versioning
+        bucket.uploads = copy.deepcopy(self.uploads)
+        bucket.lock = threading.Lock()
+        return bucket
+
+
+class LocalS3:
+    """The buckets of one emulated account, shared by all clients created from it."""
+
+    def __init__(self, clock=None):
+        self.buckets = {}
+        self._clock = clock
+
+    def client(self):
+        return LocalS3Client(self)
+
+    def snapshot(self):
+        """The state of all buckets, copy-on-write: cheap to take and to restore."""
+        return {name: bucket.snapshot() for name, bucket in self.buckets.items()}
+
+    def restore(self, snapshot):
+        """Reset all buckets to snapshot, which stays usable for further restores."""
+        self.buckets = {name: bucket.snapshot() for name, bucket in snapshot.items()}
+
+
+class _Paginator:
+    def __init__(self, client, operation):
+        self._client = client
+        self._operation = operation
+
+    def paginate(self, PaginationConfig=None, **kwargs):
+        page_size = (PaginationConfig or {}).get("PageSize")
+        if page_size:
+            kwargs["MaxKeys"] = page_size
+        method = getattr(self._client, self._operation)
+        while True:
+            page = method(**kwargs)
+            yield page
+            if not page["IsTruncated"]:
+                return
+            if self._operation == "list_object_versions":
+                kwargs["KeyMarker"] = page["NextKeyMarker"]
+                kwargs["VersionIdMarker"] = page["NextVersionIdMarker"]
+            else:
+                kwargs["ContinuationToken"] = page["NextContinuationToken"]
+
+
+class LocalS3Client:
+    _paginated = ("list_object_versions", "list_objects_v2", "list_multipart_uploads")
+
+    def __init__(self, s3):
+        self._s3 = s3
+        self.meta = _Meta()
+
+    def get_paginator(self, operation_name):
+        if operation_name not in self._paginated:
+            raise ValueError(f"no paginator for {operation_name}")
+        return _Paginator(self, operation_name)
+
+    def _bucket(self, operation, name):
+        try:
+            return self._s3.buckets[name]
+        except KeyError:
+            raise _error(operation, "404" if operation == "HeadObject" else "NoSuchBucket",
+                         f"The specified bucket {name} does not exist") from None
+
+    # Buckets
+
+    @_api("CreateBucket")
+    def create_bucket(self, *, Bucket, **kwargs):
+        if Bucket in self._s3.buckets:
+            raise _error("CreateBucket", "BucketAlreadyOwnedByYou")
+        self._s3.buckets[Bucket] = _Bucket(self._s3._clock)
+        return {"Location": f"/{Bucket}", **_metadata()}
+
+    @_api("PutBucketVersioning")
+    def put_bucket_versioning(self, *, Bucket, VersioningConfiguration):
+        status = VersioningConfiguration.get("Status")
+        if status != "Enabled":
+            raise _error("PutBucketVersioning", "InvalidArgument", "only Status=Enabled is emulated")
+        self._bucket("PutBucketVersioning", Bucket).versioning = status
+        return _metadata()
+
+    @_api("GetBucketVersioning")
+    def get_bucket_versioning(self, *, Bucket):
+        bucket = self._bucket("GetBucketVersioning", Bucket)
+        return {"Status": bucket.versioning, **_metadata()} if bucket.versioning else _metadata()
+
+    # Objects
+
+    @_api("PutObject")
+    def put_object(self, *, Bucket, Key, Body=b"", Metadata=None, ContentType=None):
+        bucket = self._bucket("PutObject", Bucket)
+        version = bucket.store.put(Key, _bytes(Body), metadata=Metadata, content_type=ContentType,
+                                   versioned=bucket.versioned)
+        response = {"ETag": version.etag, **_metadata()}
+        if bucket.versioned:
+            response["VersionId"] = version.version_id
+        return response
+
+    @staticmethod
+    def _copy_source(CopySource):
+        """(bucket, key, version id) of a CopySource dict or "bucket/key?versionId=..." string."""
+        if isinstance(CopySource, dict):
+            return CopySource["Bucket"], CopySource["Key"], CopySource.get("VersionId")
+        path, _, query = CopySource.lstrip("/").partition("?")
+        bucket, _, key = path.partition("/")
+        return bucket, unquote(key), parse_qs(query).get("versionId", [None])[0]
+
+    @_api("CopyObject")
+    def copy_object(self, *, Bucket, Key, CopySource, CopySourceIfMatch=None, MetadataDirective="COPY",
+                    Metadata=None, ContentType=None):
+        source_bucket, source_key, source_version_id = self._copy_source(CopySource)
+        try:
+            source = self._resolve("GetObject", source_bucket, source_key, source_version_id)
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "MethodNotAllowed":
+                raise _error("CopyObject", e.response["Error"]["Code"], e.response["Error"]["Message"]) from None
+            raise _error("CopyObject", "InvalidRequest",
+                         "The source of a copy request may not specifically refer to a delete marker "
+                         "by version id.") from None
+        if CopySourceIfMatch is not None and CopySourceIfMatch.strip('"') != source.etag.strip('"'):
+            raise _error("CopyObject", "PreconditionFailed",
+                         "At least one of the pre-conditions you specified did not hold")
+        if MetadataDirective == "REPLACE":
+            metadata, content_type = Metadata, ContentType
+        else:
+            metadata, content_type = source.metadata, source.content_type
+        bucket = self._bucket("CopyObject", Bucket)
+        # A single-part copy: a multipart source gets the plain MD5 ETag, as in S3
+        version = bucket.store.put(Key, source.body, metadata=metadata, content_type=content_type,
+                                   versioned=bucket.versioned)
+        response = {
+            "CopyObjectResult": {"ETag": version.etag, "LastModified": _timestamp(version.last_modified)},
+            **_metadata(),
+        }
+        if bucket.versioned:
+            response["VersionId"] = version.version_id
+        if source.version_id != NULL_VERSION_ID:
+            response["CopySourceVersionId"] = source.version_id
+        return response
+
+    def _resolve(self, operation, Bucket, Key, VersionId):
+        """The object version a GET/HEAD addresses, or the S3 error for it."""
+        head = operation == "HeadObject"
+        store = self._bucket(operation, Bucket).store
+        if VersionId is None:
+            version = store.latest(Key)
+            if version is None or version.is_delete_marker:
+                raise _error(operation, "404" if head else "NoSuchKey", "The specified key does not exist.")
+            return version
+        version = store.get_version(Key, VersionId)
+        if version is None:
+            raise _error(operation, "404" if head else "NoSuchVersion",
+                         "The specified version does not exist.")
+        if version.is_delete_marker:
+            raise _error(operation, "405" if head else "MethodNotAllowed",
+                         "The specified method is not allowed against this resource.")
+        return version
+
+    @staticmethod
+    def _check_if_match(operation, version, IfMatch):
+        if IfMatch is not None and IfMatch.strip('"') != version.etag.strip('"'):
+            raise _error(operation, "412" if operation == "HeadObject" else "PreconditionFailed",
+                         "At least one of the pre-conditions you specified did not hold")
+
+    @staticmethod
+    def _describe(version):
+        response = {
+            "LastModified": _timestamp(version.last_modified),
+            "ContentLength": version.size,
+            "ETag": version.etag,
+            "ContentType": version.content_type,
+            "Metadata": dict(version.metadata),
+            **_metadata(),
+        }
+        if version.version_id != NULL_VERSION_ID:
+            response["VersionId"] = version.version_id
+        return response
+
+    @_api("HeadObject")
+    def head_object(self, *, Bucket, Key, VersionId=None, IfMatch=None):
+        version = self._resolve("HeadObject", Bucket, Key, VersionId)
+        self._check_if_match("HeadObject", version, IfMatch)
+        return self._describe(version)
+
+    @_api("GetObject")
+    def get_object(self, *, Bucket, Key, VersionId=None, IfMatch=None, Range=None):
+        version = self._resolve("GetObject", Bucket, Key, VersionId)
+        self._check_if_match("GetObject", version, IfMatch)
+        response = self._describe(version)
+        if Range is None:
+            return {"Body": _Body(version.body), **response}
+        byte_range = _byte_range(Range, version.size)
+        if byte_range is None:
+            raise _error("GetObject", "InvalidRange", "The requested range is not satisfiable")
+        first, last = byte_range
+        response.update(
+            ContentLength=last - first + 1,
+            ContentRange=f"bytes {first}-{last}/{version.size}",
+            **_metadata(206),
+        )
+        return {"Body": _Body(version.body[first:last + 1]), **response}
+
+    @_api("DeleteObject")
+    def delete_object(self, *, Bucket, Key, VersionId=None):
+        return self._delete(self._bucket("DeleteObject", Bucket), Key, VersionId)
+
+    @staticmethod
+    def _delete(bucket, Key, VersionId):
+        if VersionId is None:
+            marker = bucket.store.add_delete_marker(Key, versioned=bucket.versioned)
+            return {"DeleteMarker": True, "VersionId": marker.version_id, **_metadata(204)}
+        removed = bucket.store.remove_version(Key, VersionId)
+        response = {"VersionId": VersionId, **_metadata(204)}
+        if removed is not None and removed.is_delete_marker:
+            response["DeleteMarker"] = True
+        return response
+
+    @_api("DeleteObjects")
+    def delete_objects(self, *, Bucket, Delete):
+        bucket = self._bucket("DeleteObjects", Bucket)
+        deleted = []
+        for obj in Delete["Objects"]:
+            response = self._delete(bucket, obj["Key"], obj.get("VersionId"))
+            if not Delete.get("Quiet"):
+                entry = {"Key": obj["Key"], "VersionId": response["VersionId"]}
+                if response.get("DeleteMarker"):
+                    entry["DeleteMarker"] = True
+                deleted.append(entry)
+        response = _metadata()
+        if deleted:
+            response["Deleted"] = deleted
+        return response
+
+    # Multipart uploads
+
+    def _upload(self, operation, bucket, Key, UploadId):
+        upload = bucket.uploads.get(UploadId)
+        if upload is None or upload.key != Key:
+            raise _error(operation, "NoSuchUpload", "The specified upload does not exist.")
+        return upload
+
+    @_api("CreateMultipartUpload")
+    def create_multipart_upload(self, *, Bucket, Key, Metadata=None, ContentType=None):
+        bucket = self._bucket("CreateMultipartUpload", Bucket)
+        upload_id = secrets.token_urlsafe(32)
+        with bucket.lock:
+            bucket.uploads[upload_id] = _Upload(Key, dict(Metadata or {}), ContentType, bucket.store.now())
+        return {"Bucket": Bucket, "Key": Key, "UploadId": upload_id, **_metadata()}
+
+    @_api("UploadPart")
+    def upload_part(self, *, Bucket, Key, UploadId, PartNumber, Body=b""):
+        bucket = self._bucket("UploadPart", Bucket)
+        body = _bytes(Body)
+        etag = etag_of(body)
+        with bucket.lock:
+            self._upload("UploadPart", bucket, Key, UploadId).parts[PartNumber] = (body, etag)
+        return {"ETag": etag, **_metadata()}
+
+    @_api("UploadPartCopy")
+    def upload_part_copy(self, *, Bucket, Key, UploadId, PartNumber, CopySource, CopySourceRange=None,
+                         CopySourceIfMatch=None):
+        source_bucket, source_key, source_version_id = self._copy_source(CopySource)
+        try:
+            source = self._resolve("GetObject", source_bucket, source_key, source_version_id)
+        except ClientError as e:
+            raise _error("UploadPartCopy", e.response["Error"]["Code"], e.response["Error"]["Message"]) from None
+        if CopySourceIfMatch is not None and CopySourceIfMatch.strip('"') != source.etag.strip('"'):
+            raise _error("UploadPartCopy", "PreconditionFailed",
+                         "At least one of the pre-conditions you specified did not hold")
+        body = source.body
+        if CopySourceRange is not None:
+            byte_range = _byte_range(CopySourceRange, source.size)
+            if byte_range is None:
+                raise _error("UploadPartCopy", "InvalidArgument", "The x-amz-copy-source-range value is invalid")
+            body = body[byte_range[0]:byte_range[1] + 1]
+        bucket = self._bucket("UploadPartCopy", Bucket)
+        etag = etag_of(body)
+        with bucket.lock:
+            self._upload("UploadPartCopy", bucket, Key, UploadId).parts[PartNumber] = (body, etag)
+        return {"CopyPartResult": {"ETag": etag, "LastModified": _timestamp(bucket.store.now())}, **_metadata()}
+
+    @_api("CompleteMultipartUpload")
+    def complete_multipart_upload(self, *, Bucket, Key, UploadId, MultipartUpload):
+        operation = "CompleteMultipartUpload"
+        bucket = self._bucket(operation, Bucket)
+        with bucket.lock:
+            upload = self._upload(operation, bucket, Key, UploadId)
+            requested = MultipartUpload["Parts"]
+            numbers = [part["PartNumber"] for part in requested]
+            if numbers != sorted(set(numbers)):
+                raise _error(operation, "InvalidPartOrder", "The list of parts was not in ascending order.")
+            parts = []
+            for part in requested:
+                stored = upload.parts.get(part["PartNumber"])
+                if stored is None or stored[1].strip('"') != part["ETag"].strip('"'):
+                    raise _error(operation, "InvalidPart", "One or more of the specified parts could not be found.")
+                parts.append(stored)
+            if any(len(body) < MIN_PART_SIZE for body, _ in parts[:-1]):
+                raise _error(operation, "EntityTooSmall", "Your proposed upload is smaller than the minimum allowed size")
+            del bucket.uploads[UploadId]
+
+        digest = hashlib.md5(b"".join(bytes.fromhex(etag.strip('"')) for _, etag in parts)).hexdigest()
+        version = bucket.store.put(Key, b"".join(body for body, _ in parts), metadata=upload.metadata,
+                                   content_type=upload.content_type, etag=f'"{digest}-{len(parts)}"',
+                                   versioned=bucket.versioned)
+        response = {"Bucket": Bucket, "Key": Key, "ETag": version.etag, **_metadata()}
+        if bucket.versioned:
+            response["VersionId"] = version.version_id
+        return response
+
+    @_api("AbortMultipartUpload")
+    def abort_multipart_upload(self, *, Bucket, Key, UploadId):
+        bucket = self._bucket("AbortMultipartUpload", Bucket)
+        with bucket.lock:
+            self._upload("AbortMultipartUpload", bucket, Key, UploadId)
+            del bucket.uploads[UploadId]
+        return _metadata(204)
+
+    @_api("ListMultipartUploads")
+    def list_multipart_uploads(self, *, Bucket, Prefix=""):
+        bucket = self._bucket("ListMultipartUploads", Bucket)
+        with bucket.lock:
+            uploads = sorted((upload.key, upload_id, upload.initiated)
+                             for upload_id, upload in bucket.uploads.items() if upload.key.startswith(Prefix))
+        response = {"Bucket": Bucket, "Prefix": Prefix, "IsTruncated": False, **_metadata()}
+        if uploads:
+            response["Uploads"] = [
+                {"Key": key, "UploadId": upload_id, "Initiated": _timestamp(initiated)}
+                for key, upload_id, initiated in uploads
+            ]
+        return response
+
+    # Listings
+
+    @_api("ListObjectVersions")
+    def list_object_versions(self, *, Bucket, Prefix="", KeyMarker="", VersionIdMarker="", MaxKeys=1000):
+        store = self._bucket("ListObjectVersions", Bucket).store
+        max_keys = min(max(MaxKeys, 1), 1000)
+        try:
+            entries, truncated, next_key, next_version = store.list_versions(
+                prefix=Prefix, key_marker=KeyMarker, version_id_marker=VersionIdMarker, max_keys=max_keys)
+        except KeyError:
+            raise _error("ListObjectVersions", "InvalidArgument", "Invalid version id specified") from None
+
+        latest_ids = {}
+        versions, markers = [], []
+        for entry in entries:
+            if entry.key not in latest_ids:
+                latest = store.latest(entry.key)
+                latest_ids[entry.key] = latest.version_id if latest else None
+            item = {
+                "Key": entry.key,
+                "VersionId": entry.version_id,
+                "IsLatest": latest_ids[entry.key] == entry.version_id,
+                "LastModified": _timestamp(entry.last_modified),
+            }
+            if entry.is_delete_marker:
+                markers.append(item)
+            else:
+                item.update(ETag=entry.etag, Size=entry.size, StorageClass="STANDARD")
+                versions.append(item)
+
+        response = {
+            "Name": Bucket,
+            "Prefix": Prefix,
+            "KeyMarker": KeyMarker,
+            "VersionIdMarker": VersionIdMarker,
+            "MaxKeys": max_keys,
+            "IsTruncated": truncated,
+            **_metadata(),
+        }
+        if versions:
+            response["Versions"] = versions
+        if markers:
+            response["DeleteMarkers"] = markers
+        if truncated:
+            response["NextKeyMarker"] = next_key
+            response["NextVersionIdMarker"] = next_version
+        # What version_stream.track_listing_order adds to the pages of a botocore client
+        response[LISTING_ORDER] = [entry.is_delete_marker for entry in entries]
+        return response
+
+    @_api("ListObjectsV2")
+    def list_objects_v2(self, *, Bucket, Prefix="", MaxKeys=1000, StartAfter="", ContinuationToken=None):
+        store = self._bucket("ListObjectsV2", Bucket).store
+        max_keys = min(max(MaxKeys, 1), 1000)
+        latest, truncated = store.list_latest(prefix=Prefix, start_after=ContinuationToken or StartAfter,
+                                              max_keys=max_keys)
+        response = {
+            "Name": Bucket,
+            "Prefix": Prefix,
+            "MaxKeys": max_keys,
+            "KeyCount": len(latest),
+            "IsTruncated": truncated,
+            **_metadata(),
+        }
+        if latest:
+            response["Contents"] = [
+                {"Key": v.key, "LastModified": _timestamp(v.last_modified), "ETag": v.etag,
+                 "Size": v.size, "StorageClass": "STANDARD"}
+                for v in latest
+            ]
+        if truncated:
+            response["NextContinuationToken"] = latest[-1].key
+        return response
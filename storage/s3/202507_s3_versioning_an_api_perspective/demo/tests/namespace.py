@@ -0,0 +1,34 @@
+import os
+import time
+import uuid
+
+RUN_ID_ENV = "S3_TEST_RUN_ID"
+ROOT = "runs/"
+
+
+def make_run_id():
+    return f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{uuid.uuid4().hex[:8]}"
+
+
+class Namespace:
+    """
+        Root prefix of one test run and worker. Every key the suite writes goes
+        through key(), so runs and pytest-xdist workers sharing one bucket never
+        see each other's objects: runs/<run id>/<worker>/<key>.
+    """
+
+    def __init__(self, run_id=None, worker=None):
+        self.run_id = run_id or os.environ.get(RUN_ID_ENV) or make_run_id()
+        self.worker = worker or os.environ.get("PYTEST_XDIST_WORKER", "main")
+        self.root = f"{ROOT}{self.run_id}/{self.worker}/"
+
+    def key(self, key=""):
+        return self.root + key
+
+    def relative(self, key):
+        if not key.startswith(self.root):
+            raise ValueError(f"{key!r} is outside of namespace {self.root!r}")
+        return key[len(self.root):]
+
+    def __repr__(self):
+        return f"Namespace({self.root!r})"
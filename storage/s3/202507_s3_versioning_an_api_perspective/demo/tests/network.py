@@ -0,0 +1,151 @@
+"""
+    Simulated network between the suite and an emulated S3 client: per-
+    operation latency distributions, a per-connection bandwidth cap and
+    probabilistic SlowDown/503 throttling with the client's retries.
+
+    NetworkShim hooks into client.meta.events, so it works for the native
+    and the moto client alike and S3CallRecorder measures what it adds.
+    Every call draws from its own generator, seeded with the seed, the
+    operation and the call's number for that operation: a run is
+    reproducible call by call when serial, and draws the same samples per
+    operation when concurrent.
+"""
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+
+from botocore.awsrequest import AWSResponse
+
+from instrumentation import body_size
+
+NETWORK_ENV = "S3_NETWORK"
+
+# S3CallRecorder keeps its own context keys, these do not clash
+_ATTEMPTS = "network-shim-attempts"
+# botocore's standard retry mode caps the exponential backoff at 20s
+MAX_BACKOFF = 20.0
+_Z99 = 2.3263
+
+
+@dataclass(frozen=True)
+class Latency:
+    """Lognormal round trip time in ms, given by its median and its 99th percentile."""
+    median_ms: float
+    p99_ms: float = None
+
+    def sample(self, rng):
+        if not self.p99_ms or self.p99_ms <= self.median_ms:
+            return self.median_ms / 1000
+        sigma = math.log(self.p99_ms / self.median_ms) / _Z99
+        return rng.lognormvariate(math.log(self.median_ms), sigma) / 1000
+
+
+@dataclass(frozen=True)
+class NetworkProfile:
+    latency: Latency = Latency(0)
+    # Latencies of single operations, e.g. {"ListObjectVersions": Latency(40, 150)}
+    operations: dict = field(default_factory=dict)
+    # Bytes/s of one connection, each concurrent call has its own
+    bandwidth: float = math.inf
+    # Share of requests answered with 503 SlowDown, each attempt drawn anew
+    throttle_rate: float = 0.0
+    max_attempts: int = 5
+
+    @classmethod
+    def fixed(cls, rtt_ms, bandwidth=math.inf, **kwargs):
+        return cls(Latency(rtt_ms), bandwidth=bandwidth, **kwargs)
+
+    def latency_of(self, operation):
+        return self.operations.get(operation, self.latency)
+
+
+MiB = 2 ** 20
+
+PROFILES = {
+    "none": NetworkProfile(),
+    "lan": NetworkProfile(Latency(1, 3), bandwidth=500 * MiB),
+    # Same-region S3 from EC2: small requests, first byte in tens of ms
+    "s3": NetworkProfile(
+        Latency(15, 60),
+        operations={
+            "PutObject": Latency(25, 100),
+            "DeleteObjects": Latency(50, 200),
+            "ListObjectVersions": Latency(40, 150),
+            "ListObjectsV2": Latency(30, 120),
+        },
+        bandwidth=80 * MiB,
+    ),
+    "s3-throttled": NetworkProfile(Latency(15, 60), bandwidth=80 * MiB, throttle_rate=0.05),
+    "cross-region": NetworkProfile(Latency(80, 250), bandwidth=20 * MiB),
+}
+
+
+def _slow_down(attempts):
+    return AWSResponse(None, 503, {}, None), {
+        "Error": {"Code": "SlowDown", "Message": "Please reduce your request rate."},
+        "ResponseMetadata": {"HTTPStatusCode": 503, "RetryAttempts": attempts - 1},
+    }
+
+
+class NetworkShim:
+    def __init__(self, profile, seed=0, sleep=time.sleep):
+        self.profile = profile
+        self.seed = seed
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.throttled = 0
+
+    @classmethod
+    def named(cls, name, seed=0, **kwargs):
+        return cls(PROFILES[name], seed, **kwargs)
+
+    def attach(self, client):
+        events = client.meta.events
+        events.register("before-call.s3", self._before_call, unique_id=f"network-before-{id(self)}")
+        # First, so the retries it reports are seen by the metrics recorder
+        events.register_first("after-call.s3", self._after_call, unique_id=f"network-after-{id(self)}")
+        return client
+
+    def detach(self, client):
+        events = client.meta.events
+        events.unregister("before-call.s3", unique_id=f"network-before-{id(self)}")
+        events.unregister("after-call.s3", unique_id=f"network-after-{id(self)}")
+
+    def _rng(self, operation):
+        with self._lock:
+            number = self._calls[operation] = self._calls.get(operation, 0) + 1
+        return random.Random(f"{self.seed}/{operation}/{number}")
+
+    def _before_call(self, model, params, context, **kwargs):
+        profile = self.profile
+        rng = self._rng(model.name)
+        latency = profile.latency_of(model.name)
+        for attempt in range(1, profile.max_attempts + 1):
+            self._sleep(latency.sample(rng))
+            if rng.random() >= profile.throttle_rate:
+                break
+            with self._lock:
+                self.throttled += 1
+            if attempt == profile.max_attempts:
+                return _slow_down(attempt)
+            self._sleep(min(rng.random() * 2 ** (attempt - 1), MAX_BACKOFF))
+        context[_ATTEMPTS] = attempt
+        self._transfer(body_size(params.get("body")))
+        return None
+
+    def _after_call(self, model, parsed, context, **kwargs):
+        attempts = context.get(_ATTEMPTS)
+        if attempts is None:
+            # Throttled out in before-call, the error response carries the retries
+            return
+        metadata = parsed.setdefault("ResponseMetadata", {})
+        metadata["RetryAttempts"] = metadata.get("RetryAttempts", 0) + attempts - 1
+        if model.name == "GetObject" and metadata.get("HTTPStatusCode", 200) < 300:
+            self._transfer(parsed.get("ContentLength", 0))
+
+    def _transfer(self, size):
+        if size and self.profile.bandwidth != math.inf:
+            self._sleep(size / self.profile.bandwidth)
@@ -0,0 +1,155 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from botocore.exceptions import ClientError
+
+# DeleteObjects accepts at most 1000 keys per request
+MAX_BATCH_SIZE = 1000
+# Errors of a whole DeleteObjects call that the same call may not get again
+RETRYABLE_ERRORS = {"SlowDown", "Throttling", "ThrottlingException", "RequestLimitExceeded", "InternalError",
+                    "ServiceUnavailable", "503"}
+
+
+@dataclass
+class PurgeResult:
+    deleted: int = 0
+    failed: int = 0
+    batches: int = 0
+    retries: int = 0
+    elapsed: float = 0.0
+    errors: list = field(default_factory=list)
+
+    def merge(self, other):
+        self.deleted += other.deleted
+        self.failed += other.failed
+        self.batches += other.batches
+        self.retries += other.retries
+        self.errors.extend(other.errors)
+
+
+def check_attempts(max_attempts):
+    """ValueError unless max_attempts allows at least one delete_objects call."""
+    if max_attempts < 1:
+        raise ValueError("max_attempts must be at least 1")
+
+
+def delete_batch(s3_client, bucket_name, objects, max_attempts, backoff):
+    """
+        Delete one batch of {Key, VersionId} entries, retrying the entries reported
+        in Errors, or all of them after a throttled or failed call.
+    """
+    result = PurgeResult(batches=1)
+    pending = objects
+    for attempt in range(max_attempts):
+        if attempt:
+            result.retries += 1
+            time.sleep(backoff * 2 ** (attempt - 1))
+        try:
+            response = s3_client.delete_objects(
+                Bucket=bucket_name,
+                Delete={"Objects": pending, "Quiet": True},
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in RETRYABLE_ERRORS:
+                raise
+            errors = [{**o, "Code": e.response["Error"]["Code"], "Message": e.response["Error"].get("Message", "")}
+                      for o in pending]
+        else:
+            errors = response.get("Errors", [])
+            result.deleted += len(pending) - len(errors)
+        if not errors:
+            return result
+        failed = {(e["Key"], e.get("VersionId")) for e in errors}
+        pending = [o for o in pending if (o["Key"], o.get("VersionId")) in failed]
+        last_errors = errors
+
+    result.failed += len(pending)
+    result.errors.extend(last_errors)
+    return result
+
+
+def _identifier(entry):
+    if isinstance(entry, dict):
+        return {"Key": entry["Key"], "VersionId": entry["VersionId"]}
+    return {"Key": entry.key, "VersionId": entry.version_id}
+
+
+def iter_batches(entries, batch_size):
+    """{Key, VersionId} lists of up to batch_size entries, consuming entries lazily."""
+    batch = []
+    for entry in entries:
+        batch.append(_identifier(entry))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def delete_versions(s3_client, bucket_name, entries, max_workers=8,
+                    batch_size=MAX_BATCH_SIZE, max_attempts=5, backoff=0.1):
+    """
+        Delete an iterable of version entries ({Key, VersionId} dicts or VersionEntry)
+        with concurrent delete_objects batches. At most max_workers batches are
+        in flight, so the iterable is consumed lazily.
+    """
+    if not 1 <= batch_size <= MAX_BATCH_SIZE:
+        raise ValueError(f"batch_size must be between 1 and {MAX_BATCH_SIZE}")
+    check_attempts(max_attempts)
+
+    start = time.perf_counter()
+    result = PurgeResult()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        in_flight = []
+        for batch in iter_batches(entries, batch_size):
+            in_flight.append(pool.submit(
+                delete_batch, s3_client, bucket_name, batch, max_attempts, backoff))
+            if len(in_flight) >= max_workers:
+                result.merge(in_flight.pop(0).result())
+        for future in in_flight:
+            result.merge(future.result())
+
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def list_entries(s3_client, bucket_name, prefix, page_size=MAX_BATCH_SIZE):
+    """
+        Every version and delete marker below prefix, page by page as the
+        entries are consumed. The entry a page's NextKeyMarker and
+        NextVersionIdMarker name is held back until the next page is fetched:
+        the next page resumes after it, and a VersionIdMarker of a deleted
+        version is rejected (InvalidArgument) or ends the listing early.
+    """
+    held = None
+    paginator = s3_client.get_paginator('list_object_versions')
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix, PaginationConfig={'PageSize': page_size}):
+        if held:
+            yield held
+            held = None
+        marker = (page.get('NextKeyMarker'), page.get('NextVersionIdMarker'))
+        for entry in page.get('Versions', []) + page.get('DeleteMarkers', []):
+            identifier = {'Key': entry['Key'], 'VersionId': entry['VersionId']}
+            if page.get('IsTruncated') and (entry['Key'], entry['VersionId']) == marker:
+                held = identifier
+            else:
+                yield identifier
+    if held:
+        yield held
+
+
+def purge_prefix(s3_client, bucket_name, prefix, page_size=MAX_BATCH_SIZE, **kwargs):
+    """Permanently delete every version and delete marker below prefix, deleting while it lists."""
+    return delete_versions(s3_client, bucket_name, list_entries(s3_client, bucket_name, prefix, page_size), **kwargs)
+
+
+def purge_prefix_sequential(s3_client, bucket_name, prefix):
+    """The per-version delete_object loop purge_prefix replaces, kept as benchmark baseline."""
+    start = time.perf_counter()
+    result = PurgeResult()
+    for entry in list_entries(s3_client, bucket_name, prefix):
+        s3_client.delete_object(Bucket=bucket_name, Key=entry['Key'], VersionId=entry['VersionId'])
+        result.deleted += 1
+    result.elapsed = time.perf_counter() - start
+    return result
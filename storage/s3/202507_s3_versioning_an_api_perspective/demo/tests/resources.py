@@ -0,0 +1,73 @@
+"""
+    Shared AWS resources of a test session: one tuned S3 client and one
+    CloudFormation export lookup, instead of one of each per test.
+"""
+import threading
+import time
+
+import boto3
+from botocore.config import Config
+
+# Enough connections for the purge and transfer pools to run without queueing
+MAX_POOL_CONNECTIONS = 50
+
+S3_CLIENT_CONFIG = Config(
+    max_pool_connections=MAX_POOL_CONNECTIONS,
+    tcp_keepalive=True,
+    retries={"mode": "standard", "max_attempts": 5},
+)
+
+
+def make_s3_client(session=None):
+    return (session or boto3).client("s3", config=S3_CLIENT_CONFIG)
+
+
+class ExportResolver:
+    """Paginated, cached lookup of CloudFormation exports by name."""
+
+    def __init__(self, cf_client=None):
+        self._cf_client = cf_client
+        self._exports = None
+        self._lock = threading.Lock()
+        self.lookup_seconds = 0.0
+
+    def _load(self):
+        start = time.perf_counter()
+        cf_client = self._cf_client or boto3.client("cloudformation")
+        exports = {}
+        for page in cf_client.get_paginator("list_exports").paginate():
+            for export in page["Exports"]:
+                exports[export["Name"]] = export["Value"]
+        self.lookup_seconds = time.perf_counter() - start
+        return exports
+
+    def get(self, name):
+        with self._lock:
+            if self._exports is None:
+                self._exports = self._load()
+        try:
+            return self._exports[name]
+        except KeyError:
+            raise ValueError(f"export with name {name} not found") from None
+
+    def invalidate(self):
+        with self._lock:
+            self._exports = None
+
+
+class TimedResource:
+    """Creates a value once and remembers how long that took."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._value = None
+        self._lock = threading.Lock()
+        self.seconds = 0.0
+
+    def get(self):
+        with self._lock:
+            if self._value is None:
+                start = time.perf_counter()
+                self._value = self._factory()
+                self.seconds = time.perf_counter() - start
+        return self._value
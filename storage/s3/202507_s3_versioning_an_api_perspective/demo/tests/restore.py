@@ -0,0 +1,246 @@
+"""
+    Point-in-time restore of a prefix from its version history: every key is
+    put back into the state it had at time `at`, the version that was latest
+    then, or absent if it did not exist or was hidden by a delete marker.
+
+    COPY keeps the history and writes the old state forward: the old version
+    is copied server-side on top, or a delete marker hides the key. DELETE
+    rewinds the history: every version and delete marker newer than `at` is
+    permanently deleted.
+
+    Keys already in their old state are skipped, so a restore only touches
+    keys that changed and a rerun is cheap. A restored copy carries the
+    VersionId it was copied from in its metadata: copying a multipart
+    version gives it a different ETag, and only the metadata tells it from a
+    change. Sources beyond CopyObject's 5 GB are copied in parts. Keys are planned from one
+    streaming ListObjectVersions pass and executed chunk by chunk; after each
+    chunk the last key is checkpointed, and a restore with the same
+    checkpoint file resumes after it.
+"""
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+
+from botocore.exceptions import ClientError
+
+from purge import delete_versions
+from transfer import MAX_COPY_SIZE, copy_multipart
+from version_stream import iter_key_histories
+
+COPY = "copy"
+DELETE = "delete"
+MODES = (COPY, DELETE)
+# A checkpoint only resumes the restore it was written by
+_IDENTITY = ("prefix", "at", "mode")
+# User metadata of a restored copy: the VersionId it was copied from
+RESTORED_FROM = "restored-from-version"
+
+
+@dataclass(frozen=True)
+class Action:
+    key: str
+    # "copy" the version source_version_id forward, add a "delete_marker", or "delete_versions"
+    kind: str
+    source_version_id: str = None
+    versions: tuple = ()
+
+
+def _matches(current, target, restored_from=None):
+    """
+        Whether the current latest entry already shows what target showed.
+        restored_from(current) reads the RESTORED_FROM metadata of a version,
+        asked only where the ETag cannot tell.
+    """
+    if target is None or target.is_delete_marker:
+        return current.is_delete_marker
+    if current.is_delete_marker:
+        return False
+    if current.version_id == target.version_id:
+        return True
+    if current.etag == target.etag and current.size == target.size:
+        # A restored copy of a single-part version has the old ETag
+        return True
+    # A copy of a multipart version gets an ETag of its own
+    return (restored_from is not None and "-" in target.etag.strip('"') and current.size == target.size
+            and restored_from(current) == target.version_id)
+
+
+def plan(entries, at, mode=COPY, restored_from=None):
+    """The Action restoring one key's history (newest first) to its state at `at`, None if it matches."""
+    newer = []
+    target = None
+    for entry in entries:
+        if entry.last_modified <= at:
+            target = entry
+            break
+        newer.append(entry)
+    if not newer or _matches(entries[0], target, restored_from):
+        return None
+    key = entries[0].key
+    if mode == DELETE:
+        return Action(key, "delete_versions", versions=tuple(newer))
+    if target is None or target.is_delete_marker:
+        return Action(key, "delete_marker")
+    return Action(key, "copy", source_version_id=target.version_id)
+
+
+@dataclass
+class RestoreResult:
+    keys: int = 0
+    skipped: int = 0
+    copied: int = 0
+    delete_markers: int = 0
+    versions_deleted: int = 0
+    failed: int = 0
+    chunks: int = 0
+    elapsed: float = 0.0
+    # Last key of the last chunk without failures, None once the prefix is done
+    key_marker: str = None
+    errors: list = field(default_factory=list)
+
+
+class Checkpoint:
+    """The restore's parameters, position and counters in a JSON file, written after every chunk."""
+
+    def __init__(self, path, prefix, at, mode):
+        self.path = path
+        self.state = {"prefix": prefix, "at": at.isoformat(), "mode": mode, "key_marker": None, "complete": False}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            if any(saved[name] != self.state[name] for name in _IDENTITY):
+                raise ValueError(f"checkpoint {path} belongs to another restore: {saved}")
+            self.state = saved
+
+    @property
+    def key_marker(self):
+        return self.state["key_marker"]
+
+    @property
+    def complete(self):
+        return self.state["complete"]
+
+    def save(self, result, complete=False):
+        if not self.path:
+            return
+        self.state.update(key_marker=result.key_marker, complete=complete, result={
+            k: v for k, v in asdict(result).items() if k != "errors"})
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.path)
+
+
+def _apply(s3_client, bucket_name, action, max_copy_size=MAX_COPY_SIZE):
+    if action.kind != "copy":
+        s3_client.delete_object(Bucket=bucket_name, Key=action.key)
+        return action
+    source = s3_client.head_object(Bucket=bucket_name, Key=action.key, VersionId=action.source_version_id)
+    kwargs = {"Metadata": {**source["Metadata"], RESTORED_FROM: action.source_version_id}}
+    if source.get("ContentType"):
+        kwargs["ContentType"] = source["ContentType"]
+    if source["ContentLength"] > max_copy_size:
+        copy_multipart(s3_client, bucket_name, action.key, bucket_name, action.key, action.source_version_id,
+                       source["ContentLength"], source["ETag"], **kwargs)
+    else:
+        s3_client.copy_object(Bucket=bucket_name, Key=action.key, CopySource={
+            "Bucket": bucket_name, "Key": action.key, "VersionId": action.source_version_id},
+            CopySourceIfMatch=source["ETag"], MetadataDirective="REPLACE", **kwargs)
+    return action
+
+
+def _run_chunk(s3_client, bucket_name, actions, pool, max_workers, max_copy_size, result):
+    """Execute one chunk of actions; returns whether all of them succeeded."""
+    ok = True
+    doomed = [entry for action in actions if action.kind == "delete_versions" for entry in action.versions]
+    if doomed:
+        deleted = delete_versions(s3_client, bucket_name, doomed, max_workers=max_workers)
+        result.versions_deleted += deleted.deleted
+        if deleted.failed:
+            result.failed += deleted.failed
+            result.errors.extend(deleted.errors)
+            ok = False
+
+    writes = [action for action in actions if action.kind != "delete_versions"]
+    futures = [pool.submit(_apply, s3_client, bucket_name, action, max_copy_size) for action in writes]
+    for action, future in zip(writes, futures):
+        try:
+            future.result()
+        except ClientError as e:
+            result.failed += 1
+            result.errors.append({"Key": action.key, **e.response["Error"]})
+            ok = False
+            continue
+        if action.kind == "copy":
+            result.copied += 1
+        else:
+            result.delete_markers += 1
+    return ok
+
+
+def restore_prefix(s3_client, bucket_name, prefix, at, mode=COPY, checkpoint=None, chunk_size=1000,
+                   max_workers=16, max_copy_size=MAX_COPY_SIZE, **stream_kwargs):
+    """
+        Restore every key below prefix to its state at `at`, an aware datetime.
+        With a checkpoint path the restore resumes after the key it recorded.
+        Versions larger than max_copy_size are copied with UploadPartCopy.
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}")
+    if at.tzinfo is None:
+        raise ValueError("at must be timezone-aware, LastModified is in UTC")
+    start = time.perf_counter()
+    state = Checkpoint(checkpoint, prefix, at, mode)
+    result = RestoreResult(key_marker=state.key_marker)
+    if state.complete:
+        return result
+    # The newest entry at `at` decides, of a put and a delete in one second only the listing knows it
+    stream_kwargs.setdefault("exact_order", True)
+
+    def restored_from(version):
+        return s3_client.head_object(Bucket=bucket_name, Key=version.key,
+                                     VersionId=version.version_id)["Metadata"].get(RESTORED_FROM)
+
+    clean = True
+    chunk, chunk_keys, last_key = [], 0, None
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        def flush():
+            nonlocal clean, chunk_keys
+            clean = _run_chunk(s3_client, bucket_name, chunk, pool, max_workers, max_copy_size, result) and clean
+            result.chunks += 1
+            if clean:
+                result.key_marker = last_key
+                state.save(result)
+            chunk.clear()
+            chunk_keys = 0
+
+        # Actions only touch keys the listing has left behind, so it is safe to stream
+        for key, entries in iter_key_histories(s3_client, bucket_name, prefix,
+                                               key_marker=state.key_marker, **stream_kwargs):
+            result.keys += 1
+            chunk_keys += 1
+            last_key = key
+            action = plan(entries, at, mode, restored_from)
+            if action is None:
+                result.skipped += 1
+            else:
+                chunk.append(action)
+            if chunk_keys == chunk_size:
+                flush()
+        if chunk_keys:
+            flush()
+
+    if clean:
+        result.key_marker = None
+        state.save(result, complete=True)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def parse_time(value):
+    """An ISO 8601 timestamp for `at`; without an offset it is taken as UTC."""
+    at = datetime.fromisoformat(value)
+    return at if at.tzinfo else at.replace(tzinfo=timezone.utc)
@@ -0,0 +1,139 @@
+"""
+    Version histories declared as data and written to the bucket once per
+    session, instead of once per test.
+
+    A Scenario is a sequence of steps on one key: a bytes body for a PUT,
+    DELETE for a DELETE without VersionId. ScenarioCache materializes every
+    distinct sequence once, under its own key, and hands out a History: the
+    key and the VersionIds the steps returned. Histories are shared, tests
+    must only read them.
+
+    A test that writes to a history takes a writable copy: on a backend with
+    snapshots the shared key itself, rolled back after the test, elsewhere a
+    fresh key written step by step, as before.
+"""
+import contextlib
+import itertools
+from dataclasses import dataclass
+
+from purge import purge_prefix
+
+DELETE = "delete"
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    steps: tuple
+
+    def __post_init__(self):
+        for step in self.steps:
+            if step != DELETE and not isinstance(step, bytes):
+                raise ValueError(f"scenario {self.name}: a step is a bytes body or DELETE, not {step!r}")
+
+
+@dataclass(frozen=True)
+class History:
+    key: str
+    # Per step, oldest first: the VersionId of the version or delete marker it created
+    version_ids: tuple
+    steps: tuple
+
+    @property
+    def latest_version_id(self):
+        return self.version_ids[-1]
+
+    @property
+    def is_deleted(self):
+        return self.steps[-1] == DELETE
+
+    def body(self, version_id):
+        return self.steps[self.version_ids.index(version_id)]
+
+
+ONE_VERSION = Scenario("one_version", (b"content",))
+DELETED = Scenario("deleted", (b"content", DELETE))
+OVERWRITTEN = Scenario("overwritten", (b"v1", b"v2"))
+
+
+def materialize(s3_client, bucket_name, key, steps):
+    version_ids = []
+    for step in steps:
+        if step == DELETE:
+            response = s3_client.delete_object(Bucket=bucket_name, Key=key)
+        else:
+            response = s3_client.put_object(Bucket=bucket_name, Key=key, Body=step)
+        version_ids.append(response["VersionId"])
+    return History(key, tuple(version_ids), tuple(steps))
+
+
+class ScenarioCache:
+    def __init__(self, s3_client, bucket_name, prefix):
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+        self._histories = {}
+        self._copies = itertools.count()
+        # Requests saved: steps of histories handed out again instead of written again
+        self.reused_steps = 0
+
+    def __len__(self):
+        return len(self._histories)
+
+    def get(self, scenario):
+        """
+            The shared, read-only History of scenario, written on first use.
+            Histories are keyed by name: another scenario of the same name
+            with other steps raises ValueError instead of writing to its key.
+        """
+        history = self._histories.get(scenario.steps)
+        if history is None:
+            key = self.prefix + scenario.name
+            if any(known.key == key for known in self._histories.values()):
+                raise ValueError(f"scenario {scenario.name}: the name is taken by a scenario with other steps")
+            history = self._histories[scenario.steps] = materialize(
+                self.s3_client, self.bucket_name, key, scenario.steps)
+        else:
+            self.reused_steps += len(scenario.steps)
+        return history
+
+    def forget(self, scenario):
+        """Drop the History of scenario, e.g. after the bucket was rolled back to before it was written."""
+        self._histories.pop(scenario.steps, None)
+
+    def fresh(self, scenario):
+        """A new History of scenario under a key of its own."""
+        key = f"{self.prefix}copies/{scenario.name}-{next(self._copies)}"
+        return materialize(self.s3_client, self.bucket_name, key, scenario.steps)
+
+    @contextlib.contextmanager
+    def copies(self, backend):
+        """
+            copy(scenario) -> a History the block may write to. With backend
+            snapshots the shared one, the bucket is restored when the block
+            ends; otherwise a fresh key, purged when the block ends.
+        """
+        snapshot = backend.snapshot()
+        created = []
+        fresh = []
+
+        def copy(scenario):
+            if snapshot is None:
+                fresh.append(self.fresh(scenario))
+                return fresh[-1]
+            known = len(self)
+            history = self.get(scenario)
+            if len(self) > known:
+                # Written after the snapshot, the restore drops it again
+                created.append(scenario)
+            return history
+
+        try:
+            yield copy
+        finally:
+            if snapshot is not None:
+                backend.restore(snapshot)
+                for scenario in created:
+                    self.forget(scenario)
+            for history in fresh:
+                purge_prefix(self.s3_client, self.bucket_name, history.key)
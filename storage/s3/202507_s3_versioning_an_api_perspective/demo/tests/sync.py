@@ -0,0 +1,262 @@
+"""
+    Incremental mirror of a versioned prefix: every run replays only the
+    object versions and delete markers created since the last run, oldest
+    first per key, as server-side copies and delete markers at the
+    destination.
+
+    The checkpoint holds the newest synced VersionId per key and a sorted
+    digest of 64-bit hashes of every synced (key, VersionId). A key whose
+    newest entry is its checkpointed VersionId costs nothing beyond the
+    listing; the entries above it are new. When that version is gone, e.g.
+    expired by lifecycle, the digest tells synced entries from new ones.
+
+    Order is the listing's own (exact_order): entries written in the same
+    second share a LastModified and would otherwise replay out of order.
+
+    Replay is at-least-once: the checkpoint is saved after every chunk of
+    keys, and a run that dies in between replays that chunk again. A save
+    appends the chunk's entries to a journal next to the checkpoint file;
+    only once the journal outgrows the checkpoint is the checkpoint
+    rewritten, so saving costs time in proportion to the new entries.
+
+    Versions above the 5 GiB CopyObject limit are replayed with
+    transfer.copy_multipart.
+"""
+import base64
+import hashlib
+import heapq
+import json
+import os
+import time
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from botocore.exceptions import ClientError
+
+from transfer import MAX_COPY_SIZE, copy_multipart
+from version_stream import iter_key_histories
+
+
+def _hash(key, version_id):
+    return int.from_bytes(hashlib.blake2b(f"{key}\0{version_id}".encode(), digest_size=8).digest(), "big")
+
+
+def _merge_unique(digest, hashes):
+    """Two sorted sequences of hashes as one, without duplicates."""
+    last = None
+    for h in heapq.merge(digest, hashes):
+        if h != last:
+            yield h
+            last = h
+
+
+class SyncCheckpoint:
+    def __init__(self, source="", destination=""):
+        self.source = source
+        self.destination = destination
+        # key -> newest synced VersionId
+        self.latest = {}
+        self._digest = array("Q")
+        self._pending = set()
+        # (key, VersionId) recorded since the last save, oldest first
+        self._unsaved = []
+        # The checkpoint file the journal belongs to, its entries, the journal's entries
+        self._path = None
+        self._saved_entries = 0
+        self._journaled = 0
+
+    def __len__(self):
+        return len(self._digest) + len(self._pending)
+
+    def synced(self, key, version_id):
+        h = _hash(key, version_id)
+        if h in self._pending:
+            return True
+        i = bisect_left(self._digest, h)
+        return i < len(self._digest) and self._digest[i] == h
+
+    def record(self, key, entry):
+        """entry was replayed; entries of one key are recorded oldest first."""
+        self._replay_record(key, entry.version_id)
+        self._unsaved.append((key, entry.version_id))
+
+    def _replay_record(self, key, version_id):
+        self._pending.add(_hash(key, version_id))
+        self.latest[key] = version_id
+
+    def compact(self):
+        if self._pending:
+            self._digest = array("Q", _merge_unique(self._digest, sorted(self._pending)))
+            self._pending.clear()
+
+    def save(self, path):
+        """
+            Append the entries recorded since the last save to path's journal.
+            The first save to path, and one whose journal would outgrow the
+            checkpoint, writes the whole checkpoint and empties the journal.
+        """
+        journal = f"{path}.journal"
+        if path == self._path and self._journaled + len(self._unsaved) <= self._saved_entries:
+            with open(journal, "a") as f:
+                f.writelines(json.dumps(item) + "\n" for item in self._unsaved)
+            self._journaled += len(self._unsaved)
+            self._unsaved.clear()
+            return
+        self.compact()
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({
+                "source": self.source,
+                "destination": self.destination,
+                "latest": self.latest,
+                "digest": base64.b64encode(self._digest.tobytes()).decode(),
+            }, f)
+        os.replace(tmp, path)
+        # Replaying a journal left by a crash right here over the new checkpoint changes nothing
+        if os.path.exists(journal):
+            os.remove(journal)
+        self._path, self._saved_entries, self._journaled = path, len(self._digest), 0
+        self._unsaved.clear()
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        checkpoint = cls(data["source"], data["destination"])
+        checkpoint.latest = data["latest"]
+        checkpoint._digest.frombytes(base64.b64decode(data["digest"]))
+        checkpoint._path, checkpoint._saved_entries = path, len(checkpoint._digest)
+        journal = f"{path}.journal"
+        if os.path.exists(journal):
+            with open(journal) as f:
+                for line in f:
+                    try:
+                        key, version_id = json.loads(line)
+                    except ValueError:
+                        # The last line of a save cut short, the next save rewrites the checkpoint
+                        checkpoint._path = None
+                        break
+                    checkpoint._replay_record(key, version_id)
+                    checkpoint._journaled += 1
+        return checkpoint
+
+
+def new_entries(key, entries, checkpoint):
+    """The entries of one history (newest first) not synced yet, oldest first."""
+    known = checkpoint.latest.get(key)
+    new = []
+    for entry in entries:
+        if entry.version_id == known:
+            break
+        new.append(entry)
+    else:
+        if known is not None:
+            # The checkpointed version is gone from the source, fall back to the digest
+            new = [entry for entry in entries if not checkpoint.synced(key, entry.version_id)]
+    return new[::-1]
+
+
+@dataclass
+class SyncResult:
+    keys: int = 0
+    changed_keys: int = 0
+    versions_copied: int = 0
+    delete_markers: int = 0
+    failed: int = 0
+    chunks: int = 0
+    elapsed: float = 0.0
+    errors: list = field(default_factory=list)
+
+
+def _copy(dest_client, source_bucket, dest_bucket, key, dest_key, entry, max_copy_size):
+    if entry.size <= max_copy_size:
+        dest_client.copy_object(Bucket=dest_bucket, Key=dest_key, CopySource={
+            "Bucket": source_bucket, "Key": key, "VersionId": entry.version_id})
+        return
+    # CreateMultipartUpload does not copy metadata the way CopyObject does
+    source = dest_client.head_object(Bucket=source_bucket, Key=key, VersionId=entry.version_id)
+    kwargs = {"Metadata": source["Metadata"]}
+    if source.get("ContentType"):
+        kwargs["ContentType"] = source["ContentType"]
+    copy_multipart(dest_client, dest_bucket, dest_key, source_bucket, key, entry.version_id,
+                   source["ContentLength"], source["ETag"], **kwargs)
+
+
+def _replay(dest_client, source_bucket, dest_bucket, key, dest_key, entries, max_copy_size=MAX_COPY_SIZE):
+    """Replay one key's new entries in order, stopping at the first failure."""
+    done = []
+    try:
+        for entry in entries:
+            if entry.is_delete_marker:
+                dest_client.delete_object(Bucket=dest_bucket, Key=dest_key)
+            else:
+                _copy(dest_client, source_bucket, dest_bucket, key, dest_key, entry, max_copy_size)
+            done.append(entry)
+    except ClientError as e:
+        return done, {"Key": key, "VersionId": entry.version_id, **e.response["Error"]}
+    return done, None
+
+
+def sync_prefix(s3_client, source_bucket, source_prefix, dest_bucket, dest_prefix, checkpoint=None,
+                dest_client=None, max_workers=16, chunk_size=1000, max_copy_size=MAX_COPY_SIZE, **stream_kwargs):
+    """
+        Replay what is new below source_prefix under dest_prefix. checkpoint is
+        a path; without one, or on the first run, everything is new.
+        Returns (SyncResult, SyncCheckpoint).
+    """
+    if source_bucket == dest_bucket and (dest_prefix.startswith(source_prefix)
+                                         or source_prefix.startswith(dest_prefix)):
+        raise ValueError("source and destination prefixes overlap")
+    start = time.perf_counter()
+    dest_client = dest_client or s3_client
+    source = f"s3://{source_bucket}/{source_prefix}"
+    destination = f"s3://{dest_bucket}/{dest_prefix}"
+    if checkpoint and os.path.exists(checkpoint):
+        state = SyncCheckpoint.load(checkpoint)
+        if (state.source, state.destination) != (source, destination):
+            raise ValueError(f"checkpoint {checkpoint} syncs {state.source} to {state.destination}")
+    else:
+        state = SyncCheckpoint(source, destination)
+
+    stream_kwargs.setdefault("exact_order", True)
+    result = SyncResult()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        chunk = []
+
+        def flush():
+            futures = [pool.submit(_replay, dest_client, source_bucket, dest_bucket, key,
+                                   dest_prefix + key[len(source_prefix):], entries, max_copy_size)
+                       for key, entries in chunk]
+            for (key, entries), future in zip(chunk, futures):
+                done, error = future.result()
+                for entry in done:
+                    state.record(key, entry)
+                    if entry.is_delete_marker:
+                        result.delete_markers += 1
+                    else:
+                        result.versions_copied += 1
+                if error:
+                    result.failed += len(entries) - len(done)
+                    result.errors.append(error)
+            result.chunks += 1
+            chunk.clear()
+            if checkpoint:
+                state.save(checkpoint)
+
+        for key, entries in iter_key_histories(s3_client, source_bucket, source_prefix, **stream_kwargs):
+            result.keys += 1
+            new = new_entries(key, entries, state)
+            if not new:
+                continue
+            result.changed_keys += 1
+            chunk.append((key, new))
+            if len(chunk) == chunk_size:
+                flush()
+        if chunk:
+            flush()
+
+    state.compact()
+    result.elapsed = time.perf_counter() - start
+    return result, state
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from aio_s3 import AsyncS3Client, purge_prefix_async
+from purge import purge_prefix
+
+
+@pytest.fixture
+def cleanup_aio_prefix(s3_client, bucket_name, ns):
+    # Not autouse: the SlowClient tests need no bucket
+    yield  # Run test first
+    # Cleanup after test
+    purge_prefix(s3_client, bucket_name, ns.key('aio/'))
+
+
+class SlowClient:
+    """Records the peak number of concurrent calls and their order per key."""
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.active = self.peak = 0
+        self.writes = []
+
+    def _call(self, record=None):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+            if record:
+                self.writes.append(record)
+
+    def head_object(self, Bucket, Key):
+        self._call()
+
+    def put_object(self, Bucket, Key, Body):
+        self._call((Key, Body))
+
+
+async def test_calls_run_concurrently_up_to_max_concurrency():
+    client = SlowClient()
+    async with AsyncS3Client(client, max_concurrency=4) as s3_async:
+        await asyncio.gather(*(s3_async.head_object(Bucket="b", Key=f"k{i}") for i in range(12)))
+    assert client.peak == 4
+
+async def test_writes_to_one_key_are_serialized_in_submission_order():
+    client = SlowClient(delay=0.005)
+    async with AsyncS3Client(client, max_concurrency=8) as s3_async:
+        await asyncio.gather(*(
+            s3_async.put_object(Bucket="b", Key=f"k{i % 2}", Body=i) for i in range(8)
+        ))
+        assert len(s3_async._key_locks) == 0
+    # Two keys written side by side, each one in order
+    assert client.peak == 2
+    assert [body for key, body in client.writes if key == "k0"] == [0, 2, 4, 6]
+    assert [body for key, body in client.writes if key == "k1"] == [1, 3, 5, 7]
+
+@pytest.mark.usefixtures("cleanup_aio_prefix")
+async def test_put_head_and_purge_against_the_bucket(s3_async, s3_client, bucket_name, ns):
+    keys = [ns.key(f"aio/file{i}.txt") for i in range(10)]
+    await asyncio.gather(*(s3_async.put_object(Bucket=bucket_name, Key=key, Body=b"x") for key in keys))
+    heads = await asyncio.gather(*(s3_async.head_object(Bucket=bucket_name, Key=key) for key in keys))
+    assert {head["ContentLength"] for head in heads} == {1}
+
+    pages = [page async for page in s3_async.paginate("list_object_versions", Bucket=bucket_name,
+                                                      Prefix=ns.key("aio/"), MaxKeys=4)]
+    assert [len(page["Versions"]) for page in pages] == [4, 4, 2]
+
+    result = await purge_prefix_async(s3_async, bucket_name, ns.key("aio/"), batch_size=3)
+    assert (result.deleted, result.batches, result.failed) == (10, 4, 0)
+    assert "Versions" not in s3_client.list_object_versions(Bucket=bucket_name, Prefix=ns.key("aio/"))
+
+@pytest.mark.usefixtures("cleanup_aio_prefix")
+async def test_purge_deletes_while_listing_with_bounded_batches(s3_async, s3_client, bucket_name, ns):
+    for i in range(12):
+        s3_client.put_object(Bucket=bucket_name, Key=ns.key(f"aio/file{i:02d}.txt"), Body=b"x")
+    calls, lock = [], threading.Lock()
+    active = peak = 0
+
+    def before(model, **kwargs):
+        nonlocal active, peak
+        with lock:
+            calls.append(model.name)
+            if model.name == "DeleteObjects":
+                active += 1
+                peak = max(peak, active)
+        time.sleep(0.01)
+
+    def after(model, **kwargs):
+        nonlocal active
+        with lock:
+            active -= model.name == "DeleteObjects"
+
+    s3_client.meta.events.register("before-call.s3", before, unique_id="aio-purge-before")
+    s3_client.meta.events.register("after-call.s3", after, unique_id="aio-purge-after")
+    try:
+        result = await purge_prefix_async(s3_async, bucket_name, ns.key("aio/"), max_workers=2, batch_size=1,
+                                          page_size=4)
+    finally:
+        s3_client.meta.events.unregister("before-call.s3", unique_id="aio-purge-before")
+        s3_client.meta.events.unregister("after-call.s3", unique_id="aio-purge-after")
+
+    assert (result.deleted, result.batches) == (12, 12)
+    assert peak <= 2
+    # The first batch is deleted before the last page is listed
+    assert calls.index("DeleteObjects") < len(calls) - calls[::-1].index("ListObjectVersions") - 1
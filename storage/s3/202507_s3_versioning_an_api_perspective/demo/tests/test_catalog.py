@@ -0,0 +1,85 @@
+import time
+from datetime import timedelta
+
+import pytest
+
+from catalog import VersionCatalog, from_micros
+from purge import purge_prefix
+
+
+@pytest.fixture(autouse=True)
+def cleanup_catalog_prefix(s3_client, bucket_name, ns):
+    yield  # Run test first
+    # Cleanup after test
+    purge_prefix(s3_client, bucket_name, ns.key('catalog/'))
+
+@pytest.fixture
+def keys(s3_client, bucket_name, ns):
+    keys = {name: ns.key(f"catalog/{name}") for name in ("a", "b", "sub/c")}
+    for body in (b"1", b"22"):
+        s3_client.put_object(Bucket=bucket_name, Key=keys["a"], Body=body)
+    for _ in range(3):
+        s3_client.put_object(Bucket=bucket_name, Key=keys["b"], Body=b"1")
+        s3_client.delete_object(Bucket=bucket_name, Key=keys["b"])
+    s3_client.put_object(Bucket=bucket_name, Key=keys["sub/c"], Body=b"333")
+    return keys
+
+
+def test_export_matches_the_listing(s3_client, bucket_name, ns, keys, tmp_path):
+    catalog = VersionCatalog.export(s3_client, bucket_name, ns.key("catalog/"), tmp_path / "catalog")
+    assert len(catalog) == 9
+    assert catalog.find(keys["a"]) == [0, 1]
+    assert catalog.totals() == (6, 3, 1 + 2 + 3 + 3)
+
+    markers = catalog.select(delete_markers=True)
+    assert catalog.count_by_key(markers) == {keys["b"]: 3}
+    assert catalog.select(prefix=ns.key("catalog/sub/")) == catalog.find(keys["sub/c"])
+
+    latest = catalog.latest()
+    assert catalog.row(latest[keys["a"]])["size"] == 2
+    assert catalog.row(latest[keys["b"]])["is_delete_marker"]
+    newest = max(catalog.last_modified)
+    assert catalog.select(since=from_micros(newest) + timedelta(seconds=1)) == []
+    assert len(catalog.select(until=from_micros(newest) + timedelta(seconds=1))) == 9
+
+def test_append_adds_only_new_entries_and_reopens(s3_client, bucket_name, ns, keys, tmp_path):
+    path = tmp_path / "catalog"
+    VersionCatalog.export(s3_client, bucket_name, ns.key("catalog/"), path)
+    s3_client.put_object(Bucket=bucket_name, Key=keys["a"], Body=b"4444")
+    s3_client.put_object(Bucket=bucket_name, Key=ns.key("catalog/d"), Body=b"1")
+
+    with VersionCatalog(path) as catalog:
+        assert catalog.append(s3_client) == 2
+        assert catalog.append(s3_client) == 0
+
+    with VersionCatalog(path) as catalog:
+        assert len(catalog) == 11
+        assert len(catalog.keys) == 4
+        assert catalog.row(catalog.latest()[keys["a"]])["size"] == 4
+        assert catalog.totals(catalog.find(ns.key("catalog/d"))) == (1, 0, 1)
+    with pytest.raises(ValueError):
+        catalog.totals()
+
+def test_append_finds_versions_written_during_the_export(s3_client, bucket_name, ns, tmp_path):
+    # a is listed before the export writes a again, then z more than a second later
+    for name in ("a", "b"):
+        s3_client.put_object(Bucket=bucket_name, Key=ns.key(f"catalog/{name}"), Body=b"1")
+    written = []
+
+    def write_behind_the_listing(**kwargs):
+        if not written:
+            written.append(s3_client.put_object(Bucket=bucket_name, Key=ns.key("catalog/a"), Body=b"22"))
+            time.sleep(1.1)
+            written.append(s3_client.put_object(Bucket=bucket_name, Key=ns.key("catalog/z"), Body=b"1"))
+
+    s3_client.meta.events.register("after-call.s3.ListObjectVersions", write_behind_the_listing,
+                                   unique_id="catalog-write-behind")
+    try:
+        catalog = VersionCatalog.export(s3_client, bucket_name, ns.key("catalog/"), tmp_path / "catalog",
+                                        page_size=1, prefetch=0)
+    finally:
+        s3_client.meta.events.unregister("after-call.s3.ListObjectVersions", unique_id="catalog-write-behind")
+    with catalog:
+        assert len(catalog) == 3
+        assert catalog.append(s3_client) == 1
+        assert len(catalog.find(ns.key("catalog/a"))) == 2
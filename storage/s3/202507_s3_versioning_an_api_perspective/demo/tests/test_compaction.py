@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from botocore.exceptions import ClientError
+
+from compaction import KEEP, OLDEST, analyze_key, compact, marker_runs
+from purge import purge_prefix
+from version_stream import VersionEntry, iter_key_histories
+
+
+@pytest.fixture(autouse=True)
+def cleanup_compaction_prefix(s3_client, bucket_name, ns):
+    yield  # Run test first
+    # Cleanup after test
+    purge_prefix(s3_client, bucket_name, ns.key('compaction/'))
+
+def history(*contents):
+    """Entries newest first from contents oldest first; None is a delete marker."""
+    start = datetime(2025, 7, 1, tzinfo=timezone.utc)
+    entries = [VersionEntry("k", f"v{i}", False, content is None, start + timedelta(minutes=i))
+               for i, content in enumerate(contents)]
+    return entries[::-1]
+
+def version_ids(entries):
+    return sorted(entry.version_id for entry in entries)
+
+
+def test_all_but_one_marker_of_a_run_is_redundant():
+    entries = history("a", None, None, "b", None, None, None)
+    assert [len(run) for run in marker_runs(entries)] == [3, 2]
+
+    report = analyze_key(entries)
+    assert (report.delete_markers, report.runs, report.longest_run) == (5, 2, 3)
+    assert version_ids(report.redundant) == ["v1", "v4", "v5"]
+    assert version_ids(analyze_key(entries, OLDEST).redundant) == ["v2", "v5", "v6"]
+    assert report.expired == []
+
+def test_markers_without_versions_below_are_expired():
+    report = analyze_key(history(None, None))
+    assert version_ids(report.expired) == ["v0", "v1"]
+    assert report.redundant == []
+
+def test_compact_dry_run_then_delete(s3_client, bucket_name, ns):
+    stacked = ns.key("compaction/stacked")
+    s3_client.put_object(Bucket=bucket_name, Key=stacked, Body=b"v1")
+    markers = [s3_client.delete_object(Bucket=bucket_name, Key=stacked)["VersionId"] for _ in range(3)]
+    # A lone marker: its version is gone
+    lone = ns.key("compaction/lone")
+    version_id = s3_client.put_object(Bucket=bucket_name, Key=lone, Body=b"v1")["VersionId"]
+    s3_client.delete_object(Bucket=bucket_name, Key=lone)
+    s3_client.delete_object(Bucket=bucket_name, Key=lone, VersionId=version_id)
+    s3_client.put_object(Bucket=bucket_name, Key=ns.key("compaction/plain"), Body=b"v1")
+
+    report, result = compact(s3_client, bucket_name, ns.key("compaction/"))
+    assert result is None
+    assert (report.keys, report.delete_markers, report.redundant, report.expired, report.expired_keys) == (3, 4, 2, 1, 1)
+    assert [key_report.key for key_report in report.top] == [stacked]
+
+    report, result = compact(s3_client, bucket_name, ns.key("compaction/"), dry_run=False)
+    assert (result.deleted, result.failed) == (3, 0)
+    histories = dict(iter_key_histories(s3_client, bucket_name, ns.key("compaction/")))
+    assert lone not in histories
+    assert [entry.version_id for entry in histories[stacked] if entry.is_delete_marker] == [markers[-1]]
+    assert histories[stacked][0].is_latest
+
+    report, _ = compact(s3_client, bucket_name, ns.key("compaction/"))
+    assert report.removable == 0
+
+@pytest.mark.parametrize("keep", KEEP)
+def test_compact_keeps_markers_with_a_version_between_in_the_same_second(s3_client, bucket_name, ns, keep):
+    # put, delete, put, delete: m2, v2, m1, v1 with one LastModified, no run of markers
+    key = ns.key("compaction/same_second")
+    for body in (b"v1", b"v2"):
+        s3_client.put_object(Bucket=bucket_name, Key=key, Body=body)
+        s3_client.delete_object(Bucket=bucket_name, Key=key)
+    before = dict(iter_key_histories(s3_client, bucket_name, ns.key("compaction/")))[key]
+
+    report, result = compact(s3_client, bucket_name, ns.key("compaction/"), keep, dry_run=False)
+
+    assert (report.runs, report.removable, result.deleted) == (0, 0, 0)
+    assert dict(iter_key_histories(s3_client, bucket_name, ns.key("compaction/")))[key] == before
+    with pytest.raises(ClientError) as e:
+        s3_client.head_object(Bucket=bucket_name, Key=key)
+    assert e.value.response["Error"]["Code"] == "404"
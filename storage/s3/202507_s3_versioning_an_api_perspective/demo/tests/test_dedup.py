@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from dedup import ANY, CHANGED, DELETED, NEW, REVERTED, UNCHANGED, analyze, analyze_key, deduplicate, diff_history
+from purge import purge_prefix
+from version_stream import VersionEntry
+
+
+@pytest.fixture(autouse=True)
+def cleanup_dedup_prefix(s3_client, bucket_name, ns):
+    yield  # Run test first
+    # Cleanup after test
+    purge_prefix(s3_client, bucket_name, ns.key('dedup/'))
+
+def history(*contents):
+    """Entries newest first from contents oldest first; None is a delete marker."""
+    start = datetime(2025, 7, 1, tzinfo=timezone.utc)
+    entries = [VersionEntry("k", f"v{i}", False, content is None, start + timedelta(minutes=i),
+                            0 if content is None else len(content), None if content is None else f'"{content}"')
+               for i, content in enumerate(contents)]
+    return entries[::-1]
+
+
+def test_diff_history_classifies_every_write():
+    changes = diff_history(history("a", "a", "b", None, "b", "a"))
+    assert [change for _, change in changes] == [NEW, UNCHANGED, CHANGED, DELETED, REVERTED, REVERTED]
+
+def test_consecutive_scope_keeps_every_point_in_time_state():
+    report = analyze_key(history("aa", "aa", "b", "aa", "aa"))
+    assert (report.versions, report.contents, report.redundant_versions, report.redundant_bytes) == (5, 2, 3, 6)
+    # The last "aa" is current and stays; the one after "b" is a revert, not a no-op
+    assert [entry.version_id for entry in report.removable] == ["v1"]
+
+def test_any_scope_keeps_the_newest_copy_of_each_content():
+    report = analyze_key(history("aa", "aa", "b", "aa", "b"), ANY)
+    assert sorted(entry.version_id for entry in report.removable) == ["v0", "v1", "v2"]
+    assert report.removable_bytes == 5
+
+def test_multipart_layouts_are_ambiguous_not_redundant():
+    entries = history("a-2", "a-3", "b")
+    entries = [VersionEntry(e.key, e.version_id, e.is_latest, False, e.last_modified, 10, e.etag) for e in entries]
+    report = analyze_key(entries, ANY)
+    assert (report.redundant_versions, report.ambiguous, report.removable) == (0, 3, [])
+
+def test_analyze_and_deduplicate_the_bucket(s3_client, bucket_name, ns):
+    same, changing = ns.key("dedup/same"), ns.key("dedup/changing")
+    for body in (b"identical", b"identical", b"identical"):
+        s3_client.put_object(Bucket=bucket_name, Key=same, Body=body)
+    for body in (b"one", b"two", b"two", b"one"):
+        s3_client.put_object(Bucket=bucket_name, Key=changing, Body=body)
+
+    report = analyze(s3_client, bucket_name, ns.key("dedup/"))
+    assert (report.keys, report.versions, report.redundant_versions, report.redundant_bytes) == (2, 7, 4, 24)
+    # The current version stays even when it repeats the one before it
+    assert (report.removable_versions, report.removable_bytes) == (2, 12)
+    assert [key_report.key for key_report in report.top] == [same, changing]
+
+    report, result = deduplicate(s3_client, bucket_name, ns.key("dedup/"), batch_size=2)
+    assert (result.deleted, result.failed) == (2, 0)
+    versions = s3_client.list_object_versions(Bucket=bucket_name, Prefix=ns.key("dedup/"))["Versions"]
+    assert sorted((v["Key"], v["Size"]) for v in versions) == [(changing, 3), (changing, 3), (changing, 3), (same, 9), (same, 9)]
+    assert s3_client.get_object(Bucket=bucket_name, Key=changing)["Body"].read() == b"one"
+    assert analyze(s3_client, bucket_name, ns.key("dedup/")).removable_versions == 0
@@ -0,0 +1,65 @@
+import pytest
+from botocore.exceptions import ClientError
+
+from instrumentation import S3CallRecorder, summarize
+from purge import purge_prefix
+
+
+@pytest.fixture(autouse=True)
+def cleanup_instrumentation_prefix(s3_client, bucket_name, ns):
+    yield  # Run test first
+    # Cleanup after test
+    purge_prefix(s3_client, bucket_name, ns.key('instrumentation/'))
+
+@pytest.fixture
+def recorder(s3_client):
+    recorder = S3CallRecorder()
+    recorder.attach(s3_client)
+    yield recorder
+    recorder.detach(s3_client)
+
+
+def test_recorder_counts_requests_errors_and_bytes(s3_client, bucket_name, ns, recorder):
+    key = ns.key("instrumentation/file.txt")
+    recorder.test, recorder.phase = "a-test", "call"
+    s3_client.put_object(Bucket=bucket_name, Key=key, Body=b"12345")
+    s3_client.get_object(Bucket=bucket_name, Key=key)["Body"].read()
+    with pytest.raises(ClientError):
+        s3_client.get_object(Bucket=bucket_name, Key=ns.key("instrumentation/missing"))
+
+    report = recorder.report()
+    assert report["operations"]["PutObject"]["requests"] == 1
+    assert report["operations"]["PutObject"]["bytes_out"] == 5
+    assert report["operations"]["GetObject"]["requests"] == 2
+    assert report["operations"]["GetObject"]["errors"] == 1
+    assert report["operations"]["GetObject"]["bytes_in"] == 5
+    assert report["tests"]["a-test"]["call"]["GetObject"]["requests"] == 2
+    assert set(report["phases"]) == {"call"}
+
+def test_recorder_counts_one_request_for_a_delete_marker_get(s3_client, bucket_name, ns, recorder):
+    key = ns.key("instrumentation/deleted.txt")
+    s3_client.put_object(Bucket=bucket_name, Key=key, Body=b"1")
+    marker = s3_client.delete_object(Bucket=bucket_name, Key=key)["VersionId"]
+    recorder.test, recorder.phase = "a-test", "call"
+    with pytest.raises(ClientError):
+        s3_client.get_object(Bucket=bucket_name, Key=key, VersionId=marker)
+
+    calls = recorder.report()["tests"]["a-test"]["call"]
+    assert {name: counters["requests"] for name, counters in calls.items()} == {"GetObject": 1}
+
+def test_recorder_export_merges_into_another_recorder(s3_client, bucket_name, ns, recorder):
+    recorder.test, recorder.phase = "a-test", "setup"
+    s3_client.put_object(Bucket=bucket_name, Key=ns.key("instrumentation/file.txt"), Body=b"1")
+
+    merged = S3CallRecorder()
+    merged.merge(recorder.export())
+    merged.merge(recorder.export())
+
+    assert merged.report()["operations"]["PutObject"]["requests"] == 2
+    assert merged.report()["phases"]["setup"]["PutObject"]["requests"] == 2
+
+def test_summarize_percentiles():
+    summary = summarize([i / 1000 for i in range(1, 101)])
+    assert summary["count"] == 100
+    assert summary["p50"] == pytest.approx(50.5)
+    assert summary["max"] == pytest.approx(100)
@@ -0,0 +1,51 @@
+import pytest
+
+from latest_index import LatestStateIndex
+from purge import purge_prefix
+
+
+@pytest.fixture(autouse=True)
+def cleanup_latest_index_prefix(s3_client, bucket_name, ns):
+    yield  # Run test first
+    # Cleanup after test
+    purge_prefix(s3_client, bucket_name, ns.key('latest_index/'))
+
+@pytest.fixture
+def keys(s3_client, bucket_name, ns):
+    keys = {name: ns.key(f"latest_index/{name}") for name in ("a", "b", "c", "d")}
+    s3_client.put_object(Bucket=bucket_name, Key=keys["a"], Body=b"v1")
+    s3_client.put_object(Bucket=bucket_name, Key=keys["a"], Body=b"v22")
+    s3_client.put_object(Bucket=bucket_name, Key=keys["b"], Body=b"v1")
+    s3_client.delete_object(Bucket=bucket_name, Key=keys["b"])
+    s3_client.put_object(Bucket=bucket_name, Key=keys["c"], Body=b"v1")
+    return keys
+
+
+def test_index_answers_existence_like_head_object(s3_client, bucket_name, ns, keys):
+    index = LatestStateIndex.build(s3_client, bucket_name, ns.key("latest_index/"))
+
+    assert index.exists(keys.values()) == {keys["a"]: True, keys["b"]: False, keys["c"]: True, keys["d"]: False}
+    assert index.soft_deleted() == [keys["b"]]
+    state = index.get(keys["a"])
+    assert (state.size, state.noncurrent_count, state.is_deleted) == (3, 1, False)
+
+def test_index_refresh_continues_from_saved_key_marker(s3_client, bucket_name, ns, keys, tmp_path):
+    index = LatestStateIndex.build(s3_client, bucket_name, ns.key("latest_index/"), max_keys=2)
+    assert not index.complete
+    assert index.key_marker == keys["b"]
+    index.save(tmp_path / "index.json")
+
+    index = LatestStateIndex.load(tmp_path / "index.json")
+    assert index.refresh(s3_client, bucket_name) == 1
+    assert index.complete
+    assert len(index) == 3
+
+def test_index_refresh_picks_up_changes_after_marker(s3_client, bucket_name, ns, keys):
+    index = LatestStateIndex.build(s3_client, bucket_name, ns.key("latest_index/"))
+    s3_client.delete_object(Bucket=bucket_name, Key=keys["c"])
+    s3_client.put_object(Bucket=bucket_name, Key=keys["d"], Body=b"v1")
+
+    index.refresh(s3_client, bucket_name, from_key_marker=keys["b"])
+
+    assert index.soft_deleted() == [keys["b"], keys["c"]]
+    assert keys["d"] in index
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from lifecycle import expire_history, parse_rules, simulate, simulate_bucket
+from purge import purge_prefix
+from version_stream import VersionEntry
+
+
+@pytest.fixture(autouse=True)
+def cleanup_lifecycle_prefix(s3_client, bucket_name, ns):
+    yield  # Run test first
+    # Cleanup after test
+    purge_prefix(s3_client, bucket_name, ns.key('lifecycle/'))
+
+def entry(version_id, day, hour=12, is_delete_marker=False, size=10, key="k"):
+    # Entries are created newest first by the tests, as listings return them
+    return VersionEntry(key, version_id, False, is_delete_marker,
+                        datetime(2025, 7, day, hour, tzinfo=timezone.utc), 0 if is_delete_marker else size)
+
+def rule(**noncurrent):
+    return {"Status": "Enabled", "Filter": {"Prefix": ""}, "NoncurrentVersionExpiration": noncurrent}
+
+
+def test_noncurrent_expiry_rounds_up_to_midnight_and_keeps_newer_versions():
+    history = [entry("v4", 4), entry("v3", 3), entry("v2", 2), entry("v1", 1)]
+    rules = parse_rules([rule(NoncurrentDays=1, NewerNoncurrentVersions=1)])
+
+    # v2 turned noncurrent on day 3 at noon, due at midnight starting day 5
+    kept, expired = expire_history(history, rules, datetime(2025, 7, 4, 23, tzinfo=timezone.utc))
+    assert ([e.version_id for e in kept], [e.version_id for e in expired]) == (["v4", "v3", "v2"], ["v1"])
+    kept, expired = expire_history(history, rules, datetime(2025, 7, 5, tzinfo=timezone.utc))
+    assert ([e.version_id for e in kept], [e.version_id for e in expired]) == (["v4", "v3"], ["v2", "v1"])
+
+def test_expired_object_delete_marker_goes_once_nothing_is_left_below_it():
+    history = [entry("dm", 2, is_delete_marker=True), entry("v1", 1)]
+    rules = parse_rules([{**rule(NoncurrentDays=1), "Expiration": {"ExpiredObjectDeleteMarker": True}}])
+
+    kept, expired = expire_history(history, rules, datetime(2025, 7, 3, tzinfo=timezone.utc))
+    assert [e.version_id for e in kept] == ["dm", "v1"]
+    kept, expired = expire_history(history, rules, datetime(2025, 7, 4, tzinfo=timezone.utc))
+    assert (kept, [e.version_id for e in expired]) == ([], ["dm", "v1"])
+
+def test_rules_apply_by_prefix_and_disabled_rules_do_not():
+    histories = [(key, [entry("v2", 2, key=key), entry("v1", 1, key=key)]) for key in ("logs/a", "data/a")]
+    rules = {"Rules": [{**rule(NoncurrentDays=1), "Filter": {"Prefix": "logs/"}},
+                       {**rule(NoncurrentDays=1), "Status": "Disabled"}]}
+
+    forecast = simulate(histories, rules, datetime(2025, 8, 1, tzinfo=timezone.utc), page_size=3)
+    assert [(e.key, e.version_id) for e in forecast.expired] == [("logs/a", "v1")]
+    assert (forecast.before.versions, forecast.after.versions) == (4, 3)
+    assert (forecast.before.bytes, forecast.after.bytes) == (40, 30)
+    assert (forecast.pages_before, forecast.pages_after) == (2, 1)
+
+def test_unsupported_rules_are_rejected():
+    with pytest.raises(ValueError):
+        parse_rules([{"Status": "Enabled", "Expiration": {"Days": 30}}])
+    with pytest.raises(ValueError):
+        parse_rules([{"Status": "Enabled", "Filter": {"Tag": {"Key": "a", "Value": "b"}}}])
+
+def test_simulate_bucket_forecasts_the_listed_history(s3_client, bucket_name, ns):
+    versioned, deleted, orphan = ns.key("lifecycle/versioned"), ns.key("lifecycle/deleted"), ns.key("lifecycle/orphan")
+    for body in (b"1", b"22", b"333"):
+        s3_client.put_object(Bucket=bucket_name, Key=versioned, Body=body)
+    s3_client.put_object(Bucket=bucket_name, Key=deleted, Body=b"1")
+    s3_client.delete_object(Bucket=bucket_name, Key=deleted)
+    # A delete marker whose object version was deleted afterwards
+    version_id = s3_client.put_object(Bucket=bucket_name, Key=orphan, Body=b"1")["VersionId"]
+    s3_client.delete_object(Bucket=bucket_name, Key=orphan)
+    s3_client.delete_object(Bucket=bucket_name, Key=orphan, VersionId=version_id)
+    upload_id = s3_client.create_multipart_upload(Bucket=bucket_name, Key=versioned)["UploadId"]
+    try:
+        rules = [{
+            "Status": "Enabled",
+            "Filter": {"Prefix": ns.key("lifecycle/")},
+            "NoncurrentVersionExpiration": {"NoncurrentDays": 1, "NewerNoncurrentVersions": 1},
+            "Expiration": {"ExpiredObjectDeleteMarker": True},
+            "AbortIncompleteMultipartUpload": {"DaysAfterInitiation": 1},
+        }]
+        forecast = simulate_bucket(s3_client, bucket_name, rules, ns.key("lifecycle/"),
+                                   at=datetime.now(timezone.utc) + timedelta(days=3))
+    finally:
+        s3_client.abort_multipart_upload(Bucket=bucket_name, Key=versioned, UploadId=upload_id)
+
+    # versioned keeps latest + 1 noncurrent, deleted keeps its retained version, orphan marker goes
+    assert sorted((e.key, e.size) for e in forecast.expired) == [(orphan, 0), (versioned, 1)]
+    assert (forecast.before.versions, forecast.after.versions) == (4, 3)
+    assert (forecast.before.delete_markers, forecast.after.delete_markers) == (2, 1)
+    assert (forecast.before.bytes, forecast.after.bytes) == (7, 6)
+    assert [upload["UploadId"] for upload in forecast.aborted_uploads] == [upload_id]
+
+    # Today no version has been noncurrent for a day, only the lone marker is due
+    today = simulate_bucket(s3_client, bucket_name, rules, ns.key("lifecycle/"))
+    assert [e.key for e in today.expired] == [orphan]
@@ -0,0 +1,46 @@
+import pytest
+
+from loadgen import Shape, build, parse_mix, run
+from purge import purge_prefix
+
+
+@pytest.fixture(autouse=True)
+def cleanup_loadgen_prefix(s3_client, bucket_name, ns):
+    yield  # Run test first
+    # Cleanup after test
+    purge_prefix(s3_client, bucket_name, ns.key('loadgen/'))
+
+
+def test_build_writes_the_shape(s3_client, bucket_name, ns):
+    shape = Shape(keys=3, versions_per_key=4, delete_marker_ratio=0.5, object_size=16)
+    dataset = build(s3_client, bucket_name, ns.key("loadgen/"), shape)
+
+    assert len(dataset.keys) == 3
+    assert all(len(versions) == 4 for versions in dataset.versions.values())
+    response = s3_client.list_object_versions(Bucket=bucket_name, Prefix=ns.key("loadgen/"))
+    assert len(response["Versions"]) == 12
+    assert len(response.get("DeleteMarkers", [])) == sum(len(m) for m in dataset.markers.values())
+
+def test_run_reports_every_operation(s3_client, bucket_name, ns):
+    dataset = build(s3_client, bucket_name, ns.key("loadgen/"), Shape(keys=2, versions_per_key=3, delete_marker_ratio=0))
+
+    result = run(s3_client, bucket_name, dataset, operations=50, concurrency=4)
+
+    assert result.operations == 50
+    assert sum(result.errors.values()) == 0
+    assert sum(s["count"] for s in result.summary().values()) == 50
+
+def test_put_version_adds_versions_to_the_dataset(s3_client, bucket_name, ns):
+    dataset = build(s3_client, bucket_name, ns.key("loadgen/"), Shape(keys=2, versions_per_key=1, delete_marker_ratio=0))
+
+    result = run(s3_client, bucket_name, dataset, operations=6, concurrency=2, mix={"put_version": 1})
+
+    assert (len(result.latencies["put_version"]), sum(result.errors.values())) == (6, 0)
+    assert sum(len(versions) for versions in dataset.versions.values()) == 2 + 6
+    response = s3_client.list_object_versions(Bucket=bucket_name, Prefix=ns.key("loadgen/"))
+    assert len(response["Versions"]) == 8
+
+def test_parse_mix_rejects_unknown_operations():
+    assert parse_mix("get_latest=2,list_versions") == {"get_latest": 2.0, "list_versions": 1.0}
+    with pytest.raises(ValueError):
+        parse_mix("put_object=1")
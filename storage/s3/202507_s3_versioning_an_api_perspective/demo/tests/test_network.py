@@ -0,0 +1,70 @@
+import pytest
+from botocore.exceptions import ClientError
+
+from instrumentation import S3CallRecorder
+from local_s3 import LocalS3
+from network import Latency, NetworkProfile, NetworkShim
+
+BUCKET = "network"
+
+
+@pytest.fixture
+def local_client():
+    client = LocalS3().client()
+    client.create_bucket(Bucket=BUCKET)
+    client.put_bucket_versioning(Bucket=BUCKET, VersioningConfiguration={"Status": "Enabled"})
+    return client
+
+def shimmed(client, profile, seed=0):
+    sleeps = []
+    NetworkShim(profile, seed, sleep=sleeps.append).attach(client)
+    return sleeps
+
+def calls(client):
+    for i in range(5):
+        client.put_object(Bucket=BUCKET, Key=f"k{i}", Body=b"x")
+        client.head_object(Bucket=BUCKET, Key=f"k{i}")
+    client.list_object_versions(Bucket=BUCKET)
+
+
+def test_same_seed_same_delays():
+    profile = NetworkProfile(Latency(15, 60), operations={"PutObject": Latency(25, 100)}, throttle_rate=0.2)
+    runs = {}
+    for name, seed in (("first", 1), ("again", 1), ("other", 2)):
+        client = LocalS3().client()
+        client.create_bucket(Bucket=BUCKET)
+        client.put_bucket_versioning(Bucket=BUCKET, VersioningConfiguration={"Status": "Enabled"})
+        runs[name] = shimmed(client, profile, seed)
+        calls(client)
+    assert runs["first"] == runs["again"]
+    assert runs["first"] != runs["other"]
+    assert all(delay > 0 for delay in runs["first"])
+
+def test_fixed_latency_and_bandwidth(local_client):
+    sleeps = shimmed(local_client, NetworkProfile.fixed(20, bandwidth=2 ** 20))
+    local_client.put_object(Bucket=BUCKET, Key="k", Body=b"x" * 2 ** 19)
+    assert sleeps == [0.02, 0.5]
+    local_client.get_object(Bucket=BUCKET, Key="k")["Body"].read()
+    assert sleeps[2:] == [0.02, 0.5]
+
+def test_throttled_requests_are_retried_and_reported(local_client):
+    recorder = S3CallRecorder()
+    recorder.attach(local_client)
+    shim = NetworkShim(NetworkProfile.fixed(0, throttle_rate=1.0, max_attempts=3), sleep=lambda seconds: None)
+    shim.attach(local_client)
+
+    with pytest.raises(ClientError) as e:
+        local_client.head_object(Bucket=BUCKET, Key="k")
+    assert e.value.response["Error"]["Code"] == "SlowDown"
+    assert e.value.response["ResponseMetadata"] == {"HTTPStatusCode": 503, "RetryAttempts": 2}
+    assert shim.throttled == 3
+    assert recorder.report()["operations"]["HeadObject"]["retries"] == 2
+
+def test_retries_of_a_successful_call_are_counted(local_client):
+    # With this seed some calls are throttled and then succeed
+    shim = NetworkShim(NetworkProfile.fixed(0, throttle_rate=0.5, max_attempts=10), seed=3,
+                       sleep=lambda seconds: None)
+    shim.attach(local_client)
+    retries = [local_client.put_object(Bucket=BUCKET, Key="k", Body=b"x")["ResponseMetadata"]["RetryAttempts"]
+               for _ in range(20)]
+    assert sum(retries) == shim.throttled > 0
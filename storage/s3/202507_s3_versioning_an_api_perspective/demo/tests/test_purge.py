@@ -0,0 +1,79 @@
+import pytest
+from botocore.awsrequest import AWSResponse
+
+from purge import delete_versions, purge_prefix
+
+
+@pytest.fixture(autouse=True)
+def cleanup_purge_prefix(s3_client, bucket_name, ns):
+    yield  # Run test first
+    # Cleanup after test
+    purge_prefix(s3_client, bucket_name, ns.key('purge/'))
+
+
+def test_purge_prefix_removes_versions_and_delete_markers(s3_client, bucket_name, ns):
+    for i in range(3):
+        key = ns.key(f"purge/file{i}.txt")
+        s3_client.put_object(Bucket=bucket_name, Key=key, Body=b"v1")
+        s3_client.put_object(Bucket=bucket_name, Key=key, Body=b"v2")
+        s3_client.delete_object(Bucket=bucket_name, Key=key)
+
+    result = purge_prefix(s3_client, bucket_name, ns.key("purge/"), batch_size=2)
+
+    assert result.deleted == 9
+    assert result.batches == 5
+    assert result.failed == 0
+    response = s3_client.list_object_versions(Bucket=bucket_name, Prefix=ns.key("purge/"))
+    assert response.get("Versions", []) == []
+    assert response.get("DeleteMarkers", []) == []
+
+def test_purge_prefix_leaves_other_prefixes(s3_client, bucket_name, ns):
+    s3_client.put_object(Bucket=bucket_name, Key=ns.key("purge/inner/file.txt"), Body=b"content")
+    res = s3_client.put_object(Bucket=bucket_name, Key=ns.key("purge/outer.txt"), Body=b"content")
+
+    purge_prefix(s3_client, bucket_name, ns.key("purge/inner/"))
+
+    response = s3_client.list_object_versions(Bucket=bucket_name, Prefix=ns.key("purge/"))
+    assert [v["VersionId"] for v in response["Versions"]] == [res["VersionId"]]
+
+def test_delete_versions_rejects_oversized_batches(s3_client, bucket_name, ns):
+    with pytest.raises(ValueError):
+        delete_versions(s3_client, bucket_name, [], batch_size=1001)
+
+def test_purge_prefix_deletes_while_it_pages(s3_client, bucket_name, ns):
+    for i in range(5):
+        for body in (b"v1", b"v2"):
+            s3_client.put_object(Bucket=bucket_name, Key=ns.key(f"purge/file{i}.txt"), Body=body)
+
+    result = purge_prefix(s3_client, bucket_name, ns.key("purge/"), page_size=3, batch_size=2)
+
+    assert (result.deleted, result.failed) == (10, 0)
+    assert "Versions" not in s3_client.list_object_versions(Bucket=bucket_name, Prefix=ns.key("purge/"))
+
+def test_delete_versions_retries_a_throttled_call(s3_client, bucket_name, ns):
+    versions = [{"Key": ns.key(f"purge/file{i}.txt"),
+                 "VersionId": s3_client.put_object(Bucket=bucket_name, Key=ns.key(f"purge/file{i}.txt"),
+                                                   Body=b"v1")["VersionId"]}
+                for i in range(3)]
+    throttled = []
+
+    def slow_down(**kwargs):
+        if len(throttled) < 2:
+            throttled.append(1)
+            return AWSResponse(None, 503, {}, None), {
+                "Error": {"Code": "SlowDown", "Message": "Please reduce your request rate."},
+                "ResponseMetadata": {"HTTPStatusCode": 503},
+            }
+        return None
+
+    s3_client.meta.events.register("before-call.s3.DeleteObjects", slow_down, unique_id="purge-slow-down")
+    try:
+        result = delete_versions(s3_client, bucket_name, versions, backoff=0)
+    finally:
+        s3_client.meta.events.unregister("before-call.s3.DeleteObjects", unique_id="purge-slow-down")
+
+    assert (result.deleted, result.retries, result.failed) == (3, 2, 0)
+
+def test_delete_versions_needs_an_attempt(s3_client, bucket_name):
+    with pytest.raises(ValueError):
+        delete_versions(s3_client, bucket_name, [], max_attempts=0)
@@ -0,0 +1,35 @@
+import boto3
+import pytest
+from botocore.stub import Stubber
+
+from resources import ExportResolver
+
+
+@pytest.fixture
+def cf_client():
+    client = boto3.client("cloudformation", region_name="us-east-1",
+                          aws_access_key_id="testing", aws_secret_access_key="testing")
+    with Stubber(client) as stubber:
+        stubber.add_response("list_exports", {
+            "Exports": [{"Name": "OtherExport", "Value": "other"}],
+            "NextToken": "page-2",
+        })
+        stubber.add_response("list_exports", {
+            "Exports": [{"Name": "S3VersioningBucket12567", "Value": "the-bucket"}],
+        }, {"NextToken": "page-2"})
+        yield client
+        stubber.assert_no_pending_responses()
+
+
+def test_export_resolver_follows_pagination_and_caches(cf_client):
+    resolver = ExportResolver(cf_client)
+
+    assert resolver.get("S3VersioningBucket12567") == "the-bucket"
+    # Served from the cache, the stubber has no responses left
+    assert resolver.get("OtherExport") == "other"
+
+def test_export_resolver_unknown_export(cf_client):
+    resolver = ExportResolver(cf_client)
+
+    with pytest.raises(ValueError):
+        resolver.get("MissingExport")
@@ -0,0 +1,147 @@
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from botocore.exceptions import ClientError
+
+from purge import purge_prefix
+from restore import COPY, DELETE, RESTORED_FROM, plan, restore_prefix
+from transfer import MIN_PART_SIZE, upload_multipart
+from version_stream import VersionEntry
+
+
+@pytest.fixture(autouse=True)
+def cleanup_restore_prefix(s3_client, bucket_name, ns):
+    yield  # Run test first
+    # Cleanup after test
+    purge_prefix(s3_client, bucket_name, ns.key('restore/'))
+
+def entry(version_id, minute, etag=None, is_delete_marker=False):
+    return VersionEntry("k", version_id, False, is_delete_marker,
+                        datetime(2025, 7, 1, 12, minute, tzinfo=timezone.utc), 1, etag or f'"{version_id}"')
+
+T = datetime(2025, 7, 1, 12, 30, tzinfo=timezone.utc)
+
+
+def test_plan_copies_the_version_latest_at_t_or_hides_the_key():
+    history = [entry("v3", 40), entry("v2", 20), entry("v1", 10)]
+    assert plan(history, T, COPY).source_version_id == "v2"
+    assert [v.version_id for v in plan(history, T, DELETE).versions] == ["v3"]
+
+    # Created after T: hidden by a marker, or deleted entirely
+    assert plan([entry("v1", 40)], T, COPY).kind == "delete_marker"
+    assert plan([entry("v1", 40)], T, DELETE).versions == (entry("v1", 40),)
+    # Deleted at T: hidden again
+    assert plan([entry("v2", 40), entry("dm", 20, is_delete_marker=True), entry("v1", 10)], T).kind == "delete_marker"
+
+def test_plan_skips_keys_already_in_their_state_at_t():
+    assert plan([entry("v1", 10)], T) is None
+    # A copy restored earlier carries the old ETag
+    assert plan([entry("copy", 50, etag='"v2"'), entry("v3", 40), entry("v2", 20)], T) is None
+    assert plan([entry("dm2", 50, is_delete_marker=True), entry("v1", 40)], T) is None
+    assert plan([entry("dm", 40, is_delete_marker=True), entry("dm0", 20, is_delete_marker=True)], T) is None
+
+
+def after_the_last_write(s3_client, bucket_name, ns):
+    """LastModified of the newest entry below restore/; later writes land after it."""
+    response = s3_client.list_object_versions(Bucket=bucket_name, Prefix=ns.key("restore/"))
+    at = max(v["LastModified"] for v in response.get("Versions", []) + response.get("DeleteMarkers", []))
+    if not at.microsecond:
+        # LastModified has second precision on S3, the next write must land in a later second
+        time.sleep(1.1)
+    return at
+
+@pytest.fixture
+def bad_deploy(s3_client, bucket_name, ns):
+    """Keys a, b and d in their good state, T, then a deploy that changes a, deletes b and creates c."""
+    keys = {name: ns.key(f"restore/{name}") for name in "abcd"}
+    s3_client.put_object(Bucket=bucket_name, Key=keys["a"], Body=b"a-good")
+    s3_client.put_object(Bucket=bucket_name, Key=keys["b"], Body=b"b-good")
+    s3_client.put_object(Bucket=bucket_name, Key=keys["d"], Body=b"d-good")
+    at = after_the_last_write(s3_client, bucket_name, ns)
+    s3_client.put_object(Bucket=bucket_name, Key=keys["a"], Body=b"a-bad")
+    s3_client.delete_object(Bucket=bucket_name, Key=keys["b"])
+    s3_client.put_object(Bucket=bucket_name, Key=keys["c"], Body=b"c-bad")
+    return keys, at
+
+def state(s3_client, bucket_name, keys):
+    visible = {}
+    for name, key in keys.items():
+        try:
+            visible[name] = s3_client.get_object(Bucket=bucket_name, Key=key)["Body"].read()
+        except ClientError:
+            visible[name] = None
+    return visible
+
+def versions(s3_client, bucket_name, ns):
+    response = s3_client.list_object_versions(Bucket=bucket_name, Prefix=ns.key("restore/"))
+    return len(response.get("Versions", [])) + len(response.get("DeleteMarkers", []))
+
+
+def test_copy_restore_writes_the_old_state_forward(s3_client, bucket_name, ns, bad_deploy):
+    keys, at = bad_deploy
+    result = restore_prefix(s3_client, bucket_name, ns.key("restore/"), at, COPY, chunk_size=2)
+
+    assert state(s3_client, bucket_name, keys) == {"a": b"a-good", "b": b"b-good", "c": None, "d": b"d-good"}
+    assert (result.keys, result.skipped, result.copied, result.delete_markers, result.failed) == (4, 1, 2, 1, 0)
+    assert versions(s3_client, bucket_name, ns) == 6 + 3
+
+    again = restore_prefix(s3_client, bucket_name, ns.key("restore/"), at, COPY)
+    assert (again.keys, again.skipped) == (4, 4)
+
+def test_delete_restore_rewinds_the_history(s3_client, bucket_name, ns, bad_deploy):
+    keys, at = bad_deploy
+    result = restore_prefix(s3_client, bucket_name, ns.key("restore/"), at, DELETE)
+
+    assert state(s3_client, bucket_name, keys) == {"a": b"a-good", "b": b"b-good", "c": None, "d": b"d-good"}
+    assert (result.skipped, result.versions_deleted) == (1, 3)
+    assert versions(s3_client, bucket_name, ns) == 3
+
+def test_restore_resumes_from_its_checkpoint(s3_client, bucket_name, ns, bad_deploy, tmp_path):
+    keys, at = bad_deploy
+    checkpoint = tmp_path / "restore.json"
+    # As if a previous run had restored a and b, then stopped
+    checkpoint.write_text(json.dumps({"prefix": ns.key("restore/"), "at": at.isoformat(), "mode": COPY,
+                                      "key_marker": keys["b"], "complete": False}))
+
+    result = restore_prefix(s3_client, bucket_name, ns.key("restore/"), at, COPY, checkpoint=checkpoint)
+    assert (result.keys, result.delete_markers, result.key_marker) == (2, 1, None)
+    assert state(s3_client, bucket_name, keys) == {"a": b"a-bad", "b": None, "c": None, "d": b"d-good"}
+    assert json.loads(checkpoint.read_text())["complete"]
+
+    assert restore_prefix(s3_client, bucket_name, ns.key("restore/"), at, COPY, checkpoint=checkpoint).keys == 0
+    with pytest.raises(ValueError):
+        restore_prefix(s3_client, bucket_name, ns.key("restore/"), at - timedelta(days=1), COPY,
+                       checkpoint=checkpoint)
+
+def test_restore_to_a_delete_in_the_second_of_its_put(s3_client, bucket_name, ns):
+    # put and delete share a LastModified second on S3 and moto, the delete is the state at `at`
+    key = ns.key("restore/same_second")
+    s3_client.put_object(Bucket=bucket_name, Key=key, Body=b"v1")
+    s3_client.delete_object(Bucket=bucket_name, Key=key)
+    at = after_the_last_write(s3_client, bucket_name, ns)
+    s3_client.put_object(Bucket=bucket_name, Key=key, Body=b"v2")
+
+    result = restore_prefix(s3_client, bucket_name, ns.key("restore/"), at, COPY)
+    assert (result.copied, result.delete_markers) == (0, 1)
+    assert state(s3_client, bucket_name, {"k": key}) == {"k": None}
+
+@pytest.mark.parametrize("max_copy_size", [None, 0], ids=["copy_object", "upload_part_copy"])
+def test_copy_restore_of_a_multipart_version_is_not_repeated(s3_client, bucket_name, ns, max_copy_size):
+    key = ns.key("restore/multipart.bin")
+    body = b"m" * (MIN_PART_SIZE + 1)
+    source = upload_multipart(s3_client, bucket_name, key, body, part_size=MIN_PART_SIZE,
+                              Metadata={"owner": "restore"})
+    at = after_the_last_write(s3_client, bucket_name, ns)
+    s3_client.put_object(Bucket=bucket_name, Key=key, Body=b"bad")
+    kwargs = {} if max_copy_size is None else {"max_copy_size": max_copy_size}
+
+    result = restore_prefix(s3_client, bucket_name, ns.key("restore/"), at, COPY, **kwargs)
+    assert result.copied == 1
+    restored = s3_client.head_object(Bucket=bucket_name, Key=key)
+    assert restored["Metadata"] == {"owner": "restore", RESTORED_FROM: source.version_id}
+    assert s3_client.get_object(Bucket=bucket_name, Key=key)["Body"].read() == body
+
+    again = restore_prefix(s3_client, bucket_name, ns.key("restore/"), at, COPY, **kwargs)
+    assert (again.skipped, again.copied) == (1, 0)
@@ -0,0 +1,50 @@
+import pytest
+
+from scenarios import DELETE, DELETED, ONE_VERSION, Scenario
+
+
+def test_scenarios_are_written_once(s3_client, bucket_name, scenarios):
+    history = scenarios.get(DELETED)
+    assert scenarios.get(Scenario("deleted_again", DELETED.steps)) is history
+    assert history.is_deleted and history.body(history.version_ids[0]) == b"content"
+
+    versions = s3_client.list_object_versions(Bucket=bucket_name, Prefix=history.key)
+    assert len(versions.get("Versions", [])) == 1
+    assert len(versions.get("DeleteMarkers", [])) == 1
+
+def test_a_name_is_not_shared_by_scenarios_with_other_steps(s3_client, bucket_name, scenarios):
+    history = scenarios.get(DELETED)
+    with pytest.raises(ValueError):
+        scenarios.get(Scenario(DELETED.name, (b"other",)))
+
+    versions = s3_client.list_object_versions(Bucket=bucket_name, Prefix=history.key)
+    assert [v["VersionId"] for v in versions["Versions"]] == list(history.version_ids[:1])
+    assert scenarios.get(DELETED) is history
+
+def test_scenario_copy_sees_its_writes(s3_client, bucket_name, scenario_copy):
+    history = scenario_copy(ONE_VERSION)
+    changed = s3_client.put_object(Bucket=bucket_name, Key=history.key, Body=b"changed")["VersionId"]
+
+    response = s3_client.get_object(Bucket=bucket_name, Key=history.key)
+    assert (response["VersionId"], response["Body"].read()) == (changed, b"changed")
+    versions = s3_client.list_object_versions(Bucket=bucket_name, Prefix=history.key)["Versions"]
+    assert [v["VersionId"] for v in versions] == [changed, history.latest_version_id]
+
+def test_writes_to_a_copy_leave_the_shared_history_unchanged(s3_backend, s3_client, bucket_name, scenarios):
+    shared = scenarios.get(ONE_VERSION)
+    with scenarios.copies(s3_backend) as copy:
+        history = copy(ONE_VERSION)
+        s3_client.put_object(Bucket=bucket_name, Key=history.key, Body=b"changed")
+        s3_client.delete_object(Bucket=bucket_name, Key=history.key)
+
+    assert scenarios.get(ONE_VERSION) is shared
+    versions = s3_client.list_object_versions(Bucket=bucket_name, Prefix=shared.key)
+    assert [v["VersionId"] for v in versions["Versions"]] == list(shared.version_ids)
+    assert "DeleteMarkers" not in versions
+    response = s3_client.get_object(Bucket=bucket_name, Key=shared.key)
+    assert (response["VersionId"], response["Body"].read()) == (shared.latest_version_id, b"content")
+
+def test_scenario_steps_are_bodies_or_delete():
+    assert Scenario("ok", (b"v1", DELETE)).steps == (b"v1", DELETE)
+    with pytest.raises(ValueError):
+        Scenario("bad", ("v1",))
@@ -0,0 +1,142 @@
+import pytest
+
+from purge import purge_prefix
+from sync import SyncCheckpoint, sync_prefix
+from version_stream import iter_key_histories
+
+
+@pytest.fixture(autouse=True)
+def cleanup_sync_prefix(s3_client, bucket_name, ns):
+    yield  # Run test first
+    # Cleanup after test
+    purge_prefix(s3_client, bucket_name, ns.key('sync/'))
+
+def histories(s3_client, bucket_name, prefix):
+    """{relative key: bodies oldest first, None for a delete marker}"""
+    return {
+        key[len(prefix):]: [
+            None if entry.is_delete_marker else s3_client.get_object(
+                Bucket=bucket_name, Key=key, VersionId=entry.version_id)["Body"].read()
+            for entry in reversed(entries)
+        ]
+        for key, entries in iter_key_histories(s3_client, bucket_name, prefix)
+    }
+
+@pytest.fixture
+def prefixes(ns):
+    return ns.key("sync/source/"), ns.key("sync/mirror/")
+
+
+def test_sync_replays_every_version_and_delete_marker_in_order(s3_client, bucket_name, prefixes, tmp_path):
+    source, mirror = prefixes
+    for body in (b"a1", b"a2"):
+        s3_client.put_object(Bucket=bucket_name, Key=source + "a", Body=body)
+    s3_client.put_object(Bucket=bucket_name, Key=source + "b", Body=b"b1")
+    s3_client.delete_object(Bucket=bucket_name, Key=source + "b")
+
+    result, state = sync_prefix(s3_client, bucket_name, source, bucket_name, mirror, tmp_path / "sync.json")
+    assert (result.keys, result.changed_keys, result.versions_copied, result.delete_markers) == (2, 2, 3, 1)
+    assert histories(s3_client, bucket_name, mirror) == {"a": [b"a1", b"a2"], "b": [b"b1", None]}
+    assert len(state) == 4
+
+def test_sync_replays_writes_within_one_second_in_order(s3_client, bucket_name, prefixes, tmp_path):
+    # put, delete, put, delete share one LastModified second on S3 and moto
+    source, mirror = prefixes
+    for body in (b"a1", b"a2"):
+        s3_client.put_object(Bucket=bucket_name, Key=source + "a", Body=body)
+        s3_client.delete_object(Bucket=bucket_name, Key=source + "a")
+
+    result, _ = sync_prefix(s3_client, bucket_name, source, bucket_name, mirror, tmp_path / "sync.json")
+    assert (result.versions_copied, result.delete_markers) == (2, 2)
+    assert histories(s3_client, bucket_name, mirror) == {"a": [b"a1", None, b"a2", None]}
+
+def test_sync_transfers_only_what_is_new(s3_client, bucket_name, prefixes, tmp_path):
+    source, mirror = prefixes
+    checkpoint = tmp_path / "sync.json"
+    for key in "abc":
+        s3_client.put_object(Bucket=bucket_name, Key=source + key, Body=b"1")
+    sync_prefix(s3_client, bucket_name, source, bucket_name, mirror, checkpoint)
+
+    s3_client.put_object(Bucket=bucket_name, Key=source + "a", Body=b"2")
+    s3_client.delete_object(Bucket=bucket_name, Key=source + "b")
+    s3_client.put_object(Bucket=bucket_name, Key=source + "d", Body=b"1")
+    result, _ = sync_prefix(s3_client, bucket_name, source, bucket_name, mirror, checkpoint)
+    assert (result.keys, result.changed_keys, result.versions_copied, result.delete_markers) == (4, 3, 2, 1)
+    assert histories(s3_client, bucket_name, mirror) == histories(s3_client, bucket_name, source)
+
+    result, _ = sync_prefix(s3_client, bucket_name, source, bucket_name, mirror, checkpoint)
+    assert (result.changed_keys, result.versions_copied) == (0, 0)
+
+def test_digest_finds_new_entries_when_the_checkpointed_version_is_gone(s3_client, bucket_name, prefixes, tmp_path):
+    source, mirror = prefixes
+    checkpoint = tmp_path / "sync.json"
+    s3_client.put_object(Bucket=bucket_name, Key=source + "a", Body=b"1")
+    newest = s3_client.put_object(Bucket=bucket_name, Key=source + "a", Body=b"2")["VersionId"]
+    sync_prefix(s3_client, bucket_name, source, bucket_name, mirror, checkpoint)
+
+    # As if lifecycle had expired it once it turned noncurrent
+    s3_client.put_object(Bucket=bucket_name, Key=source + "a", Body=b"3")
+    s3_client.delete_object(Bucket=bucket_name, Key=source + "a", VersionId=newest)
+    result, _ = sync_prefix(s3_client, bucket_name, source, bucket_name, mirror, checkpoint)
+    assert result.versions_copied == 1
+    assert histories(s3_client, bucket_name, mirror) == {"a": [b"1", b"2", b"3"]}
+
+def test_large_versions_replay_as_multipart_copies(s3_client, bucket_name, prefixes, tmp_path):
+    source, mirror = prefixes
+    s3_client.put_object(Bucket=bucket_name, Key=source + "a", Body=b"a1", Metadata={"owner": "x"},
+                         ContentType="text/plain")
+    s3_client.put_object(Bucket=bucket_name, Key=source + "a", Body=b"a2")
+
+    result, _ = sync_prefix(s3_client, bucket_name, source, bucket_name, mirror, max_copy_size=0)
+    assert result.versions_copied == 2
+    assert histories(s3_client, bucket_name, mirror) == {"a": [b"a1", b"a2"]}
+    oldest = next(iter_key_histories(s3_client, bucket_name, mirror))[1][-1]
+    head = s3_client.head_object(Bucket=bucket_name, Key=mirror + "a", VersionId=oldest.version_id)
+    assert (head["Metadata"], head["ContentType"]) == ({"owner": "x"}, "text/plain")
+
+def test_saves_append_to_a_journal_until_it_outgrows_the_checkpoint(s3_client, bucket_name, prefixes, tmp_path):
+    source, mirror = prefixes
+    checkpoint = tmp_path / "sync.json"
+    journal = tmp_path / "sync.json.journal"
+    s3_client.put_object(Bucket=bucket_name, Key=source + "a", Body=b"1")
+    s3_client.put_object(Bucket=bucket_name, Key=source + "b", Body=b"1")
+    sync_prefix(s3_client, bucket_name, source, bucket_name, mirror, checkpoint)
+    assert not journal.exists()
+
+    # One key per chunk: both fit into the journal of a two-entry checkpoint
+    for key in "cd":
+        s3_client.put_object(Bucket=bucket_name, Key=source + key, Body=b"1")
+    written = checkpoint.read_bytes()
+    result, state = sync_prefix(s3_client, bucket_name, source, bucket_name, mirror, checkpoint, chunk_size=1)
+    assert result.chunks == 2
+    assert checkpoint.read_bytes() == written
+    assert len(journal.read_text().splitlines()) == 2
+
+    with open(journal, "a") as f:
+        f.write('["cut sh')
+    loaded = SyncCheckpoint.load(checkpoint)
+    assert loaded.latest == state.latest
+    assert len(loaded) == len(state) == 4
+
+    # The next save outgrows the journal and rewrites the checkpoint
+    s3_client.put_object(Bucket=bucket_name, Key=source + "a", Body=b"2")
+    result, _ = sync_prefix(s3_client, bucket_name, source, bucket_name, mirror, checkpoint)
+    assert result.versions_copied == 1
+    assert not journal.exists()
+    assert len(SyncCheckpoint.load(checkpoint)) == 5
+
+def test_checkpoint_round_trip_and_guards(s3_client, bucket_name, prefixes, tmp_path):
+    source, mirror = prefixes
+    checkpoint = tmp_path / "sync.json"
+    s3_client.put_object(Bucket=bucket_name, Key=source + "a", Body=b"1")
+    _, state = sync_prefix(s3_client, bucket_name, source, bucket_name, mirror, checkpoint)
+
+    loaded = SyncCheckpoint.load(checkpoint)
+    assert loaded.latest == state.latest
+    assert loaded.synced(source + "a", state.latest[source + "a"])
+    assert not loaded.synced(source + "a", "other")
+
+    with pytest.raises(ValueError):
+        sync_prefix(s3_client, bucket_name, source, bucket_name, mirror + "elsewhere/", checkpoint)
+    with pytest.raises(ValueError):
+        sync_prefix(s3_client, bucket_name, source, bucket_name, source + "mirror/")
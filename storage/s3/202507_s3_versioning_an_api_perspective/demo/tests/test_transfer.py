@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+from purge import purge_prefix
+from transfer import MIN_PART_SIZE, copy_multipart, download_version, upload_multipart
+
+
+@pytest.fixture(autouse=True)
+def cleanup_transfer_prefix(s3_client, bucket_name, ns):
+    yield  # Run test first
+    # Cleanup after test
+    purge_prefix(s3_client, bucket_name, ns.key('transfer/'))
+
+@pytest.fixture(scope="module")
+def large_body():
+    return random.Random(0).randbytes(2 * MIN_PART_SIZE + 1024)
+
+
+def test_upload_multipart_creates_one_version(s3_client, bucket_name, ns, large_body):
+    key = ns.key("transfer/large.bin")
+    result = upload_multipart(s3_client, bucket_name, key, large_body, part_size=MIN_PART_SIZE)
+
+    assert result.parts == 3
+    assert result.etag.strip('"').endswith("-3")
+    response = s3_client.get_object(Bucket=bucket_name, Key=key, VersionId=result.version_id)
+    assert response["Body"].read() == large_body
+
+def test_upload_multipart_from_file(s3_client, bucket_name, ns, large_body, tmp_path):
+    path = tmp_path / "large.bin"
+    path.write_bytes(large_body)
+    key = ns.key("transfer/from_file.bin")
+
+    result = upload_multipart(s3_client, bucket_name, key, path, part_size=MIN_PART_SIZE)
+
+    assert result.size == len(large_body)
+    assert s3_client.get_object(Bucket=bucket_name, Key=key)["Body"].read() == large_body
+
+def test_download_version_pins_the_requested_version(s3_client, bucket_name, ns, large_body, tmp_path):
+    key = ns.key("transfer/versioned.bin")
+    old = upload_multipart(s3_client, bucket_name, key, large_body, part_size=MIN_PART_SIZE)
+    s3_client.put_object(Bucket=bucket_name, Key=key, Body=b"newer")
+
+    data, result = download_version(s3_client, bucket_name, key, old.version_id, part_size=MIN_PART_SIZE)
+    assert bytes(data) == large_body
+    assert result.parts == 3
+
+    path, _ = download_version(s3_client, bucket_name, key, old.version_id, path=tmp_path / "out.bin",
+                               part_size=MIN_PART_SIZE)
+    assert path.read_bytes() == large_body
+
+def test_download_version_resolves_latest_once(s3_client, bucket_name, ns):
+    key = ns.key("transfer/small.bin")
+    s3_client.put_object(Bucket=bucket_name, Key=key, Body=b"v1")
+    res = s3_client.put_object(Bucket=bucket_name, Key=key, Body=b"v2")
+
+    data, result = download_version(s3_client, bucket_name, key)
+
+    assert bytes(data) == b"v2"
+    assert result.version_id == res["VersionId"]
+
+def test_copy_multipart_copies_one_exact_version(s3_client, bucket_name, ns, large_body):
+    source_key = ns.key("transfer/source.bin")
+    old = upload_multipart(s3_client, bucket_name, source_key, large_body, part_size=MIN_PART_SIZE)
+    s3_client.put_object(Bucket=bucket_name, Key=source_key, Body=b"newer")
+    key = ns.key("transfer/copy.bin")
+
+    result = copy_multipart(s3_client, bucket_name, key, bucket_name, source_key, old.version_id, old.size,
+                            old.etag, part_size=MIN_PART_SIZE)
+
+    assert result.parts == 3
+    assert s3_client.get_object(Bucket=bucket_name, Key=key, VersionId=result.version_id)["Body"].read() == large_body
+
+def test_upload_multipart_rejects_small_parts(s3_client, bucket_name, ns):
+    with pytest.raises(ValueError):
+        upload_multipart(s3_client, bucket_name, ns.key("transfer/x"), b"x", part_size=1024)
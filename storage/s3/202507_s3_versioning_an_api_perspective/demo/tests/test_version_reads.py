@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+from botocore.exceptions import ClientError
+
+from purge import purge_prefix
+from version_reads import VersionReadCache
+
+
+@pytest.fixture(autouse=True)
+def cleanup_version_reads_prefix(s3_client, bucket_name, ns):
+    yield  # Run test first
+    # Cleanup after test
+    purge_prefix(s3_client, bucket_name, ns.key('version_reads/'))
+
+class CountingClient:
+    """Counts origin reads and holds each one for a moment, so concurrent reads overlap."""
+
+    def __init__(self, s3_client, delay=0.0):
+        self.s3_client = s3_client
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _call(self, method, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return getattr(self.s3_client, method)(**kwargs)
+
+    def head_object(self, **kwargs):
+        return self._call("head_object", **kwargs)
+
+    def get_object(self, **kwargs):
+        return self._call("get_object", **kwargs)
+
+
+def test_reads_are_cached_per_version(s3_client, bucket_name, ns):
+    key = ns.key("version_reads/a")
+    v1 = s3_client.put_object(Bucket=bucket_name, Key=key, Body=b"v1")["VersionId"]
+    v2 = s3_client.put_object(Bucket=bucket_name, Key=key, Body=b"v22")["VersionId"]
+    origin = CountingClient(s3_client)
+    cache = VersionReadCache(origin)
+
+    for _ in range(3):
+        assert cache.get_object(Bucket=bucket_name, Key=key, VersionId=v1)["Body"].read() == b"v1"
+    assert cache.head_object(Bucket=bucket_name, Key=key, VersionId=v1)["ContentLength"] == 2
+    assert cache.head_object(Bucket=bucket_name, Key=key, VersionId=v2)["ContentLength"] == 3
+    assert origin.calls == 2
+    stats = cache.stats()
+    assert (stats.requests, stats.hits, stats.misses) == (5, 3, 2)
+
+def test_only_permanent_errors_are_cached(s3_client, bucket_name, ns):
+    key = ns.key("version_reads/deleted")
+    version_id = s3_client.put_object(Bucket=bucket_name, Key=key, Body=b"v1")["VersionId"]
+    marker = s3_client.delete_object(Bucket=bucket_name, Key=key)["VersionId"]
+    origin = CountingClient(s3_client)
+    cache = VersionReadCache(origin)
+
+    for _ in range(2):
+        with pytest.raises(ClientError) as exc_info:
+            cache.head_object(Bucket=bucket_name, Key=key, VersionId=marker)
+        assert exc_info.value.response["Error"]["Code"] == "405"
+    assert origin.calls == 1
+    assert cache.stats().negative_hits == 1
+
+    other = ns.key("version_reads/other")
+    for _ in range(2):
+        with pytest.raises(ClientError):
+            cache.head_object(Bucket=bucket_name, Key=other, VersionId=version_id)
+    assert origin.calls == 3
+
+def test_concurrent_reads_of_one_version_are_coalesced(s3_client, bucket_name, ns):
+    keys = [ns.key(f"version_reads/k{i}") for i in range(4)]
+    versions = [(key, s3_client.put_object(Bucket=bucket_name, Key=key, Body=key.encode())["VersionId"])
+                for key in keys]
+    origin = CountingClient(s3_client, delay=0.05)
+    with VersionReadCache(origin, max_workers=16) as cache:
+        barrier = threading.Barrier(8)
+
+        def read():
+            barrier.wait()
+            return cache.get_object(Bucket=bucket_name, Key=versions[0][0], VersionId=versions[0][1])["Body"].read()
+
+        threads = [threading.Thread(target=read) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert origin.calls == 1
+        assert cache.stats().coalesced == 7
+
+        results = cache.get_many(bucket_name, versions + versions)
+        assert {version: response["Body"].read() for version, response in results.items()} == {
+            (key, version_id): key.encode() for key, version_id in versions}
+        assert origin.calls == 4
+
+def test_lru_bounds_entries_and_body_bytes(s3_client, bucket_name, ns):
+    key = ns.key("version_reads/lru")
+    versions = [s3_client.put_object(Bucket=bucket_name, Key=key, Body=b"x" * size)["VersionId"]
+                for size in (10, 10, 100)]
+    cache = VersionReadCache(s3_client, max_entries=2, max_body_size=50)
+
+    for version_id in versions:
+        cache.get_object(Bucket=bucket_name, Key=key, VersionId=version_id)
+    # The 100 byte body is too big, only its metadata is kept, for HEAD
+    assert len(cache) == 2
+    cache.head_object(Bucket=bucket_name, Key=key, VersionId=versions[2])
+    assert cache.stats().hits == 1
@@ -0,0 +1,72 @@
+import pytest
+
+from version_store import VersionStore
+
+
+@pytest.fixture
+def store():
+    store = VersionStore()
+    for key in ("b", "a", "c"):
+        for i in range(3):
+            store.put(f"list/{key}", f"{key}{i}".encode())
+    store.add_delete_marker("list/b")
+    store.put("other/d", b"d")
+    return store
+
+
+def _page(entries):
+    return [(v.key, v.body or "marker") for v in entries]
+
+
+def test_list_versions_newest_first_by_key(store):
+    entries, truncated, _, _ = store.list_versions(prefix="list/")
+    assert not truncated
+    assert _page(entries)[:5] == [
+        ("list/a", b"a2"), ("list/a", b"a1"), ("list/a", b"a0"), ("list/b", "marker"), ("list/b", b"b2"),
+    ]
+    assert len(entries) == 10
+
+def test_list_versions_resumes_from_markers(store):
+    everything, _, _, _ = store.list_versions(prefix="list/")
+    resumed = []
+    key_marker = version_id_marker = ""
+    while True:
+        entries, truncated, key_marker, version_id_marker = store.list_versions(
+            prefix="list/", key_marker=key_marker, version_id_marker=version_id_marker, max_keys=3)
+        resumed.extend(entries)
+        if not truncated:
+            break
+    assert resumed == everything
+
+def test_list_versions_key_marker_skips_whole_key(store):
+    entries, _, _, _ = store.list_versions(prefix="list/", key_marker="list/b")
+    assert {v.key for v in entries} == {"list/c"}
+
+def test_list_versions_unknown_version_id_marker(store):
+    with pytest.raises(KeyError):
+        store.list_versions(key_marker="list/a", version_id_marker="does-not-exist")
+
+def test_remove_version_drops_empty_keys(store):
+    version = store.latest("other/d")
+    store.remove_version("other/d", version.version_id)
+    assert "other/d" not in store.keys()
+    assert len(store) == 10
+
+def test_list_latest_hides_delete_markers(store):
+    latest, truncated = store.list_latest(prefix="list/")
+    assert [v.key for v in latest] == ["list/a", "list/c"]
+    assert not truncated
+
+def test_snapshot_is_copy_on_write_both_ways(store):
+    snapshot = store.snapshot()
+    store.put("list/a", b"a3")
+    store.remove_version("other/d", store.latest("other/d").version_id)
+    snapshot.add_delete_marker("list/c")
+    snapshot.put("new/e", b"e")
+
+    assert [v.body for v in store.history("list/a")][0] == b"a3"
+    assert [v.body for v in snapshot.history("list/a")][0] == b"a2"
+    assert "other/d" not in store.keys() and "other/d" in snapshot.keys()
+    assert not store.latest("list/c").is_delete_marker and snapshot.latest("list/c").is_delete_marker
+    assert "new/e" not in store.keys()
+    assert (len(store), len(snapshot)) == (11, 13)
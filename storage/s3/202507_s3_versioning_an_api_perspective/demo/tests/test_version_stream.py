@@ -0,0 +1,104 @@
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from purge import purge_prefix
+from version_stream import LISTING_ORDER, iter_key_histories, iter_versions, merge_page
+
+
+@pytest.fixture(autouse=True)
+def cleanup_version_stream_prefix(s3_client, bucket_name, ns):
+    yield  # Run test first
+    # Cleanup after test
+    purge_prefix(s3_client, bucket_name, ns.key('version_stream/'))
+
+
+def test_iter_versions_interleaves_delete_markers_newest_first(s3_client, bucket_name, ns):
+    key = ns.key("version_stream/consecutive_markers")
+    put_res = s3_client.put_object(Bucket=bucket_name, Key=key, Body=b"content")
+    del_res1 = s3_client.delete_object(Bucket=bucket_name, Key=key)
+    del_res2 = s3_client.delete_object(Bucket=bucket_name, Key=key)
+
+    entries = list(iter_versions(s3_client, bucket_name, ns.key("version_stream/")))
+
+    assert [e.version_id for e in entries] == [del_res2["VersionId"], del_res1["VersionId"], put_res["VersionId"]]
+    assert [e.is_delete_marker for e in entries] == [True, True, False]
+    assert [e.is_latest for e in entries] == [True, False, False]
+    assert entries[2].size == len(b"content")
+
+def test_iter_versions_orders_writes_within_one_second(s3_client, bucket_name, ns):
+    # LastModified has whole seconds, these four share one on S3 and moto
+    key = ns.key("version_stream/same_second")
+    v1 = s3_client.put_object(Bucket=bucket_name, Key=key, Body=b"v1")["VersionId"]
+    m1 = s3_client.delete_object(Bucket=bucket_name, Key=key)["VersionId"]
+    v2 = s3_client.put_object(Bucket=bucket_name, Key=key, Body=b"v2")["VersionId"]
+    m2 = s3_client.delete_object(Bucket=bucket_name, Key=key)["VersionId"]
+
+    entries = list(iter_versions(s3_client, bucket_name, ns.key("version_stream/")))
+
+    assert [e.version_id for e in entries] == [m2, v2, m1, v1]
+    assert [e.is_latest for e in entries] == [True, False, False, False]
+
+def test_merge_page_follows_listing_order_not_timestamps():
+    second = datetime(2025, 7, 1, tzinfo=timezone.utc)
+    page = {
+        "Versions": [{"Key": "k", "VersionId": vid, "IsLatest": False, "LastModified": second}
+                     for vid in ("v2", "v1")],
+        "DeleteMarkers": [{"Key": "k", "VersionId": "m2", "IsLatest": True, "LastModified": second},
+                          {"Key": "k", "VersionId": "m1", "IsLatest": False, "LastModified": second}],
+        LISTING_ORDER: [True, False, True, False],
+    }
+
+    assert [e.version_id for e in merge_page(page)] == ["m2", "v2", "m1", "v1"]
+    del page[LISTING_ORDER]
+    with pytest.raises(ValueError):
+        merge_page(page, exact_order=True)
+
+def test_iter_versions_across_pages_matches_single_page(s3_client, bucket_name, ns):
+    for name in ("a", "b", "c"):
+        key = ns.key(f"version_stream/{name}.txt")
+        s3_client.put_object(Bucket=bucket_name, Key=key, Body=b"v1")
+        s3_client.delete_object(Bucket=bucket_name, Key=key)
+        s3_client.put_object(Bucket=bucket_name, Key=key, Body=b"v2")
+
+    one_page = list(iter_versions(s3_client, bucket_name, ns.key("version_stream/"), prefetch=0))
+    paged = list(iter_versions(s3_client, bucket_name, ns.key("version_stream/"), page_size=2))
+
+    assert len(one_page) == 9
+    assert paged == one_page
+
+def test_iter_versions_holds_at_most_prefetch_pages_ahead(s3_client, bucket_name, ns):
+    for name in "abcde":
+        s3_client.put_object(Bucket=bucket_name, Key=ns.key(f"version_stream/{name}.txt"), Body=b"v1")
+    listed = []
+    s3_client.meta.events.register("before-call.s3.ListObjectVersions", lambda **kwargs: listed.append(1),
+                                   unique_id="version-stream-count-pages")
+    try:
+        entries = iter_versions(s3_client, bucket_name, ns.key("version_stream/"), page_size=1, prefetch=1)
+        next(entries)
+        time.sleep(0.3)
+        # The page being consumed and one fetched ahead
+        assert len(listed) == 2
+        assert len(list(entries)) == 4
+    finally:
+        s3_client.meta.events.unregister("before-call.s3.ListObjectVersions", unique_id="version-stream-count-pages")
+
+def test_iter_versions_resumes_after_key_marker(s3_client, bucket_name, ns):
+    for name in ("a", "b"):
+        s3_client.put_object(Bucket=bucket_name, Key=ns.key(f"version_stream/{name}.txt"), Body=b"v1")
+
+    entries = list(iter_versions(s3_client, bucket_name, ns.key("version_stream/"),
+                                 key_marker=ns.key("version_stream/a.txt")))
+
+    assert [e.key for e in entries] == [ns.key("version_stream/b.txt")]
+
+def test_iter_key_histories_groups_by_key(s3_client, bucket_name, ns):
+    for i in range(3):
+        s3_client.put_object(Bucket=bucket_name, Key=ns.key("version_stream/a.txt"), Body=f"v{i}".encode())
+    s3_client.put_object(Bucket=bucket_name, Key=ns.key("version_stream/b.txt"), Body=b"v0")
+
+    histories = dict(iter_key_histories(s3_client, bucket_name, ns.key("version_stream/"), page_size=2))
+
+    assert [len(entries) for entries in histories.values()] == [3, 1]
+    assert histories[ns.key("version_stream/a.txt")][0].is_latest
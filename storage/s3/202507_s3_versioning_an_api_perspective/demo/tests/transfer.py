@@ -0,0 +1,205 @@
+"""
+    Parallel transfers of large versioned objects: multipart uploads with
+    concurrent parts, server-side multipart copies of one exact version for
+    sources beyond CopyObject's 5 GB, and downloads of one exact version with
+    concurrent ranged GETs into a preallocated buffer or a memory-mapped file.
+
+    Every ranged GET names the VersionId and carries If-Match with the
+    version's ETag, so parts of different versions can never be mixed, not
+    even when the download started from the version-agnostic latest one.
+"""
+import mmap
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+# S3 minimum for all but the last part
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+MAX_PARTS = 10_000
+# The largest source a single CopyObject accepts
+MAX_COPY_SIZE = 5 * 1024 ** 3
+DEFAULT_COPY_PART_SIZE = 512 * 1024 * 1024
+
+
+@dataclass
+class TransferResult:
+    key: str
+    version_id: str
+    etag: str
+    size: int
+    parts: int
+    elapsed: float
+
+    @property
+    def throughput(self):
+        """MiB/s"""
+        return self.size / self.elapsed / 2 ** 20 if self.elapsed else 0.0
+
+
+def _ranges(size, part_size):
+    return [(first, min(first + part_size, size)) for first in range(0, size, part_size)] or [(0, 0)]
+
+
+def _check_part_size(size, part_size):
+    if part_size < MIN_PART_SIZE:
+        raise ValueError(f"part_size must be at least {MIN_PART_SIZE} bytes")
+    if -(-size // part_size) > MAX_PARTS:
+        raise ValueError(f"{size} bytes need more than {MAX_PARTS} parts of {part_size} bytes")
+
+
+class _Source:
+    """Bytes-like or file path, as one memoryview; files are memory-mapped, not read."""
+
+    def __init__(self, source):
+        self._file = self._map = None
+        if isinstance(source, (str, os.PathLike)):
+            self._file = open(source, "rb")
+            size = os.fstat(self._file.fileno()).st_size
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+            self.view = memoryview(self._map) if self._map else memoryview(b"")
+        else:
+            self.view = memoryview(source).cast("B")
+
+    def close(self):
+        self.view.release()
+        if self._map:
+            self._map.close()
+        if self._file:
+            self._file.close()
+
+
+def upload_multipart(s3_client, bucket_name, key, source, part_size=DEFAULT_PART_SIZE, max_workers=8,
+                     **create_kwargs):
+    """Upload bytes or a file as one new version, with up to max_workers parts in flight."""
+    start = time.perf_counter()
+    data = _Source(source)
+    try:
+        size = len(data.view)
+        _check_part_size(size, part_size)
+        upload_id = s3_client.create_multipart_upload(Bucket=bucket_name, Key=key, **create_kwargs)["UploadId"]
+        try:
+            def upload(numbered_range):
+                number, (first, last) = numbered_range
+                response = s3_client.upload_part(Bucket=bucket_name, Key=key, UploadId=upload_id,
+                                                 PartNumber=number, Body=data.view[first:last].tobytes())
+                return {"PartNumber": number, "ETag": response["ETag"]}
+
+            ranges = list(enumerate(_ranges(size, part_size), start=1))
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                parts = list(pool.map(upload, ranges))
+            response = s3_client.complete_multipart_upload(
+                Bucket=bucket_name, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts})
+        except BaseException:
+            s3_client.abort_multipart_upload(Bucket=bucket_name, Key=key, UploadId=upload_id)
+            raise
+    finally:
+        data.close()
+    return TransferResult(key, response.get("VersionId"), response["ETag"], size, len(parts),
+                          time.perf_counter() - start)
+
+
+def copy_multipart(s3_client, bucket_name, key, source_bucket, source_key, version_id, size, etag,
+                   part_size=DEFAULT_COPY_PART_SIZE, max_workers=8, **create_kwargs):
+    """
+        Copy one source version of size bytes server-side as one new version
+        of key, with up to max_workers UploadPartCopy in flight. Every part
+        carries CopySourceIfMatch with the source's ETag.
+    """
+    start = time.perf_counter()
+    _check_part_size(size, part_size)
+    copy_source = {"Bucket": source_bucket, "Key": source_key, "VersionId": version_id}
+    upload_id = s3_client.create_multipart_upload(Bucket=bucket_name, Key=key, **create_kwargs)["UploadId"]
+    try:
+        def copy(numbered_range):
+            number, (first, last) = numbered_range
+            response = s3_client.upload_part_copy(Bucket=bucket_name, Key=key, UploadId=upload_id,
+                                                  PartNumber=number, CopySource=copy_source,
+                                                  CopySourceRange=f"bytes={first}-{last - 1}",
+                                                  CopySourceIfMatch=etag)
+            return {"PartNumber": number, "ETag": response["CopyPartResult"]["ETag"]}
+
+        ranges = list(enumerate(_ranges(size, part_size), start=1))
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            parts = list(pool.map(copy, ranges))
+        response = s3_client.complete_multipart_upload(
+            Bucket=bucket_name, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts})
+    except BaseException:
+        s3_client.abort_multipart_upload(Bucket=bucket_name, Key=key, UploadId=upload_id)
+        raise
+    return TransferResult(key, response.get("VersionId"), response["ETag"], size, len(parts),
+                          time.perf_counter() - start)
+
+
+class _Target:
+    """A preallocated bytearray, or a file of the final size mapped into memory."""
+
+    def __init__(self, size, path=None):
+        self.path = path
+        self._file = self._map = None
+        if path is None:
+            self.buffer = bytearray(size)
+        else:
+            self._file = open(path, "w+b")
+            self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), size) if size else None
+            self.buffer = self._map if self._map else bytearray()
+        self.view = memoryview(self.buffer)
+
+    def result(self):
+        self.view.release()
+        if self.path is None:
+            return self.buffer
+        if self._map:
+            self._map.flush()
+            self._map.close()
+        self._file.close()
+        return self.path
+
+    def abandon(self):
+        self.view.release()
+        if self._map:
+            self._map.close()
+        if self._file:
+            self._file.close()
+
+
+def download_version(s3_client, bucket_name, key, version_id=None, path=None, part_size=DEFAULT_PART_SIZE,
+                     max_workers=8, chunk_size=1024 * 1024):
+    """
+        Download one version with up to max_workers ranged GETs in flight.
+        Without version_id the latest version is resolved once and pinned.
+        Returns (bytearray or path, TransferResult).
+    """
+    start = time.perf_counter()
+    kwargs = {"Bucket": bucket_name, "Key": key}
+    if version_id:
+        kwargs["VersionId"] = version_id
+    head = s3_client.head_object(**kwargs)
+    size, etag = head["ContentLength"], head["ETag"]
+    if "VersionId" in head:
+        kwargs["VersionId"] = head["VersionId"]
+    kwargs["IfMatch"] = etag
+
+    target = _Target(size, path)
+    try:
+        def download(byte_range):
+            first, last = byte_range
+            response = s3_client.get_object(Range=f"bytes={first}-{last - 1}", **kwargs)
+            position = first
+            for chunk in response["Body"].iter_chunks(chunk_size):
+                target.view[position:position + len(chunk)] = chunk
+                position += len(chunk)
+            if position != last:
+                raise IOError(f"short read of {key} bytes {first}-{last - 1}: got {position - first} bytes")
+
+        ranges = _ranges(size, part_size) if size else []
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for _ in pool.map(download, ranges):
+                pass
+    except BaseException:
+        target.abandon()
+        raise
+    result = TransferResult(key, kwargs.get("VersionId"), etag, size, len(ranges), time.perf_counter() - start)
+    return target.result(), result
@@ -0,0 +1,213 @@
+"""
+    Version-specific HEAD and GET through a cache. A version's bytes and
+    metadata never change, so what one (Key, VersionId) read returned is
+    what every later read returns, and concurrent reads of the same version
+    can share one request.
+
+    Only permanent errors are cached: 405 for a delete marker's VersionId
+    stays 405 for as long as the marker exists. 404/NoSuchVersion is not
+    cached, a read may race the write that creates the version, and neither
+    are throttling or server errors.
+
+    Metadata is kept for every cached version, bodies only up to
+    max_body_size; the cache is an LRU bounded by entries and body bytes.
+"""
+import io
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+
+HEAD, GET = "HeadObject", "GetObject"
+# Error codes a version-specific read keeps returning
+PERMANENT_ERRORS = {"405", "MethodNotAllowed"}
+
+
+def _clone_error(error):
+    return ClientError(error.response, error.operation_name)
+
+
+@dataclass
+class ReadStats:
+    requests: int = 0
+    hits: int = 0
+    negative_hits: int = 0
+    # Waited for a read of the same version already in flight
+    coalesced: int = 0
+    misses: int = 0
+    origin_seconds: float = 0.0
+    # Hits and coalesced reads, priced at the mean origin latency of their operation
+    saved_seconds: float = 0.0
+
+    @property
+    def hit_rate(self):
+        return (self.hits + self.negative_hits + self.coalesced) / self.requests if self.requests else 0.0
+
+
+class VersionReadCache:
+    def __init__(self, s3_client, max_entries=10_000, max_body_size=64 * 1024, max_body_bytes=64 * 2 ** 20,
+                 max_workers=16):
+        self.s3_client = s3_client
+        self.max_entries = max_entries
+        self.max_body_size = max_body_size
+        self.max_body_bytes = max_body_bytes
+        self.max_workers = max_workers
+        # (operation, bucket, key, version id) -> response without Body (+ "Body" bytes) or ClientError
+        self._entries = OrderedDict()
+        self._body_bytes = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._pool = None
+        self._origin = {HEAD: [0, 0.0], GET: [0, 0.0]}
+        self._stats = ReadStats()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._pool:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return ReadStats(**vars(self._stats))
+
+    # Single reads, drop-in for the client calls with VersionId
+
+    def head_object(self, *, Bucket, Key, VersionId):
+        return dict(self._read(HEAD, Bucket, Key, VersionId))
+
+    def get_object(self, *, Bucket, Key, VersionId):
+        response = dict(self._read(GET, Bucket, Key, VersionId))
+        body = response["Body"]
+        response["Body"] = StreamingBody(io.BytesIO(body), len(body))
+        return response
+
+    # Bulk reads: {(key, version id): response or ClientError}, fanned out over the pool
+
+    def head_many(self, bucket_name, versions):
+        return self._many(self.head_object, bucket_name, versions)
+
+    def get_many(self, bucket_name, versions):
+        return self._many(self.get_object, bucket_name, versions)
+
+    def _many(self, read, bucket_name, versions):
+        def one(version):
+            key, version_id = version
+            try:
+                return read(Bucket=bucket_name, Key=key, VersionId=version_id)
+            except ClientError as e:
+                return e
+
+        versions = list(dict.fromkeys(versions))
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        return dict(zip(versions, self._pool.map(one, versions)))
+
+    # The cache
+
+    def _lookup(self, entry_key):
+        """Cached value or in-flight Future, counted; caller holds the lock."""
+        value = self._entries.get(entry_key)
+        if value is not None:
+            self._entries.move_to_end(entry_key)
+            if isinstance(value, ClientError):
+                self._stats.negative_hits += 1
+            else:
+                self._stats.hits += 1
+            self._stats.saved_seconds += self._mean_origin(entry_key[0])
+            return value
+        future = self._in_flight.get(entry_key)
+        if future is not None:
+            self._stats.coalesced += 1
+            self._stats.saved_seconds += self._mean_origin(entry_key[0])
+        return future
+
+    def _mean_origin(self, operation):
+        count, seconds = self._origin[operation]
+        return seconds / count if count else 0.0
+
+    def _read(self, operation, bucket_name, key, version_id):
+        entry_key = (operation, bucket_name, key, version_id)
+        with self._lock:
+            self._stats.requests += 1
+            found = self._lookup(entry_key)
+            if found is None and operation == HEAD:
+                # A cached GET knows the metadata too
+                cached_get = self._entries.get((GET, bucket_name, key, version_id))
+                if cached_get is not None and not isinstance(cached_get, ClientError):
+                    self._stats.hits += 1
+                    self._stats.saved_seconds += self._mean_origin(HEAD)
+                    found = {name: value for name, value in cached_get.items() if name != "Body"}
+            if found is None:
+                self._stats.misses += 1
+                future = self._in_flight[entry_key] = Future()
+        if isinstance(found, Future):
+            found = found.result()
+        if found is not None:
+            if isinstance(found, ClientError):
+                raise _clone_error(found)
+            return found
+
+        try:
+            value = self._fetch(operation, bucket_name, key, version_id)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in PERMANENT_ERRORS:
+                self._store(entry_key, e)
+            future.set_result(e)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            self._store(entry_key, value)
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                self._in_flight.pop(entry_key, None)
+
+    def _fetch(self, operation, bucket_name, key, version_id):
+        start = time.perf_counter()
+        if operation == HEAD:
+            response = self.s3_client.head_object(Bucket=bucket_name, Key=key, VersionId=version_id)
+        else:
+            response = self.s3_client.get_object(Bucket=bucket_name, Key=key, VersionId=version_id)
+            response["Body"] = response["Body"].read()
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            origin = self._origin[operation]
+            origin[0] += 1
+            origin[1] += elapsed
+            self._stats.origin_seconds += elapsed
+        response.pop("ResponseMetadata", None)
+        return response
+
+    def _store(self, entry_key, value):
+        body = 0 if isinstance(value, ClientError) else len(value.get("Body", b""))
+        if body > self.max_body_size:
+            # Too big to keep, its metadata answers HEADs
+            entry_key = (HEAD, *entry_key[1:])
+            value = {name: item for name, item in value.items() if name != "Body"}
+            body = 0
+        with self._lock:
+            if entry_key in self._entries:
+                return
+            self._entries[entry_key] = value
+            self._body_bytes += body
+            while len(self._entries) > self.max_entries or self._body_bytes > self.max_body_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                if not isinstance(evicted, ClientError):
+                    self._body_bytes -= len(evicted.get("Body", b""))
@@ -0,0 +1,229 @@
+"""
+    Indexed in-memory model of a versioned S3 bucket.
+
+    Keys live in a sorted array and every key owns a version chain ordered by
+    creation sequence, so ListObjectVersions resumption from KeyMarker and
+    VersionIdMarker is two binary searches instead of a scan over all versions.
+
+    snapshot() copies a store in O(keys): chains are shared copy-on-write
+    between the store and its snapshots, the first write to a key copies its
+    chain, versions themselves are never modified.
+"""
+import hashlib
+import itertools
+import secrets
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from operator import attrgetter
+
+NULL_VERSION_ID = "null"
+
+_seq_of = attrgetter("seq")
+
+
+@dataclass(slots=True)
+class Version:
+    key: str
+    version_id: str
+    seq: int
+    last_modified: float
+    is_delete_marker: bool = False
+    body: bytes = b""
+    etag: str = ""
+    metadata: dict = field(default_factory=dict)
+    content_type: str = "binary/octet-stream"
+
+    @property
+    def size(self):
+        return len(self.body)
+
+
+class _Chain:
+    """Versions of one key, oldest first, plus a VersionId index."""
+    __slots__ = ("versions", "by_id", "owner")
+
+    def __init__(self, owner):
+        self.versions = []
+        self.by_id = {}
+        # The store that may modify the chain in place
+        self.owner = owner
+
+    def copy(self, owner):
+        chain = _Chain(owner)
+        chain.versions = list(self.versions)
+        chain.by_id = dict(self.by_id)
+        return chain
+
+    def newest_first(self, before_seq=None):
+        end = len(self.versions) if before_seq is None else bisect_left(self.versions, before_seq, key=_seq_of)
+        for i in range(end - 1, -1, -1):
+            yield self.versions[i]
+
+
+def new_version_id():
+    return secrets.token_urlsafe(24)
+
+
+def etag_of(body):
+    return f'"{hashlib.md5(body).hexdigest()}"'
+
+
+class VersionStore:
+    def __init__(self, clock=time.time):
+        self._keys = []
+        self._chains = {}
+        self._seq = itertools.count()
+        self._clock = clock
+        self._version_count = 0
+        self._owner = object()
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return self._version_count
+
+    def now(self):
+        return self._clock()
+
+    def keys(self):
+        return list(self._keys)
+
+    def snapshot(self):
+        """An independent copy of the store that shares chains until either side writes."""
+        with self.lock:
+            copy = VersionStore(self._clock)
+            copy._keys = list(self._keys)
+            copy._chains = dict(self._chains)
+            # Shared, so versions written on either side keep increasing seqs
+            copy._seq = self._seq
+            copy._version_count = self._version_count
+            # Chains owned so far are now shared, neither side may modify them in place
+            self._owner = object()
+            return copy
+
+    def _writable(self, key):
+        chain = self._chains.get(key)
+        if chain is not None and chain.owner is not self._owner:
+            chain = self._chains[key] = chain.copy(self._owner)
+        return chain
+
+    def _append(self, version, versioned):
+        # Callers hold the lock from seq allocation on, so chains stay ordered by seq
+        chain = self._writable(version.key)
+        if chain is None:
+            chain = self._chains[version.key] = _Chain(self._owner)
+            self._keys.insert(bisect_left(self._keys, version.key), version.key)
+        if not versioned:
+            self._discard(chain, NULL_VERSION_ID)
+        chain.versions.append(version)
+        chain.by_id[version.version_id] = version
+        self._version_count += 1
+        return version
+
+    def put(self, key, body, metadata=None, content_type=None, etag=None, versioned=True):
+        with self.lock:
+            return self._append(Version(
+                key=key,
+                version_id=new_version_id() if versioned else NULL_VERSION_ID,
+                seq=next(self._seq),
+                last_modified=self._clock(),
+                body=body,
+                etag=etag or etag_of(body),
+                metadata=dict(metadata or {}),
+                content_type=content_type or "binary/octet-stream",
+            ), versioned)
+
+    def add_delete_marker(self, key, versioned=True):
+        with self.lock:
+            return self._append(Version(
+                key=key,
+                version_id=new_version_id() if versioned else NULL_VERSION_ID,
+                seq=next(self._seq),
+                last_modified=self._clock(),
+                is_delete_marker=True,
+            ), versioned)
+
+    def latest(self, key):
+        chain = self._chains.get(key)
+        return chain.versions[-1] if chain else None
+
+    def get_version(self, key, version_id):
+        chain = self._chains.get(key)
+        return chain.by_id.get(version_id) if chain else None
+
+    def history(self, key):
+        """All versions of key, newest first."""
+        chain = self._chains.get(key)
+        return list(chain.newest_first()) if chain else []
+
+    def _discard(self, chain, version_id):
+        version = chain.by_id.pop(version_id, None)
+        if version is None:
+            return None
+        del chain.versions[bisect_left(chain.versions, version.seq, key=_seq_of)]
+        self._version_count -= 1
+        return version
+
+    def remove_version(self, key, version_id):
+        with self.lock:
+            chain = self._chains.get(key)
+            if chain is None or version_id not in chain.by_id:
+                return None
+            chain = self._writable(key)
+            version = self._discard(chain, version_id)
+            if not chain.versions:
+                del self._chains[key]
+                del self._keys[bisect_left(self._keys, key)]
+            return version
+
+    def list_versions(self, prefix="", key_marker="", version_id_marker="", max_keys=1000):
+        """
+            One ListObjectVersions page: (entries, is_truncated, next_key_marker, next_version_id_marker).
+            Raises KeyError if version_id_marker is not a version of key_marker.
+        """
+        with self.lock:
+            start = bisect_left(self._keys, prefix)
+            before_seq = None
+            if key_marker:
+                if version_id_marker:
+                    chain = self._chains.get(key_marker)
+                    marker = chain.by_id.get(version_id_marker) if chain else None
+                    if marker is None:
+                        raise KeyError(version_id_marker)
+                    start = max(start, bisect_left(self._keys, key_marker))
+                    before_seq = marker.seq
+                else:
+                    start = max(start, bisect_right(self._keys, key_marker))
+
+            entries = []
+            for i in range(start, len(self._keys)):
+                key = self._keys[i]
+                if not key.startswith(prefix):
+                    break
+                chain = self._chains[key]
+                for version in chain.newest_first(before_seq if key == key_marker else None):
+                    if len(entries) == max_keys:
+                        last = entries[-1]
+                        return entries, True, last.key, last.version_id
+                    entries.append(version)
+            return entries, False, None, None
+
+    def list_latest(self, prefix="", start_after="", max_keys=1000):
+        """Keys whose latest version is an object, as ListObjectsV2 sees them: (versions, is_truncated)."""
+        with self.lock:
+            start = bisect_left(self._keys, prefix)
+            if start_after:
+                start = max(start, bisect_right(self._keys, start_after))
+            latest = []
+            for i in range(start, len(self._keys)):
+                key = self._keys[i]
+                if not key.startswith(prefix):
+                    break
+                version = self._chains[key].versions[-1]
+                if version.is_delete_marker:
+                    continue
+                if len(latest) == max_keys:
+                    return latest, True
+                latest.append(version)
+            return latest, False
@@ -0,0 +1,170 @@
+"""
+    ListObjectVersions as one stream of entries in S3's own order: keys
+    ascending, every key newest first, object versions and delete markers
+    interleaved. The next page is fetched in the background while the
+    current one is consumed, and at most prefetch + 1 pages are in memory.
+"""
+import heapq
+import itertools
+import queue
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from xml.etree import ElementTree
+
+# Added to every parsed ListObjectVersions page: True for a delete marker, False for a
+# version, in the order S3 listed them
+LISTING_ORDER = "ListingOrder"
+
+
+@dataclass(frozen=True, slots=True)
+class VersionEntry:
+    key: str
+    version_id: str
+    is_latest: bool
+    is_delete_marker: bool
+    last_modified: datetime
+    size: int = 0
+    etag: str = None
+
+    @classmethod
+    def from_version(cls, item):
+        return cls(item["Key"], item["VersionId"], item["IsLatest"], False, item["LastModified"],
+                   item.get("Size", 0), item.get("ETag"))
+
+    @classmethod
+    def from_delete_marker(cls, item):
+        return cls(item["Key"], item["VersionId"], item["IsLatest"], True, item["LastModified"])
+
+
+def _record_listing_order(response_dict, customized_response_dict, **kwargs):
+    # botocore parses the interleaved <Version> and <DeleteMarker> elements into two
+    # lists, keep the order of the body
+    if response_dict["status_code"] >= 300 or not response_dict["body"]:
+        return
+    root = ElementTree.fromstring(response_dict["body"])
+    tags = (child.tag.rpartition("}")[2] for child in root)
+    customized_response_dict[LISTING_ORDER] = [tag == "DeleteMarker" for tag in tags
+                                               if tag in ("Version", "DeleteMarker")]
+
+
+def track_listing_order(s3_client):
+    """Make the client's ListObjectVersions pages carry LISTING_ORDER, once per client."""
+    s3_client.meta.events.register("before-parse.s3.ListObjectVersions", _record_listing_order,
+                                   unique_id="version-stream-listing-order")
+
+
+def _order(entry):
+    # Only for pages without LISTING_ORDER. LastModified has whole seconds, entries of one
+    # key written in the same second keep no reliable order.
+    return entry.key, -entry.last_modified.timestamp(), not entry.is_latest, not entry.is_delete_marker
+
+
+def merge_page(page, exact_order=False):
+    """
+        The entries of one ListObjectVersions page in listing order. Without
+        LISTING_ORDER the page is merged by LastModified; exact_order raises
+        ValueError instead if a version and a delete marker of one key share
+        a second, and with it their order.
+    """
+    versions = list(map(VersionEntry.from_version, page.get("Versions", [])))
+    markers = list(map(VersionEntry.from_delete_marker, page.get("DeleteMarkers", [])))
+    order = page.get(LISTING_ORDER)
+    if order is None:
+        if exact_order:
+            seconds = {(entry.key, entry.last_modified) for entry in versions}
+            tied = next((entry for entry in markers if (entry.key, entry.last_modified) in seconds), None)
+            if tied is not None:
+                raise ValueError(f"order of {tied.key!r} unknown: a version and a delete marker share "
+                                 f"{tied.last_modified} and the page has no {LISTING_ORDER}")
+        return heapq.merge(versions, markers, key=_order)
+    # Both lists keep the listing's order, only where they interleave is lost
+    versions, markers = iter(versions), iter(markers)
+    return (next(markers if is_delete_marker else versions) for is_delete_marker in order)
+
+
+_DONE = object()
+
+
+class _Prefetcher:
+    """
+        Fetches pages on a thread ahead of the consumer. A page holds one of
+        depth + 1 slots from before it is fetched until the consumer asks for
+        the next page: depth pages fetched ahead, plus the one being consumed.
+    """
+
+    def __init__(self, pages, depth):
+        self._pages = pages
+        self._queue = queue.Queue()
+        self._slots = threading.Semaphore(depth + 1)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._fetch, daemon=True)
+        self._thread.start()
+
+    def _acquire(self):
+        while not self._stop.is_set():
+            if self._slots.acquire(timeout=0.1):
+                return True
+        return False
+
+    def _fetch(self):
+        try:
+            while self._acquire():
+                page = next(self._pages, _DONE)
+                self._queue.put(page)
+                if page is _DONE:
+                    return
+        except Exception as e:
+            self._queue.put(e)
+
+    def __iter__(self):
+        try:
+            while (item := self._queue.get()) is not _DONE:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+                # The consumer is done with item
+                self._slots.release()
+        finally:
+            self._stop.set()
+
+
+def iter_pages(s3_client, bucket_name, prefix="", key_marker=None, version_id_marker=None, page_size=1000):
+    kwargs = {"Bucket": bucket_name, "Prefix": prefix, "MaxKeys": page_size}
+    if key_marker:
+        kwargs["KeyMarker"] = key_marker
+        if version_id_marker:
+            kwargs["VersionIdMarker"] = version_id_marker
+    track_listing_order(s3_client)
+    while True:
+        page = s3_client.list_object_versions(**kwargs)
+        yield page
+        if not page["IsTruncated"]:
+            return
+        kwargs["KeyMarker"] = page["NextKeyMarker"]
+        kwargs["VersionIdMarker"] = page["NextVersionIdMarker"]
+
+
+def iter_versions(s3_client, bucket_name, prefix="", key_marker=None, version_id_marker=None,
+                  page_size=1000, prefetch=1, exact_order=False):
+    """
+        Yield a VersionEntry for every object version and delete marker below
+        prefix, resuming after key_marker (and version_id_marker) if given.
+        prefetch=0 fetches pages only when the previous one is consumed,
+        exact_order see merge_page.
+    """
+    pages = iter_pages(s3_client, bucket_name, prefix, key_marker, version_id_marker, page_size)
+    if prefetch:
+        pages = _Prefetcher(pages, prefetch)
+    entries = itertools.chain.from_iterable(merge_page(page, exact_order) for page in pages)
+    if key_marker and not version_id_marker:
+        # S3 starts after key_marker, moto includes its versions
+        entries = itertools.dropwhile(lambda entry: entry.key == key_marker, entries)
+    yield from entries
+
+
+def iter_key_histories(s3_client, bucket_name, prefix="", **kwargs):
+    """Yield (key, entries newest first) per key. Memory is bounded by the longest history."""
+    for key, entries in itertools.groupby(iter_versions(s3_client, bucket_name, prefix, **kwargs),
+                                          key=lambda entry: entry.key):
+        yield key, list(entries)